@@ -0,0 +1,297 @@
+from datetime import datetime
+
+import pandas as pd
+
+from metrics import instrumented
+from snapshot import SNAPSHOT_DIR, read_partitions
+
+# One row per video of the selected channels; channels without videos keep a single
+# row with NULL video columns so they still show up in the per-channel reports
+REPORT_FRAME_QUERY = """
+    SELECT c.channel_id, c.channel_name, c.total_videos, c.total_views,
+           v.video_id, v.title, v.views, v.likes, v.total_comments, v.duration_seconds, v.published_at
+    FROM channel c
+    LEFT JOIN video v ON v.channel_id = c.channel_id
+    WHERE c.channel_id IN (%s);
+"""
+
+REPORT_FRAME_COLUMNS = [
+    "channel_id", "channel_name", "total_videos", "total_views",
+    "video_id", "title", "views", "likes", "total_comments", "duration_seconds", "published_at",
+]
+
+# One row per selected channel from the channel_summary table maintained at ingest
+SUMMARY_QUERY = """
+    SELECT c.channel_id, c.channel_name, c.total_videos, c.total_views,
+           s.video_count, s.duration_videos, s.duration_seconds_total,
+           s.top_liked_title, s.top_liked_likes, s.top_commented_title, s.top_commented_comments
+    FROM channel c
+    LEFT JOIN channel_summary s ON s.channel_id = c.channel_id
+    WHERE c.channel_id IN (%s);
+"""
+
+SUMMARY_FRAME_COLUMNS = [
+    "channel_id", "channel_name", "total_videos", "total_views", "video_count", "duration_videos", "duration_seconds_total",
+    "top_liked_title", "top_liked_likes", "top_commented_title", "top_commented_comments",
+]
+
+# Report 3 reads the top videos through the (channel_id, views) index and report 8 the
+# videos of the year through idx_video_published_at, so neither loads the report frame
+TOP_VIEWED_QUERY = """
+    SELECT v.title, c.channel_name, v.views
+    FROM video v
+    JOIN channel c ON c.channel_id = v.channel_id
+    WHERE v.channel_id IN (%s) AND v.views IS NOT NULL
+    ORDER BY v.views DESC, v.video_id
+    LIMIT %%s;
+"""
+
+PUBLISHED_IN_RANGE_QUERY = """
+    SELECT DISTINCT v.channel_id, c.channel_name
+    FROM video v
+    JOIN channel c ON c.channel_id = v.channel_id
+    WHERE v.channel_id IN (%s) AND v.published_at >= %%s AND v.published_at < %%s;
+"""
+
+# Reports computed in pandas; the per-video reports 1, 4 and 6 are paged at the database.
+# Reading MySQL, reports 3 and 8 are queries, and the others come from channel_summary
+# unless more than one top video per channel is shown.
+FRAME_REPORTS = [2, 3, 5, 7, 8, 9, 10]
+
+# Per-channel reports served from channel_summary, which keeps only the top video of each channel
+SUMMARY_REPORTS = [2, 5, 7, 9, 10]
+
+COUNT_COLUMNS = ["total_videos", "total_views", "views", "likes", "total_comments", "duration_seconds"]
+
+
+# Function to load the selected channels' rows once into a typed DataFrame;
+# returns None when the query failed
+def load_report_frame(execute_query, channel_ids):
+    query = REPORT_FRAME_QUERY % ','.join(['%s'] * len(channel_ids))
+    rows = execute_query(query, tuple(channel_ids))
+    if rows is None:
+        return None
+    return build_report_frame(rows, channel_ids)
+
+
+# Function to type the raw rows: nullable int64 counts, categorical channel, datetime publish time.
+# Channels are grouped by ID, as different channels may share a name.
+@instrumented("build_report_frame")
+def build_report_frame(rows, channel_ids):
+    frame = pd.DataFrame(rows, columns=REPORT_FRAME_COLUMNS)
+    for column in COUNT_COLUMNS:
+        frame[column] = pd.to_numeric(frame[column], errors="coerce").astype("Int64")
+    frame["channel_id"] = pd.Categorical(frame["channel_id"], categories=list(dict.fromkeys(channel_ids)))
+    frame["published_at"] = pd.to_datetime(frame["published_at"])
+    return frame
+
+
+# Function to load the same frame from the columnar snapshot instead of MySQL; versions
+# are the (channel_id, version) partitions to read. Only the report columns are read from
+# the memory-mapped files, and channels without videos keep their single row as in the query.
+def load_snapshot_frame(versions, channel_ids, directory=SNAPSHOT_DIR):
+    # Partitions are read in selection order, which the per-channel reports keep
+    by_channel = dict(versions)
+    partitions = [(channel_id, by_channel[channel_id]) for channel_id in dict.fromkeys(channel_ids) if channel_id in by_channel]
+    channel_columns = ["channel_id", "channel_name", "total_videos", "total_views"]
+    video_columns = ["channel_id"] + [column for column in REPORT_FRAME_COLUMNS if column not in channel_columns]
+    channels = read_partitions("channel", partitions, channel_columns, directory).to_pandas()
+    videos = read_partitions("video", partitions, video_columns, directory).to_pandas(coerce_temporal_nanoseconds=True)
+    return build_report_frame(channels.merge(videos, on="channel_id", how="left")[REPORT_FRAME_COLUMNS], channel_ids)
+
+
+# Function to format seconds as the ISO 8601 duration shown in report 9
+def format_iso8601_durations(seconds):
+    seconds = seconds.fillna(0).astype("int64")
+    return (
+        "PT" + (seconds // 3600).astype(str)
+        + "H" + (seconds % 3600 // 60).astype(str)
+        + "M" + (seconds % 60).astype(str) + "S"
+    )
+
+
+def videos_only(frame):
+    return frame[frame["video_id"].notna()]
+
+
+def channels_only(frame):
+    return frame.drop_duplicates("channel_id")
+
+
+# Function to pick the top_n videos by a count column within each channel; channels
+# without videos get a "No videos found" placeholder row like the original reports
+def top_videos_per_channel(frame, column, label, top_n):
+    videos = videos_only(frame)
+    top = (
+        videos.sort_values(column, ascending=False, na_position="last", kind="stable")
+        .groupby("channel_id", observed=True)
+        .head(top_n)
+    )
+    result = pd.DataFrame({
+        "Video Title": top["title"],
+        label: top[column].astype(object),
+        "Channel Name": top["channel_name"],
+        "channel_id": top["channel_id"].astype(str),
+    })
+
+    channels = channels_only(frame)
+    missing = channels[~channels["channel_id"].isin(videos["channel_id"].unique())]
+    placeholders = pd.DataFrame({
+        "Video Title": "No videos found",
+        label: "N/A",
+        "Channel Name": missing["channel_name"],
+        "channel_id": missing["channel_id"].astype(str),
+    })
+    result = pd.concat([result, placeholders], ignore_index=True)
+
+    # Keep the order in which the channels were selected
+    order = pd.Categorical(result["channel_id"], categories=frame["channel_id"].cat.categories)
+    return result.iloc[order.argsort(kind="stable")].drop(columns="channel_id").reset_index(drop=True)
+
+
+# Function to get which reports are read from channel_summary; with more than one top
+# video per channel, reports 5 and 10 need the video rows
+def summary_reports(top_n_per_channel):
+    return SUMMARY_REPORTS if top_n_per_channel == 1 else [2, 7, 9]
+
+
+# Function to compute the frame-based Analytics reports from the one loaded frame,
+# only those listed in numbers when given
+@instrumented("compute_reports")
+def compute_reports(frame, top_n_overall=10, top_n_per_channel=1, year=2022, numbers=FRAME_REPORTS):
+    videos = videos_only(frame)
+    channels = channels_only(frame)
+    reports = {}
+
+    if 2 in numbers:
+        reports[2] = pd.DataFrame({
+            "Channel Name": channels["channel_name"],
+            "Total Videos": channels["total_videos"],
+        }).sort_values("Total Videos", ascending=False, kind="stable")
+
+    if 3 in numbers:
+        top_viewed = videos.nlargest(top_n_overall, "views")
+        reports[3] = pd.DataFrame({
+            "Video Title": top_viewed["title"],
+            "Channel Name": top_viewed["channel_name"],
+            "Views": top_viewed["views"],
+        })
+
+    if 5 in numbers:
+        reports[5] = top_videos_per_channel(frame, "likes", "Total Likes", top_n_per_channel)
+
+    if 7 in numbers:
+        reports[7] = pd.DataFrame({
+            "Channel Name": channels["channel_name"],
+            "Total Views": channels["total_views"],
+        })
+
+    if 8 in numbers:
+        # A range on the raw timestamp rather than extracting the year from every row
+        published_in_year = videos[
+            (videos["published_at"] >= pd.Timestamp(year, 1, 1)) & (videos["published_at"] < pd.Timestamp(year + 1, 1, 1))
+        ]
+        reports[8] = pd.DataFrame({
+            "Channel Name": published_in_year.drop_duplicates("channel_id")["channel_name"].to_numpy(),
+        })
+
+    if 9 in numbers:
+        # duration_seconds is parsed at ingest, so this is one vectorized count/sum/mean groupby
+        # over the frame instead of parsing ISO 8601 durations row by row
+        durations = frame.groupby("channel_id", observed=False)["duration_seconds"].agg(["count", "sum", "mean"])
+        names = channels.set_index(channels["channel_id"].astype(str))["channel_name"]
+        reports[9] = pd.DataFrame({
+            "Channel Name": names.reindex(durations.index.astype(str)).to_numpy(),
+            "Total Videos": durations["count"].to_numpy(),
+            "Total Duration (Seconds)": durations["sum"].fillna(0).astype("int64").to_numpy(),
+            "Average Duration (ISO 8601)": format_iso8601_durations(durations["mean"]).to_numpy(),
+        })
+
+    if 10 in numbers:
+        reports[10] = top_videos_per_channel(frame, "total_comments", "Total Comments", top_n_per_channel)
+
+    return {number: report.reset_index(drop=True) for number, report in reports.items()}
+
+
+# Function to get report 3 from MySQL: the top_n most viewed videos of the selected
+# channels; returns None when the query failed
+def get_top_viewed_report(execute_query, channel_ids, top_n):
+    query = TOP_VIEWED_QUERY % ','.join(['%s'] * len(channel_ids))
+    rows = execute_query(query, tuple(channel_ids) + (top_n,))
+    if rows is None:
+        return None
+    report = pd.DataFrame(rows, columns=["Video Title", "Channel Name", "Views"])
+    report["Views"] = pd.to_numeric(report["Views"]).astype("Int64")
+    return report
+
+
+# Function to get report 8 from MySQL: the names of the selected channels, in selection
+# order, with videos published in the given year; returns None when the query failed
+def get_published_in_year_report(execute_query, channel_ids, year=2022):
+    query = PUBLISHED_IN_RANGE_QUERY % ','.join(['%s'] * len(channel_ids))
+    rows = execute_query(query, tuple(channel_ids) + (datetime(year, 1, 1), datetime(year + 1, 1, 1)))
+    if rows is None:
+        return None
+    names = dict((channel_id, channel_name) for channel_id, channel_name in rows)
+    return pd.DataFrame({"Channel Name": [names[channel_id] for channel_id in dict.fromkeys(channel_ids) if channel_id in names]})
+
+
+# Function to load the selected channels' summary rows, in selection order;
+# returns None when the query failed
+def load_summary_frame(execute_query, channel_ids):
+    query = SUMMARY_QUERY % ','.join(['%s'] * len(channel_ids))
+    rows = execute_query(query, tuple(channel_ids))
+    if rows is None:
+        return None
+    summary = pd.DataFrame(rows, columns=SUMMARY_FRAME_COLUMNS)
+    for column in ["total_videos", "total_views", "video_count", "duration_videos", "duration_seconds_total", "top_liked_likes", "top_commented_comments"]:
+        summary[column] = pd.to_numeric(summary[column], errors="coerce").astype("Int64")
+    summary["channel_id"] = pd.Categorical(summary["channel_id"], categories=list(dict.fromkeys(channel_ids)))
+    return summary.sort_values("channel_id", kind="stable").reset_index(drop=True)
+
+
+# Function to show each channel's top video from the summary, with the same
+# "No videos found" placeholder as top_videos_per_channel
+def top_video_from_summary(summary, title_column, value_column, label):
+    has_videos = summary["video_count"].fillna(0) > 0
+    return pd.DataFrame({
+        "Video Title": summary[title_column].where(has_videos, "No videos found"),
+        label: summary[value_column].astype(object).where(has_videos, "N/A"),
+        "Channel Name": summary["channel_name"],
+    })
+
+
+# Function to compute the per-channel reports from the summary frame in O(selected channels)
+@instrumented("compute_summary_reports")
+def compute_summary_reports(summary, numbers=SUMMARY_REPORTS):
+    reports = {}
+
+    if 2 in numbers:
+        reports[2] = pd.DataFrame({
+            "Channel Name": summary["channel_name"],
+            "Total Videos": summary["total_videos"],
+        }).sort_values("Total Videos", ascending=False, kind="stable")
+
+    if 5 in numbers:
+        reports[5] = top_video_from_summary(summary, "top_liked_title", "top_liked_likes", "Total Likes")
+
+    if 7 in numbers:
+        reports[7] = pd.DataFrame({
+            "Channel Name": summary["channel_name"],
+            "Total Views": summary["total_views"],
+        })
+
+    if 9 in numbers:
+        duration_videos = summary["duration_videos"].fillna(0)
+        duration_total = summary["duration_seconds_total"].fillna(0)
+        reports[9] = pd.DataFrame({
+            "Channel Name": summary["channel_name"],
+            "Total Videos": duration_videos.astype("int64"),
+            "Total Duration (Seconds)": duration_total.astype("int64"),
+            "Average Duration (ISO 8601)": format_iso8601_durations((duration_total / duration_videos.where(duration_videos > 0)).astype("float64")),
+        })
+
+    if 10 in numbers:
+        reports[10] = top_video_from_summary(summary, "top_commented_title", "top_commented_comments", "Total Comments")
+
+    return {number: report.reset_index(drop=True) for number, report in reports.items()}
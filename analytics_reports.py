@@ -0,0 +1,191 @@
+# Registry of the Analytics page reports.
+#
+# Each report is an object registered in REPORTS that knows its title, the result cache
+# key it is stored under and how to compute itself from a ReportContext, so the page can
+# compute only the sections that are open, or all of them concurrently. Reports that
+# need the same rows (the report frame or the channel summary) share one load per
+# context. Nothing here calls Streamlit, so reports can be computed on worker threads;
+# queries run through run_query, which raises on failure.
+#
+# A new report is one more register_report call and costs nothing until it is opened.
+
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from analytics_engine import (compute_reports, compute_summary_reports, get_published_in_year_report, get_top_viewed_report, load_report_frame,
+                              load_snapshot_frame, load_summary_frame, summary_reports)
+from paged_reports import fetch_report_page, page_report_frame
+from result_cache import result_cache
+from statistics_history import get_subscriber_growth_report, get_video_growth_report
+
+REPORTS = {}
+
+
+def register_report(report):
+    REPORTS[report.number] = report
+    return report
+
+
+# The selection and settings the reports of one page run are computed for
+class ReportContext:
+    def __init__(self, channels, versions, settings, run_query, use_snapshot=False):
+        self.channels = channels
+        self.versions = versions
+        self.settings = settings
+        self.run_query = run_query
+        self.use_snapshot = use_snapshot
+        # Growth windows are measured up to the current hour, so their results are
+        # reused within the hour unless a channel is re-ingested
+        self.as_of = datetime.now(timezone.utc).replace(tzinfo=None, minute=0, second=0, microsecond=0)
+        # Per paged report: (sort_by, descending, page_size, title_filter, min_count, after)
+        self.page_settings = {}
+        self.loads = {}
+        self.lock = threading.Lock()
+
+    # Function to run a load at most once per context; reports computed concurrently that
+    # need it wait for the first one instead of loading it again
+    def load(self, name, loader):
+        with self.lock:
+            future = self.loads.get(name)
+            owner = future is None
+            if owner:
+                future = self.loads[name] = Future()
+        if owner:
+            try:
+                future.set_result(loader())
+            except Exception as error:
+                future.set_exception(error)
+        return future.result()
+
+    def frame(self):
+        if self.use_snapshot:
+            return self.load("frame", lambda: load_snapshot_frame(self.versions, self.channels))
+        return self.load("frame", lambda: load_report_frame(self.run_query, self.channels))
+
+    def summary(self):
+        return self.load("summary", lambda: load_summary_frame(self.run_query, self.channels))
+
+
+class Report(ABC):
+    paged = False
+
+    # title is a format string over the settings plus per_channel; params names the
+    # settings the result depends on
+    def __init__(self, number, title, params=()):
+        self.number = number
+        self.title_format = title
+        self.params = params
+
+    def title(self, settings):
+        per_channel = "" if settings["top_n_per_channel"] == 1 else f" (top {settings['top_n_per_channel']})"
+        return self.title_format.format(per_channel=per_channel, **settings)
+
+    def cache_key(self, context):
+        return ("report", self.number, context.channels, context.versions, tuple(context.settings[name] for name in self.params))
+
+    # Function to explain why the report cannot be computed in this context, or None
+    def unavailable(self, context):
+        return None
+
+    # Function to get the report from the shared result cache, computing it on a miss
+    def get(self, context):
+        key = self.cache_key(context)
+        result = result_cache.get(key)
+        if result is None:
+            result = self.compute(context)
+            if result is not None:
+                result_cache.put(key, result)
+        return result
+
+    @abstractmethod
+    def compute(self, context):
+        pass
+
+
+# A report computed in pandas; per-channel reports come from channel_summary when it has
+# them, the rest from the selected channels' video rows
+class FrameReport(Report):
+    def compute(self, context):
+        top_n_overall, top_n_per_channel = context.settings["top_n_overall"], context.settings["top_n_per_channel"]
+        # The snapshot has no channel_summary, so there every report comes from the frame
+        if not context.use_snapshot and self.number in summary_reports(top_n_per_channel):
+            return compute_summary_reports(context.summary(), [self.number])[self.number]
+        return compute_reports(context.frame(), top_n_overall, top_n_per_channel, numbers=[self.number])[self.number]
+
+
+# A frame report that MySQL computes through an index with a query of its own; from the
+# snapshot it is computed from the frame like the other frame reports
+class QueryReport(FrameReport):
+    def __init__(self, number, title, params, compute_query):
+        super().__init__(number, title, params)
+        self.compute_query = compute_query
+
+    def compute(self, context):
+        if context.use_snapshot:
+            return super().compute(context)
+        return self.compute_query(context)
+
+
+# A per-video report read one keyset page at a time; computing it fetches the page set in
+# context.page_settings and returns (page DataFrame, next page cursor)
+class PagedReport(Report):
+    paged = True
+
+    def cache_key(self, context):
+        return ("report_page", self.number, context.channels, context.versions, context.page_settings[self.number])
+
+    def compute(self, context):
+        sort_by, descending, page_size, title_filter, min_count, after = context.page_settings[self.number]
+        if context.use_snapshot:
+            rows, next_cursor, columns = page_report_frame(context.frame(), self.number, sort_by, descending, title_filter, min_count, after, page_size)
+        else:
+            rows, next_cursor, columns = fetch_report_page(context.run_query, self.number, context.channels, sort_by, descending, title_filter, min_count, after, page_size)
+        return pd.DataFrame(rows, columns=columns), next_cursor
+
+
+# A report over the statistics history, which is only in MySQL
+class GrowthReport(Report):
+    def __init__(self, number, title, params, compute_report):
+        super().__init__(number, title, params)
+        self.compute_report = compute_report
+
+    def cache_key(self, context):
+        return super().cache_key(context) + (context.as_of,)
+
+    def unavailable(self, context):
+        if context.use_snapshot:
+            return "Growth reports read the statistics history in MySQL and are not available from the snapshot."
+        return None
+
+    def compute(self, context):
+        return self.compute_report(context)
+
+
+register_report(PagedReport(1, "1.Names of all videos and their corresponding channels"))
+register_report(FrameReport(2, "2. Channels with the most number of videos and their total counts"))
+register_report(QueryReport(
+    3, "3. Top {top_n_overall} most viewed videos and their respective channels", ["top_n_overall"],
+    lambda context: get_top_viewed_report(context.run_query, context.channels, context.settings["top_n_overall"]),
+))
+register_report(PagedReport(4, "4. Number of comments made on each video and their corresponding video names"))
+register_report(FrameReport(5, "5. Videos with the highest number of likes for each selected channel{per_channel}", ["top_n_per_channel"]))
+register_report(PagedReport(6, "6. Total number of likes for each video and their corresponding video names"))
+register_report(FrameReport(7, "7. Total number of views for each channel and their corresponding channel names"))
+register_report(QueryReport(
+    8, "8. Names of selected channels that have published videos in the year 2022", (),
+    lambda context: get_published_in_year_report(context.run_query, context.channels, 2022),
+))
+register_report(FrameReport(9, "9. Average duration of videos for selected channels"))
+register_report(FrameReport(10, "10. Videos with the highest number of comments for each selected channel{per_channel}", ["top_n_per_channel"]))
+register_report(GrowthReport(
+    11, "11. Top {top_n_overall} fastest growing videos by views per day over the last {growth_days} days", ["top_n_overall", "growth_days"],
+    lambda context: get_video_growth_report(context.run_query, context.channels, context.settings["growth_days"], context.settings["top_n_overall"], context.as_of),
+))
+register_report(GrowthReport(
+    12, "12. Subscriber change of selected channels over the last {growth_days} days", ["growth_days"],
+    lambda context: get_subscriber_growth_report(context.run_query, context.channels, context.settings["growth_days"], context.as_of),
+))
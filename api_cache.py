@@ -0,0 +1,163 @@
+# On-disk cache of YouTube Data API responses with ETag revalidation.
+#
+# Entries are keyed by the endpoint and its sorted query parameters with the API key
+# removed, so every key and every process share them. An entry younger than its
+# endpoint's TTL is served without a request; an older one is revalidated with
+# If-None-Match, and a 304 reuses the cached body. The cache directory is capped in
+# size and evicts the least recently used entries.
+#
+# With offline=True (YT_CACHE_OFFLINE=1) every response is served from the cache and
+# a miss is an error, so tests and benchmarks can replay recorded responses.
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+YT_CACHE_DIR = os.getenv("YT_CACHE_DIR", "cache/youtube")
+YT_CACHE_MB = float(os.getenv("YT_CACHE_MB", "512"))
+YT_CACHE_OFFLINE = os.getenv("YT_CACHE_OFFLINE", "0") == "1"
+
+# Seconds a response is used without revalidation. Channel details change slowly;
+# listings and statistics are always revalidated, which is cheap when unchanged.
+DEFAULT_CACHE_TTLS = {"channels": 300, "playlistItems": 0, "search": 0, "videos": 0}
+
+# Query parameters left out of the cache key
+IGNORED_PARAMS = {"key"}
+
+
+# Function to read per-endpoint TTLs from YT_CACHE_TTLS, e.g. "channels=600,videos=60"
+def parse_ttls(text):
+    ttls = dict(DEFAULT_CACHE_TTLS)
+    for item in (text or "").split(","):
+        if "=" in item:
+            endpoint, seconds = item.split("=", 1)
+            ttls[endpoint.strip()] = float(seconds)
+    return ttls
+
+
+# Function to build the normalized request URL a cached response is stored under
+def normalize_request(endpoint, params):
+    query = urlencode(sorted((name, str(value)) for name, value in params.items() if name not in IGNORED_PARAMS))
+    return f"{endpoint}?{query}"
+
+
+class ResponseCache:
+    def __init__(self, directory, max_bytes, ttls=None, offline=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttls = ttls if ttls is not None else dict(DEFAULT_CACHE_TTLS)
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.evictions = 0
+        self.load_index()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    # Function to index the files already on disk, oldest first, so a restart keeps the LRU order
+    def load_index(self):
+        found = []
+        if os.path.isdir(self.directory):
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    if name.endswith(".json"):
+                        stat = os.stat(os.path.join(root, name))
+                        found.append((stat.st_mtime, name[:-5], stat.st_size))
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.current_bytes += size
+
+    @staticmethod
+    def key(endpoint, params):
+        return hashlib.sha256(normalize_request(endpoint, params).encode("utf-8")).hexdigest()
+
+    # Function to get a cached entry as {"etag", "response", "validated_at", "fresh"}, or None
+    def get(self, endpoint, params):
+        key = self.key(endpoint, params)
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+        path = self.path(key)
+        try:
+            with open(path, encoding="utf-8") as cache_file:
+                entry = json.load(cache_file)
+            validated_at = os.stat(path).st_mtime
+        except (OSError, ValueError):
+            self.discard(key)
+            return None
+        entry["validated_at"] = validated_at
+        entry["fresh"] = time.time() - validated_at < self.ttls.get(endpoint, 0)
+        return entry
+
+    # Function to store a response; its file's modification time records when it was last validated
+    def put(self, endpoint, params, etag, response):
+        key = self.key(endpoint, params)
+        path = self.path(key)
+        payload = json.dumps({"url": normalize_request(endpoint, params), "etag": etag, "response": response})
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as cache_file:
+            cache_file.write(payload)
+        os.replace(temp_path, path)
+
+        with self.lock:
+            self.current_bytes += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+            evicted = []
+            while self.current_bytes > self.max_bytes:
+                evicted_key, evicted_size = self.entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+                evicted.append(evicted_key)
+        for evicted_key in evicted:
+            self.remove_file(evicted_key)
+
+    # Function to mark an entry as just revalidated after a 304, restarting its TTL
+    def touch(self, endpoint, params):
+        try:
+            os.utime(self.path(self.key(endpoint, params)))
+        except OSError:
+            pass
+
+    def discard(self, key):
+        with self.lock:
+            self.current_bytes -= self.entries.pop(key, 0)
+        self.remove_file(key)
+
+    def remove_file(self, key):
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "evictions": self.evictions,
+                "used_mb": round(self.current_bytes / 2 ** 20, 2),
+                "max_mb": round(self.max_bytes / 2 ** 20, 2),
+                "offline": self.offline,
+            }
+
+
+# Function to build the response cache configured in .env, or None when YT_CACHE_DIR is empty
+def get_response_cache():
+    if not YT_CACHE_DIR:
+        return None
+    return ResponseCache(YT_CACHE_DIR, int(YT_CACHE_MB * 2 ** 20), parse_ttls(os.getenv("YT_CACHE_TTLS")), YT_CACHE_OFFLINE)
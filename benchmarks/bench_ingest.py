@@ -0,0 +1,108 @@
+# Ingestion benchmark against the local fake YouTube API.
+#
+# For each channel size it reports API calls, quota units, wall-clock time and peak
+# Python memory of ingesting one channel. By default pages go through the fetch,
+# enrich and normalize stages and are then dropped, so no MySQL is needed; --mysql
+# runs the full ingest including writes to the .env database.
+#
+#   python benchmarks/bench_ingest.py --sizes 100 1000 10000 --latency 0.02 --json bench.json
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_cache import ResponseCache
+from benchmarks.fake_youtube_api import FakeYouTubeAPI, fake_channel_id
+from database import normalize_video_rows
+from ingest import enrich_pages, get_channel_details, ingest_channel, iter_playlist_pages, iter_search_pages
+from youtube_api import YouTubeClient
+
+BENCH_API_KEY = "bench-key"
+
+
+# Function to run the fetch -> enrich -> normalize stages for one channel, discarding the rows
+def run_pipeline(client, channel_id, mode):
+    channel_data = get_channel_details(BENCH_API_KEY, channel_id, client)
+    if mode == "playlist":
+        pages = iter_playlist_pages(client, channel_data["Uploads Playlist ID"])
+    else:
+        pages = iter_search_pages(client, channel_id)
+
+    videos = 0
+    for video_data, _ in enrich_pages(BENCH_API_KEY, channel_id, pages, client):
+        videos += len(normalize_video_rows(video_data))
+    return videos
+
+
+def run_mysql(client, channel_id, mode):
+    result = ingest_channel(BENCH_API_KEY, channel_id, client, incremental=(mode == "playlist"))
+    if result["Status"] != "Success":
+        raise RuntimeError(result["Error"])
+    return result["Videos Saved"]
+
+
+# Function to benchmark one channel size and return its measurements. With a response
+# cache the channel is fetched once to warm it, and the measured run revalidates it.
+def bench(size, mode, latency, use_mysql, cache_dir=None):
+    channel_id = fake_channel_id(size)
+    with FakeYouTubeAPI({channel_id: size}, latency=latency) as api:
+        cache = ResponseCache(cache_dir, 2 ** 40) if cache_dir else None
+        client = YouTubeClient(BENCH_API_KEY, requests_per_second=10 ** 6, daily_quota=10 ** 9, base_url=api.base_url, cache=cache)
+        if cache:
+            run_pipeline(client, channel_id, mode)
+            api.reset_counters()
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        videos = (run_mysql if use_mysql else run_pipeline)(client, channel_id, mode)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        stats = api.stats()
+    return {
+        "channel_videos": size,
+        "mode": mode,
+        "cached": cache_dir is not None,
+        "videos_ingested": videos,
+        "api_calls": stats["total_calls"],
+        "calls_by_endpoint": stats["calls"],
+        "quota_units": stats["quota_units"],
+        "wall_seconds": round(elapsed, 3),
+        "peak_memory_mb": round(peak / 2 ** 20, 2),
+        "response_mb": round(stats["bytes_sent"] / 2 ** 20, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark channel ingestion against a local fake YouTube API.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="videos per synthetic channel")
+    parser.add_argument("--mode", choices=["playlist", "search"], default="playlist", help="list videos through the uploads playlist or search")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of latency added to every API response")
+    parser.add_argument("--mysql", action="store_true", help="also write to the .env MySQL database")
+    parser.add_argument("--cache", action="store_true", help="measure a refresh through a warm ETag response cache")
+    parser.add_argument("--json", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'videos':>8} {'ingested':>9} {'api calls':>10} {'quota':>7} {'wall s':>8} {'peak MB':>8} {'resp MB':>8}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            result = bench(size, args.mode, args.latency, args.mysql, cache_dir if args.cache else None)
+        results.append(result)
+        print(f"{result['channel_videos']:>8} {result['videos_ingested']:>9} {result['api_calls']:>10} {result['quota_units']:>7} "
+              f"{result['wall_seconds']:>8.2f} {result['peak_memory_mb']:>8.2f} {result['response_mb']:>8.2f}")
+
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump({"mode": args.mode, "latency": args.latency, "mysql": args.mysql, "cache": args.cache, "results": results}, json_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# Benchmark: row-by-row video save vs the batched upsert path.
+#
+# Runs against the MySQL database configured in .env. Every run happens inside
+# a transaction that is rolled back, so no benchmark rows are left behind.
+#
+#   python benchmarks/bench_save.py --videos 10000 --chunk-size 1000
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_database_connection, normalize_video_rows, upsert_channel, upsert_videos
+
+BENCH_CHANNEL_ID = "UCbenchmark000000000000"
+
+
+# Function to build synthetic channel and video records shaped like the API output
+def make_channel_data(videos):
+    channel_data = {
+        "Channel ID": BENCH_CHANNEL_ID,
+        "Channel Name": "Benchmark Channel",
+        "Description": "Synthetic channel used by benchmarks/bench_save.py",
+        "Subscriber Count": "1000",
+        "Total Videos": str(videos),
+        "Total Views": "1000000",
+        "Channel Status": "public"
+    }
+    start = datetime(2020, 1, 1)
+    video_data = [
+        {
+            "Video ID": f"bench{i:07d}",
+            "Channel ID": BENCH_CHANNEL_ID,
+            "Title": f"Benchmark video {i}",
+            "Description": "x" * 500,
+            "Views": str(i * 10),
+            "Likes": str(i) if i % 20 else "Not Available",
+            "Total Comments": str(i // 2),
+            "Duration": "PT4M13S",
+            "Published Date & Time": (start + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        }
+        for i in range(videos)
+    ]
+    return channel_data, video_data
+
+
+# The save path as it was before batching: a SELECT and an UPDATE or INSERT per video
+def save_row_by_row(cursor, video_data):
+    for video in video_data:
+        published_at = datetime.strptime(video["Published Date & Time"], "%Y-%m-%dT%H:%M:%SZ").strftime("%Y-%m-%d %H:%M:%S")
+        likes = int(video["Likes"]) if video["Likes"] != "Not Available" else None
+        comments = int(video["Total Comments"]) if video["Total Comments"] != "Not Available" else None
+
+        cursor.execute("SELECT * FROM video WHERE video_id = %s", (video["Video ID"],))
+        if cursor.fetchone():
+            cursor.execute(
+                "UPDATE video SET title = %s, description = %s, views = %s, likes = %s, total_comments = %s, duration = %s, published_at = %s WHERE video_id = %s",
+                (video["Title"], video["Description"], video["Views"], likes, comments, video["Duration"], published_at, video["Video ID"])
+            )
+        else:
+            cursor.execute(
+                "INSERT INTO video (video_id, channel_id, title, description, views, likes, total_comments, duration, published_at) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                (video["Video ID"], video["Channel ID"], video["Title"], video["Description"], video["Views"], likes, comments, video["Duration"], published_at)
+            )
+
+
+def save_batched(cursor, video_data, chunk_size):
+    upsert_videos(cursor, normalize_video_rows(video_data), chunk_size)
+
+
+# Function to time one save path twice: first as pure inserts, then as updates of the same rows
+def run(name, save, channel_data, video_data):
+    connection = get_database_connection()
+    cursor = connection.cursor(buffered=True)
+    timings = []
+    try:
+        upsert_channel(cursor, channel_data)
+        for _ in range(2):
+            started = time.perf_counter()
+            save(cursor, video_data)
+            timings.append(time.perf_counter() - started)
+    finally:
+        connection.rollback()
+        cursor.close()
+        connection.close()
+
+    print(f"{name:<14} insert {timings[0]:8.2f}s   update {timings[1]:8.2f}s   ({len(video_data) / timings[0]:,.0f} rows/s)")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the row-by-row and batched video save paths.")
+    parser.add_argument("--videos", type=int, default=10000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--skip-row-by-row", action="store_true", help="only time the batched path")
+    args = parser.parse_args()
+
+    channel_data, video_data = make_channel_data(args.videos)
+    print(f"Saving {args.videos:,} videos (chunk size {args.chunk_size})")
+
+    batched = run("batched", lambda cursor, data: save_batched(cursor, data, args.chunk_size), channel_data, video_data)
+    if not args.skip_row_by_row:
+        row_by_row = run("row-by-row", save_row_by_row, channel_data, video_data)
+        print(f"speedup        insert {row_by_row[0] / batched[0]:8.1f}x   update {row_by_row[1] / batched[1]:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# Local stand-in for the YouTube Data API v3, for benchmarks and offline testing.
+#
+# Serves the channels, search, playlistItems and videos endpoints for synthetic
+# channels of any size, generated on the fly from the video index so even very large
+# channels cost no memory. Supports pagination (50 per page, search capped at ~500
+# results like the real API), ETags with 304 Not Modified answers, injected latency,
+# a daily quota that answers 403 quotaExceeded once spent, and a rate of transient 503 errors.
+#
+#   with FakeYouTubeAPI({fake_channel_id(1000): 1000}, latency=0.02) as api:
+#       client = YouTubeClient("test-key", base_url=api.base_url)
+
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+QUOTA_COSTS = {"channels": 1, "playlistItems": 1, "search": 100, "videos": 1}
+PAGE_SIZE = 50
+SEARCH_RESULT_CAP = 500
+
+# Every PRIVATE_EVERY-th video is missing from videos.list, like private or deleted videos
+PRIVATE_EVERY = 97
+
+FIRST_PUBLISHED_AT = datetime(2015, 1, 1)
+
+
+# Function to build a 24 character channel ID for a synthetic channel of the given size
+def fake_channel_id(videos, number=0):
+    return f"UCfake{number:06d}{videos:012d}"
+
+
+def video_id(channel_id, index):
+    return f"{channel_id[6:]}v{index:07d}"
+
+
+def video_index(video_id_value):
+    return int(video_id_value[-7:])
+
+
+class FakeYouTubeAPI:
+    def __init__(self, channels, latency=0.0, daily_quota=None, error_rate=0.0, seed=0):
+        self.channels = dict(channels)
+        self.playlists = {"UU" + channel_id[2:]: channel_id for channel_id in self.channels}
+        self.latency = latency
+        self.daily_quota = daily_quota
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset_counters()
+
+        handler = type("Handler", (FakeYouTubeHandler,), {"api": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset_counters(self):
+        with self.lock:
+            self.calls = {endpoint: 0 for endpoint in QUOTA_COSTS}
+            self.quota_used = 0
+            self.bytes_sent = 0
+            self.errors_sent = 0
+            self.not_modified_sent = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                "calls": dict(self.calls),
+                "total_calls": sum(self.calls.values()),
+                "quota_units": self.quota_used,
+                "bytes_sent": self.bytes_sent,
+                "errors_sent": self.errors_sent,
+                "not_modified_sent": self.not_modified_sent,
+            }
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # Function to account for a call; returns an error response tuple or None
+    def charge(self, endpoint):
+        with self.lock:
+            self.calls[endpoint] += 1
+            if self.daily_quota is not None and self.quota_used + QUOTA_COSTS[endpoint] > self.daily_quota:
+                self.errors_sent += 1
+                return 403, error_body(403, "quotaExceeded", "The request cannot be completed because you have exceeded your quota.")
+            self.quota_used += QUOTA_COSTS[endpoint]
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.errors_sent += 1
+                return 503, error_body(503, "backendError", "Backend Error")
+        return None
+
+    def published_at(self, channel_id, index):
+        # Index 0 is the newest upload, as both search (order=date) and uploads playlists list newest first
+        total = self.channels[channel_id]
+        return (FIRST_PUBLISHED_AT + timedelta(hours=6 * (total - 1 - index))).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def snippet(self, channel_id, index):
+        return {
+            "publishedAt": self.published_at(channel_id, index),
+            "channelId": channel_id,
+            "title": f"Synthetic video {index} of {channel_id}",
+            "description": f"Description of synthetic video {index}. " * 4,
+        }
+
+    def respond_channels(self, params):
+        items = []
+        for channel_id in params.get("id", "").split(","):
+            if channel_id not in self.channels:
+                continue
+            videos = self.channels[channel_id]
+            items.append({
+                "kind": "youtube#channel",
+                "id": channel_id,
+                "snippet": {"title": f"Fake channel {channel_id}", "description": f"Synthetic channel with {videos} videos"},
+                "contentDetails": {"relatedPlaylists": {"uploads": "UU" + channel_id[2:]}},
+                "statistics": {"viewCount": str(videos * 1000), "subscriberCount": str(videos * 10), "videoCount": str(videos)},
+                "status": {"privacyStatus": "public"},
+            })
+        return {"kind": "youtube#channelListResponse", "items": items}
+
+    def page(self, total, params, cap=None):
+        start = int(params.get("pageToken") or 0)
+        end = min(start + int(params.get("maxResults", PAGE_SIZE)), total if cap is None else min(total, cap))
+        next_page_token = str(end) if end < (total if cap is None else min(total, cap)) else None
+        return range(start, end), next_page_token
+
+    def respond_search(self, params):
+        channel_id = params.get("channelId")
+        total = self.channels.get(channel_id, 0)
+        indexes, next_page_token = self.page(total, params, SEARCH_RESULT_CAP)
+        body = {
+            "kind": "youtube#searchListResponse",
+            "pageInfo": {"totalResults": total, "resultsPerPage": PAGE_SIZE},
+            "items": [
+                {"kind": "youtube#searchResult", "id": {"kind": "youtube#video", "videoId": video_id(channel_id, index)}, "snippet": self.snippet(channel_id, index)}
+                for index in indexes
+            ],
+        }
+        if next_page_token:
+            body["nextPageToken"] = next_page_token
+        return body
+
+    def respond_playlist_items(self, params):
+        channel_id = self.playlists.get(params.get("playlistId"))
+        if channel_id is None:
+            return None
+        indexes, next_page_token = self.page(self.channels[channel_id], params)
+        body = {
+            "kind": "youtube#playlistItemListResponse",
+            "pageInfo": {"totalResults": self.channels[channel_id], "resultsPerPage": PAGE_SIZE},
+            "items": [
+                {
+                    "kind": "youtube#playlistItem",
+                    "snippet": self.snippet(channel_id, index),
+                    "contentDetails": {"videoId": video_id(channel_id, index), "videoPublishedAt": self.published_at(channel_id, index)},
+                }
+                for index in indexes
+            ],
+        }
+        if next_page_token:
+            body["nextPageToken"] = next_page_token
+        return body
+
+    def respond_videos(self, params):
+        items = []
+        for requested_id in params.get("id", "").split(",")[:PAGE_SIZE]:
+            try:
+                index = video_index(requested_id)
+            except ValueError:
+                continue
+            if index % PRIVATE_EVERY == PRIVATE_EVERY - 1:
+                continue
+            items.append({
+                "kind": "youtube#video",
+                "id": requested_id,
+                "statistics": {"viewCount": str(index * 37 + 100), "likeCount": str(index * 3 + 1), "commentCount": str(index % 50)},
+                "contentDetails": {"duration": f"PT{index % 3}H{index % 60}M{index * 7 % 60}S"},
+            })
+        return {"kind": "youtube#videoListResponse", "items": items}
+
+
+def error_body(code, reason, message):
+    return {"error": {"code": code, "message": message, "errors": [{"reason": reason, "message": message}]}}
+
+
+class FakeYouTubeHandler(BaseHTTPRequestHandler):
+    api = None
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; with Nagle's algorithm the body would wait
+    # for the client's delayed ACK of the headers, adding ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        endpoint = parsed.path.rstrip("/").rsplit("/", 1)[-1]
+        params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+
+        if self.api.latency:
+            time.sleep(self.api.latency)
+
+        responders = {
+            "channels": self.api.respond_channels,
+            "search": self.api.respond_search,
+            "playlistItems": self.api.respond_playlist_items,
+            "videos": self.api.respond_videos,
+        }
+        if endpoint not in responders:
+            return self.send_json(404, error_body(404, "notFound", f"Unknown endpoint {endpoint}"))
+        if not params.get("key"):
+            return self.send_json(403, error_body(403, "forbidden", "The request is missing a valid API key."))
+
+        error = self.api.charge(endpoint)
+        if error:
+            return self.send_json(*error)
+        body = responders[endpoint](params)
+        if body is None:
+            return self.send_json(404, error_body(404, "playlistNotFound", "The playlist cannot be found."))
+        self.send_json(200, body, etag=True)
+
+    # Successful responses carry an ETag; a matching If-None-Match is answered with an empty 304
+    def send_json(self, status, body, etag=False):
+        payload = json.dumps(body).encode("utf-8")
+        tag = f'"{hashlib.md5(payload).hexdigest()}"' if etag else None
+        if tag and self.headers.get("If-None-Match") == tag:
+            with self.api.lock:
+                self.api.not_modified_sent += 1
+            self.send_response(304)
+            self.send_header("ETag", tag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        with self.api.lock:
+            self.api.bytes_sent += len(payload)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(payload)))
+        if tag:
+            self.send_header("ETag", tag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,115 @@
+# In-memory catalog of channels for the Analytics channel picker.
+#
+# The ID -> name index is loaded once per catalog version and shared by every session of
+# the server process, so a rerun or keystroke searches memory instead of transferring the
+# channel table. Channels are selected by ID, as different channels may share a name.
+
+import bisect
+import os
+import threading
+import time
+from collections import Counter
+
+# How long a loaded catalog is used before its version is checked again
+CATALOG_REFRESH_SECONDS = float(os.getenv("CATALOG_REFRESH_SECONDS", "10"))
+CATALOG_SEARCH_LIMIT = int(os.getenv("CATALOG_SEARCH_LIMIT", "50"))
+
+# Changes whenever a channel is added, renamed or deleted, but not when its statistics
+# or videos are saved again: a delete lowers the count and an add or rename moves the
+# latest change time forward
+CATALOG_VERSION_QUERY = "SELECT COUNT(*), MAX(catalog_changed_at) FROM channel;"
+CATALOG_QUERY = "SELECT channel_id, channel_name FROM channel;"
+
+
+class ChannelCatalog:
+    def __init__(self, rows, version=None):
+        self.version = version
+        self.names = {channel_id: name or "" for channel_id, name in rows}
+
+        # Case-folded names in sorted order, so a prefix is a bisect plus a short scan
+        self.sorted_names = sorted((name.casefold(), channel_id) for channel_id, name in self.names.items())
+        self.keys = [name for name, _ in self.sorted_names]
+        self.duplicate_names = {name for name, count in Counter(self.names.values()).items() if count > 1}
+
+    def __len__(self):
+        return len(self.names)
+
+    # Function to label a channel for the picker; shared or unknown names also show the ID
+    def label(self, channel_id):
+        name = self.names.get(channel_id)
+        if name is None:
+            return f"{channel_id} (not found)"
+        if not name:
+            return channel_id
+        return f"{name} ({channel_id})" if name in self.duplicate_names else name
+
+    # Function to find channel IDs by name, prefix matches first and then substring matches,
+    # each in name order; an exact channel ID is matched too
+    def search(self, text, limit=CATALOG_SEARCH_LIMIT):
+        text = text.strip()
+        if not text:
+            return [channel_id for _, channel_id in self.sorted_names[:limit]]
+
+        results = [text] if text in self.names else []
+        folded = text.casefold()
+        start = bisect.bisect_left(self.keys, folded)
+        for name, channel_id in self.sorted_names[start:]:
+            if len(results) >= limit or not name.startswith(folded):
+                break
+            results.append(channel_id)
+
+        if len(results) < limit:
+            for name, channel_id in self.sorted_names:
+                if folded in name and not name.startswith(folded):
+                    results.append(channel_id)
+                    if len(results) >= limit:
+                        break
+        return list(dict.fromkeys(results))[:limit]
+
+
+# Process-wide holder of the current catalog, reloaded only when its version changes
+class ChannelCatalogService:
+    def __init__(self, refresh_seconds=CATALOG_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.catalog = None
+        self.checked_at = 0.0
+        self.loads = 0
+        self.lock = threading.Lock()
+
+    # Function to get the catalog from the database, checking its version at most every
+    # refresh_seconds; returns None only if it was never loaded and the query failed
+    def get(self, execute_query):
+        def load_version():
+            result = execute_query(CATALOG_VERSION_QUERY)
+            return tuple(result[0]) if result else None
+
+        return self.get_from(load_version, lambda version: execute_query(CATALOG_QUERY))
+
+    # Function to get the catalog from any source: load_version() returns the source's
+    # current version and load_rows(version) its (channel_id, name) rows, None on failure
+    def get_from(self, load_version, load_rows):
+        with self.lock:
+            if self.catalog is not None and time.monotonic() - self.checked_at < self.refresh_seconds:
+                return self.catalog
+            catalog = self.catalog
+
+        version = load_version()
+        if version is None:
+            return catalog
+
+        if catalog is None or catalog.version != version:
+            rows = load_rows(version)
+            if rows is None:
+                return catalog
+            catalog = ChannelCatalog(rows, version)
+            with self.lock:
+                self.loads += 1
+
+        with self.lock:
+            self.catalog = catalog
+            self.checked_at = time.monotonic()
+        return catalog
+
+
+channel_catalog = ChannelCatalogService()
+snapshot_channel_catalog = ChannelCatalogService()
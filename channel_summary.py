@@ -0,0 +1,162 @@
+# Per-channel summary rows behind the per-channel Analytics reports (2, 5, 7, 9 and 10).
+#
+# Each save of a page of videos folds the page into its channel's summary row inside
+# the same transaction: counts and sums are adjusted by the difference between the
+# stored and the new values, and the top-liked and top-commented videos are replaced
+# when a video of the page beats them. Only when a top video itself drops is the row
+# recomputed, from that channel's videos alone.
+
+# Video columns compared against the summary, in the order of the stored stats tuples
+STORED_STATS_COLUMNS = ["title", "views", "likes", "total_comments", "duration_seconds"]
+
+SUMMARY_COLUMNS = [
+    "channel_id", "video_count", "total_views", "duration_videos", "duration_seconds_total",
+    "top_liked_video_id", "top_liked_title", "top_liked_likes",
+    "top_commented_video_id", "top_commented_title", "top_commented_comments",
+]
+
+# Summary columns of the top video by each count; the highest count wins, NULL counts
+# come last and the lowest video_id wins on ties. video_id is compared as binary, the
+# order Python compares the strings in, whatever the column's collation.
+TOP_VIDEO_COLUMNS = {
+    "likes": ("top_liked_video_id", "top_liked_title", "top_liked_likes"),
+    "total_comments": ("top_commented_video_id", "top_commented_title", "top_commented_comments"),
+}
+
+# Recomputes summary rows from the video table; {channel_filter} and {video_filter} narrow
+# it to one channel
+SUMMARY_SELECT_QUERY = """
+    SELECT c.channel_id,
+           COALESCE(a.video_count, 0), COALESCE(a.total_views, 0),
+           COALESCE(a.duration_videos, 0), COALESCE(a.duration_seconds_total, 0),
+           tl.video_id, tl.title, tl.likes,
+           tc.video_id, tc.title, tc.total_comments
+    FROM channel c
+    LEFT JOIN (
+        SELECT channel_id, COUNT(*) AS video_count, SUM(views) AS total_views,
+               COUNT(duration_seconds) AS duration_videos, SUM(duration_seconds) AS duration_seconds_total
+        FROM video {video_filter}
+        GROUP BY channel_id
+    ) a ON a.channel_id = c.channel_id
+    LEFT JOIN (
+        SELECT channel_id, video_id, title, likes,
+               ROW_NUMBER() OVER (PARTITION BY channel_id ORDER BY likes DESC, CAST(video_id AS BINARY)) AS position
+        FROM video {video_filter}
+    ) tl ON tl.channel_id = c.channel_id AND tl.position = 1
+    LEFT JOIN (
+        SELECT channel_id, video_id, title, total_comments,
+               ROW_NUMBER() OVER (PARTITION BY channel_id ORDER BY total_comments DESC, CAST(video_id AS BINARY)) AS position
+        FROM video {video_filter}
+    ) tc ON tc.channel_id = c.channel_id AND tc.position = 1
+    {channel_filter}
+"""
+
+UPSERT_SUMMARY_QUERY = f"""
+    INSERT INTO channel_summary ({', '.join(SUMMARY_COLUMNS)})
+    VALUES ({', '.join(['%s'] * len(SUMMARY_COLUMNS))})
+    ON DUPLICATE KEY UPDATE
+        {', '.join(f'{column} = VALUES({column})' for column in SUMMARY_COLUMNS[1:])}
+"""
+
+
+# Function to build the summary query for one channel, or for every channel when channel_id is None
+def build_summary_select(channel_id=None):
+    if channel_id is None:
+        return SUMMARY_SELECT_QUERY.format(video_filter="", channel_filter=""), ()
+    query = SUMMARY_SELECT_QUERY.format(video_filter="WHERE channel_id = %s", channel_filter="WHERE c.channel_id = %s")
+    return query, (channel_id, channel_id, channel_id, channel_id)
+
+
+# Function to recompute the summary rows of one channel, or of all, from the video table
+def compute_summaries(cursor, channel_id=None):
+    cursor.execute(*build_summary_select(channel_id))
+    return [dict(zip(SUMMARY_COLUMNS, row)) for row in cursor.fetchall()]
+
+
+def save_summary(cursor, summary):
+    cursor.execute(UPSERT_SUMMARY_QUERY, tuple(summary[column] for column in SUMMARY_COLUMNS))
+
+
+# Function to recompute and store one channel's summary row
+def rebuild_channel_summary(cursor, channel_id):
+    for summary in compute_summaries(cursor, channel_id):
+        save_summary(cursor, summary)
+
+
+# Function to lock a channel's summary row until the transaction ends, creating an empty
+# row for a new channel; returns True when the row was created. It must be the first
+# statement of the transaction: concurrent saves of the same channel then run one after
+# the other, and since the transaction's read snapshot is only taken by its first plain
+# read, the stats read next include what the previous save committed.
+def lock_channel_summary(cursor, channel_id):
+    cursor.execute("INSERT INTO channel_summary (channel_id) VALUES (%s) ON DUPLICATE KEY UPDATE channel_id = channel_id", (channel_id,))
+    return cursor.rowcount == 1
+
+
+# Function to get the stored stats of videos before they are overwritten, as
+# {video_id: (title, views, likes, total_comments, duration_seconds)}
+def get_stored_video_stats(cursor, video_ids):
+    stored = {}
+    for start in range(0, len(video_ids), 1000):
+        batch = video_ids[start:start + 1000]
+        cursor.execute(
+            f"SELECT video_id, {', '.join(STORED_STATS_COLUMNS)} FROM video WHERE video_id IN (%s)" % ','.join(['%s'] * len(batch)),
+            tuple(batch)
+        )
+        stored.update((row[0], tuple(row[1:])) for row in cursor.fetchall())
+    return stored
+
+
+# Function to order candidates for a top video: a higher count wins, NULL loses, and on
+# equal counts the lower video_id wins. Python compares the code points of the IDs, which
+# orders them like SUMMARY_SELECT_QUERY's binary comparison of their UTF-8 bytes.
+def beats(value, video_id, top_value, top_video_id):
+    if top_video_id is None:
+        return True
+    if value is None or top_value is None:
+        return value is not None
+    return value > top_value or (value == top_value and video_id < top_video_id)
+
+
+def is_lower(value, previous):
+    return previous is not None and (value is None or value < previous)
+
+
+def to_int(value):
+    return int(value) if value is not None else 0
+
+
+# Function to fold saved videos into their channel's summary row, given the stats they
+# had before the save (missing for new videos) and the stats saved now, both keyed by
+# video_id. Must run on the cursor of the transaction that saved the videos, after
+# lock_channel_summary; created is what that returned.
+def update_channel_summary(cursor, channel_id, previous_stats, new_stats, created=False):
+    cursor.execute(f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM channel_summary WHERE channel_id = %s FOR UPDATE", (channel_id,))
+    row = cursor.fetchone()
+    if row is None or created:
+        # First save of the channel
+        rebuild_channel_summary(cursor, channel_id)
+        return
+
+    summary = dict(zip(SUMMARY_COLUMNS, row))
+    for video_id, (title, views, likes, total_comments, duration_seconds) in new_stats.items():
+        old = previous_stats.get(video_id)
+        if old is None:
+            summary["video_count"] += 1
+            old = (None, None, None, None, None)
+        summary["total_views"] += to_int(views) - to_int(old[1])
+        summary["duration_videos"] += (duration_seconds is not None) - (old[4] is not None)
+        summary["duration_seconds_total"] += to_int(duration_seconds) - to_int(old[4])
+
+        for count_column, value in (("likes", likes), ("total_comments", total_comments)):
+            id_column, title_column, value_column = TOP_VIDEO_COLUMNS[count_column]
+            if video_id == summary[id_column]:
+                if is_lower(value, summary[value_column]):
+                    # The top video itself dropped, so another video may lead now
+                    rebuild_channel_summary(cursor, channel_id)
+                    return
+                summary[title_column], summary[value_column] = title, value
+            elif beats(value, video_id, summary[value_column], summary[id_column]):
+                summary[id_column], summary[title_column], summary[value_column] = video_id, title, value
+
+    save_summary(cursor, summary)
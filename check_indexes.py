@@ -0,0 +1,88 @@
+# EXPLAIN-based check that the Analytics queries are served by indexes.
+#
+# Runs EXPLAIN for each query the Analytics page issues, using channels from the
+# .env database as parameters, and fails if any table is read with a full scan.
+# Very small tables may be full-scanned by choice of the optimizer, so run this
+# against realistic data.
+#
+#   python check_indexes.py [--channels 5]
+
+import argparse
+import sys
+from datetime import datetime
+
+from analytics_engine import PUBLISHED_IN_RANGE_QUERY, REPORT_FRAME_QUERY, SUMMARY_QUERY, TOP_VIEWED_QUERY
+from channel_catalog import CATALOG_QUERY
+from database import get_database_connection
+from paged_reports import PAGED_REPORTS, build_report_query
+from statistics_history import CHANNEL_GROWTH_QUERY, VIDEO_GROWTH_QUERY, get_window
+
+CHANNEL_VERSIONS_QUERY = "SELECT channel_id, data_version FROM channel WHERE channel_id IN (%s) ORDER BY channel_id;"
+
+
+# Function to build the (name, query, params) list of Analytics queries to explain
+def get_analytics_queries(channel_ids):
+    placeholders = ','.join(['%s'] * len(channel_ids))
+    # The catalog version query counts the whole channel table by design, at most once
+    # per CATALOG_REFRESH_SECONDS per server process, so it is not checked
+    queries = [
+        ("channel catalog", CATALOG_QUERY, None),
+        ("channel data versions", CHANNEL_VERSIONS_QUERY % placeholders, tuple(channel_ids)),
+        ("reports 2, 5, 7, 9, 10 summary", SUMMARY_QUERY % placeholders, tuple(channel_ids)),
+        ("reports 5, 10 frame", REPORT_FRAME_QUERY % placeholders, tuple(channel_ids)),
+        ("report 3 top viewed", TOP_VIEWED_QUERY % placeholders, tuple(channel_ids) + (10,)),
+        ("report 8 published in year", PUBLISHED_IN_RANGE_QUERY % placeholders, tuple(channel_ids) + (datetime(2022, 1, 1), datetime(2023, 1, 1))),
+    ]
+    for number, report in PAGED_REPORTS.items():
+        query, params = build_report_query(number, channel_ids, next(iter(report["sorts"])), limit=100)
+        queries.append((f"report {number} page", query, params))
+    window_start, _ = get_window(30)
+    growth_params = tuple(channel_ids) + (window_start,) + tuple(channel_ids) + (window_start,)
+    queries.append(("report 11 video growth", VIDEO_GROWTH_QUERY.format(channels=placeholders), growth_params))
+    queries.append(("report 12 subscriber growth", CHANNEL_GROWTH_QUERY.format(channels=placeholders), growth_params))
+    return queries
+
+
+# Function to EXPLAIN a query and return its plan rows as dicts
+def explain(cursor, query, params):
+    cursor.execute("EXPLAIN " + query.strip().rstrip(";"), params)
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+# A plan row is a full scan when it reads every row of a table without using any index;
+# reading a derived table materialized by the query itself does not count
+def is_full_scan(plan_row):
+    return plan_row.get("type") == "ALL" and not plan_row.get("key") and not str(plan_row.get("table")).startswith("<derived")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the Analytics queries use indexes.")
+    parser.add_argument("--channels", type=int, default=5, help="number of channels to use as query parameters")
+    args = parser.parse_args()
+
+    connection = get_database_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT channel_id FROM channel LIMIT %s", (args.channels,))
+        channel_ids = [row[0] for row in cursor.fetchall()] or ["-"]
+
+        failures = 0
+        for name, query, params in get_analytics_queries(channel_ids):
+            for plan_row in explain(cursor, query, params):
+                status = "FULL SCAN" if is_full_scan(plan_row) else "ok"
+                failures += status != "ok"
+                print(f"{name:<28} {str(plan_row.get('table')):<10} {str(plan_row.get('type')):<8} "
+                      f"{str(plan_row.get('key')):<28} rows={plan_row.get('rows')}  {status}")
+    finally:
+        cursor.close()
+        connection.close()
+
+    if failures:
+        print(f"{failures} table access(es) without an index.")
+        sys.exit(1)
+    print("All Analytics queries use indexes.")
+
+
+if __name__ == "__main__":
+    main()
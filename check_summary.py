@@ -0,0 +1,73 @@
+# Consistency check of the channel_summary table maintained at ingest.
+#
+# Recomputes every channel's summary from the video table, reports each channel whose
+# stored row differs (or is missing), then rebuilds the table from scratch in one
+# transaction. Exits with status 1 when any drift was found.
+#
+#   python check_summary.py              report drift and rebuild
+#   python check_summary.py --dry-run    only report drift
+
+import argparse
+import sys
+
+from channel_summary import SUMMARY_COLUMNS, compute_summaries, save_summary
+from database import get_database_connection
+
+
+# Function to compare stored summary rows with the recomputed ones; returns
+# (channel_id, column, stored, expected) for every differing value
+def find_drift(stored, expected):
+    drift = []
+    for channel_id, summary in expected.items():
+        row = stored.get(channel_id)
+        if row is None:
+            drift.append((channel_id, "(row)", "missing", "present"))
+            continue
+        for column in SUMMARY_COLUMNS[1:]:
+            if row[column] != summary[column]:
+                drift.append((channel_id, column, row[column], summary[column]))
+    for channel_id in stored.keys() - expected.keys():
+        drift.append((channel_id, "(row)", "present", "missing"))
+    return drift
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check channel_summary against the video table and rebuild it.")
+    parser.add_argument("--dry-run", action="store_true", help="only report drift, do not rebuild")
+    args = parser.parse_args()
+
+    connection = get_database_connection()
+    cursor = connection.cursor()
+    try:
+        # Lock the summary rows so ingests wait while it is compared and rebuilt
+        cursor.execute(f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM channel_summary FOR UPDATE")
+        stored = {row[0]: dict(zip(SUMMARY_COLUMNS, row)) for row in cursor.fetchall()}
+        expected = {summary["channel_id"]: summary for summary in compute_summaries(cursor)}
+
+        drift = find_drift(stored, expected)
+        for channel_id, column, stored_value, expected_value in drift:
+            print(f"{channel_id:<26} {column:<24} stored={stored_value!r:<24} expected={expected_value!r}")
+
+        if args.dry_run:
+            connection.rollback()
+        else:
+            cursor.execute("DELETE FROM channel_summary")
+            for summary in expected.values():
+                save_summary(cursor, summary)
+            connection.commit()
+            print(f"Rebuilt channel_summary for {len(expected)} channels.")
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+    if drift:
+        print(f"{len({row[0] for row in drift})} channel(s) had drifted.")
+        sys.exit(1)
+    print("channel_summary is consistent with the video table.")
+
+
+if __name__ == "__main__":
+    main()
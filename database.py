@@ -0,0 +1,244 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+import pandas as pd
+from dotenv import load_dotenv
+from mysql.connector import pooling
+from mysql.connector.errors import PoolError
+
+from metrics import instrumented, timed_query
+
+load_dotenv()
+
+# Number of video rows sent per executemany batch
+SAVE_CHUNK_SIZE = int(os.getenv("SAVE_CHUNK_SIZE", "1000"))
+
+# Process-wide connection pool settings; mysql-connector caps a pool at 32 connections
+DB_POOL_SIZE = min(int(os.getenv("DB_POOL_SIZE", "5")), pooling.CNX_POOL_MAXSIZE)
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
+# Assignments run in order, so catalog_changed_at compares the name before it is replaced
+UPSERT_CHANNEL_QUERY = """
+    INSERT INTO channel (channel_id, channel_name, description, subscriber_count, total_videos, total_views, channel_status, data_version)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, 1)
+    ON DUPLICATE KEY UPDATE
+        data_version = data_version + 1,
+        catalog_changed_at = IF(channel_name <=> VALUES(channel_name), catalog_changed_at, NOW(6)),
+        channel_name = VALUES(channel_name),
+        description = VALUES(description),
+        subscriber_count = VALUES(subscriber_count),
+        total_videos = VALUES(total_videos),
+        total_views = VALUES(total_views),
+        channel_status = VALUES(channel_status)
+"""
+
+UPSERT_VIDEO_QUERY = """
+    INSERT INTO video (video_id, channel_id, title, description, views, likes, total_comments, duration, published_at, duration_seconds)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        title = VALUES(title),
+        description = VALUES(description),
+        views = VALUES(views),
+        likes = VALUES(likes),
+        total_comments = VALUES(total_comments),
+        duration = VALUES(duration),
+        published_at = VALUES(published_at),
+        duration_seconds = VALUES(duration_seconds)
+"""
+
+ISO8601_DURATION_PATTERN = r"^P(?:(?P<days>\d+)D)?(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$"
+
+VIDEO_COLUMNS = ["Video ID", "Channel ID", "Title", "Description", "Views", "Likes", "Total Comments", "Duration", "Published Date & Time"]
+
+
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+_pool_stats = {
+    "checkouts": 0,
+    "in_use": 0,
+    "peak_in_use": 0,
+    "wait_seconds": 0.0,
+    "reconnects": 0,
+    "timeouts": 0,
+}
+
+
+# Function to get the MySQL connection settings from the .env file
+def get_connection_config():
+    return {
+        "host": os.getenv("HOST"),
+        "user": os.getenv("USER"),
+        "password": os.getenv("PASS"),
+        "database": os.getenv("DATABASE"),
+        "auth_plugin": 'mysql_native_password'
+    }
+
+
+# Function to open a connection to the MySQL database
+def get_database_connection():
+    return mysql.connector.connect(**get_connection_config())
+
+
+# Function to lazily create the connection pool shared by every Streamlit session and rerun.
+# Imported modules live for the whole server process, so a module global is process-wide.
+def get_connection_pool():
+    global _pool, _pool_slots
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool_slots = threading.BoundedSemaphore(DB_POOL_SIZE)
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name="yt_data_analysis",
+                    pool_size=DB_POOL_SIZE,
+                    pool_reset_session=True,
+                    **get_connection_config()
+                )
+    return _pool
+
+
+# Context manager that borrows a health-checked connection from the pool, waiting up to
+# DB_POOL_TIMEOUT seconds for a free one instead of failing as soon as the pool is empty
+@contextmanager
+def pooled_connection(timeout=DB_POOL_TIMEOUT):
+    pool = get_connection_pool()
+
+    started = time.perf_counter()
+    if not _pool_slots.acquire(timeout=timeout):
+        with _pool_lock:
+            _pool_stats["timeouts"] += 1
+        raise PoolError(f"No pooled connection available after {timeout} seconds")
+
+    try:
+        connection = pool.get_connection()
+        try:
+            # Connections idle past wait_timeout are dropped by the server; reconnect them
+            if not connection.is_connected():
+                connection.reconnect(attempts=2, delay=0)
+                with _pool_lock:
+                    _pool_stats["reconnects"] += 1
+
+            with _pool_lock:
+                _pool_stats["checkouts"] += 1
+                _pool_stats["wait_seconds"] += time.perf_counter() - started
+                _pool_stats["in_use"] += 1
+                _pool_stats["peak_in_use"] = max(_pool_stats["peak_in_use"], _pool_stats["in_use"])
+            try:
+                yield connection
+            finally:
+                with _pool_lock:
+                    _pool_stats["in_use"] -= 1
+        finally:
+            # Closing a pooled connection returns it to the pool
+            connection.close()
+    finally:
+        _pool_slots.release()
+
+
+# Generator that streams a query's rows in chunks through an unbuffered (server-side)
+# cursor, so a large result is never held in memory at once
+def stream_query(query, params=None, chunk_rows=10000):
+    with pooled_connection() as connection:
+        cursor = connection.cursor(buffered=False)
+        try:
+            with timed_query(query) as query_stats:
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_rows)
+                    if not rows:
+                        break
+                    query_stats["rows"] += len(rows)
+                    yield rows
+            connection.commit()
+        finally:
+            # An unbuffered result must be drained before the connection can be reused
+            if cursor.with_rows:
+                cursor.fetchall()
+            cursor.close()
+
+
+# Function to get a snapshot of the connection pool usage statistics
+def get_pool_stats():
+    with _pool_lock:
+        stats = dict(_pool_stats)
+    stats["pool_size"] = DB_POOL_SIZE
+    stats["created"] = _pool is not None
+    stats["avg_wait_ms"] = round(1000 * stats["wait_seconds"] / stats["checkouts"], 2) if stats["checkouts"] else 0.0
+    stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+    return stats
+
+
+# Function to convert ISO 8601 durations such as PT1H2M3S, PT45S or P1DT2H to seconds
+def parse_iso8601_durations(durations):
+    parts = pd.Series(durations, dtype="string").str.extract(ISO8601_DURATION_PATTERN).astype("float64")
+    seconds = (
+        parts["days"].fillna(0) * 86400
+        + parts["hours"].fillna(0) * 3600
+        + parts["minutes"].fillna(0) * 60
+        + parts["seconds"].fillna(0)
+    )
+    # Missing or unparseable durations stay NULL rather than counting as zero
+    return seconds.where(parts.notna().any(axis=1)).astype("Int64")
+
+
+# Function to convert video records into parameter tuples for UPSERT_VIDEO_QUERY,
+# normalizing counts and timestamps column-wise instead of row by row
+@instrumented("normalize_video_rows")
+def normalize_video_rows(video_data):
+    video_df = pd.DataFrame(video_data, columns=VIDEO_COLUMNS)
+    if video_df.empty:
+        return []
+
+    # ISO 8601 "2024-01-31T12:00:00Z" to MySQL "2024-01-31 12:00:00"
+    video_df["Published Date & Time"] = pd.to_datetime(
+        video_df["Published Date & Time"], format="%Y-%m-%dT%H:%M:%SZ"
+    ).dt.strftime("%Y-%m-%d %H:%M:%S")
+
+    # Durations are parsed once here so analytics can aggregate a numeric column
+    video_df["duration_seconds"] = parse_iso8601_durations(video_df["Duration"])
+
+    # "Not Available" counts are stored as NULL
+    for column in ["Views", "Likes", "Total Comments"]:
+        video_df[column] = pd.to_numeric(video_df[column], errors="coerce").astype("Int64")
+
+    video_df = video_df.astype(object).where(video_df.notna(), None)
+    return list(video_df.itertuples(index=False, name=None))
+
+
+# Function to convert an API count to an int, or None when it is missing or hidden
+def to_count(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# Function to upsert the channel row on an open cursor
+def upsert_channel(cursor, channel_data):
+    with timed_query(UPSERT_CHANNEL_QUERY, rows=1):
+        cursor.execute(UPSERT_CHANNEL_QUERY, (
+            channel_data["Channel ID"],
+            channel_data["Channel Name"],
+            channel_data["Description"],
+            to_count(channel_data["Subscriber Count"]),
+            to_count(channel_data["Total Videos"]),
+            to_count(channel_data["Total Views"]),
+            channel_data["Channel Status"]
+        ))
+
+
+# Function to bump a channel's data version so cached Analytics results for it are invalidated
+def bump_data_version(cursor, channel_id):
+    cursor.execute("UPDATE channel SET data_version = data_version + 1 WHERE channel_id = %s", (channel_id,))
+
+
+# Function to upsert video rows on an open cursor in executemany chunks
+def upsert_videos(cursor, video_rows, chunk_size=SAVE_CHUNK_SIZE):
+    for start in range(0, len(video_rows), chunk_size):
+        chunk = video_rows[start:start + chunk_size]
+        with timed_query(UPSERT_VIDEO_QUERY, rows=len(chunk)):
+            cursor.executemany(UPSERT_VIDEO_QUERY, chunk)
+    return len(video_rows)
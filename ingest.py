@@ -0,0 +1,456 @@
+# Channel ingestion: fetch from the YouTube Data API and write to MySQL.
+#
+# Videos flow through a generator pipeline, one API page (up to 50 videos) at a time:
+# list page -> enrich with statistics -> normalize -> write. Each page is committed
+# together with a checkpoint of the next page token, so memory is bounded by the page
+# size and an interrupted run resumes where it stopped instead of starting over.
+
+import os
+import threading
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from api_cache import get_response_cache
+from database import (SAVE_CHUNK_SIZE, bump_data_version, get_database_connection, normalize_video_rows,
+                      to_count, upsert_channel, upsert_videos)
+from channel_summary import get_stored_video_stats, lock_channel_summary, update_channel_summary
+from metrics import instrumented
+from quota_usage import MySQLQuotaStore
+from snapshot import SNAPSHOT_ENABLED, refresh_channel_snapshot
+from statistics_history import get_stored_channel_stats, record_channel_statistics, record_video_statistics
+from youtube_api import API_BASE_URL, QuotaExhaustedError, YouTubeAPIError, YouTubeClient, estimate_channel_quota
+
+load_dotenv()
+
+SHARED_QUOTA = os.getenv("YT_SHARED_QUOTA", "1") == "1"
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+# Function to get the API client shared by all sessions and worker threads of the process,
+# so the keep-alive connection pool and rate limiter are process-wide. The daily quota
+# budget is kept in MySQL and shared with every other process using the key, unless
+# YT_SHARED_QUOTA=0, which counts it per process.
+def get_youtube_client(api_key):
+    with _clients_lock:
+        if api_key not in _clients:
+            _clients[api_key] = YouTubeClient(
+                api_key,
+                requests_per_second=float(os.getenv("YT_REQUESTS_PER_SECOND", "10")),
+                daily_quota=int(os.getenv("YT_DAILY_QUOTA", "10000")),
+                max_retries=int(os.getenv("YT_MAX_RETRIES", "5")),
+                base_url=os.getenv("YT_API_BASE_URL", API_BASE_URL),
+                cache=get_response_cache(),
+                quota_store=MySQLQuotaStore(api_key) if SHARED_QUOTA else None
+            )
+        return _clients[api_key]
+
+
+# Function to fetch channel details from YouTube Data API
+@instrumented("get_channel_details")
+def get_channel_details(api_key, channel_id, client=None):
+    client = client or get_youtube_client(api_key)
+    data = client.get("channels", part="snippet,status,statistics,contentDetails", id=channel_id)
+    if not data.get("items"):
+        raise YouTubeAPIError(f"Channel {channel_id} not found")
+    channel_data = {
+        "Channel ID": channel_id,
+        "Channel Name": data["items"][0]["snippet"]["title"],
+        "Description": data["items"][0]["snippet"]["description"],
+        "Subscriber Count": data["items"][0]["statistics"].get("subscriberCount"),
+        "Total Videos": data["items"][0]["statistics"]["videoCount"],
+        "Total Views": data["items"][0]["statistics"]["viewCount"],
+        "Channel Status": data["items"][0]['status']['privacyStatus'],
+        "Uploads Playlist ID": data["items"][0]["contentDetails"]["relatedPlaylists"]["uploads"]
+    }
+    return channel_data
+
+
+# Function to fetch statistics and content details for a list of video IDs,
+# resolving up to 50 IDs per videos.list call
+@instrumented("get_video_statistics")
+def get_video_statistics(api_key, video_ids, client=None, part="statistics,contentDetails"):
+    client = client or get_youtube_client(api_key)
+    video_stats = {}
+
+    for start in range(0, len(video_ids), 50):
+        batch = video_ids[start:start + 50]
+        stats_data = client.get("videos", part=part, id=",".join(batch), maxResults=50)
+
+        # Missing or private videos are simply absent from the response
+        for item in stats_data.get("items", []):
+            video_stats[item["id"]] = item
+
+    return video_stats
+
+
+# Function to build a video record from its snippet fields and videos.list item
+def build_video_record(video_id, channel_id, title, description, published_at, stats_item):
+    if stats_item:
+        stats = stats_item.get("statistics", {})
+        duration = stats_item.get("contentDetails", {}).get("duration")
+    else:
+        stats = {"viewCount": "Not Available", "likeCount": "Not Available", "commentCount": "Not Available"}
+        duration = None
+
+    return {
+        "Video ID": video_id,
+        "Channel ID": channel_id,
+        "Title": title,
+        "Description": description,
+        "Views": stats.get("viewCount", "Not Available"),
+        "Likes": stats.get("likeCount", "Not Available"),
+        "Total Comments": stats.get("commentCount", "Not Available"),
+        "Duration":duration,
+        "Published Date & Time":published_at
+    }
+
+
+# Pipeline stage: search pages of a channel, newest first, as
+# ([(video_id, title, description, published_at)], next_page_token)
+def iter_search_pages(client, channel_id, page_token=None):
+    while True:
+        params = {"part": "snippet", "channelId": channel_id, "order": "date", "maxResults": 50}
+        if page_token:
+            params["pageToken"] = page_token
+        data = client.get("search", **params)
+
+        items = [
+            (item["id"]["videoId"], item["snippet"]["title"], item["snippet"]["description"], item["snippet"]["publishedAt"])
+            for item in data.get("items", [])
+            if "id" in item and "videoId" in item["id"]
+        ]
+        page_token = data.get("nextPageToken")
+        yield items, page_token
+        if not page_token:
+            break
+
+
+# Pipeline stage: uploads playlist pages, newest first, stopping at videos published before
+# stop_before. Unlike search this is not capped at ~500 results and costs 1 unit per page.
+def iter_playlist_pages(client, playlist_id, page_token=None, stop_before=None):
+    while True:
+        params = {"part": "snippet,contentDetails", "playlistId": playlist_id, "maxResults": 50}
+        if page_token:
+            params["pageToken"] = page_token
+        data = client.get("playlistItems", **params)
+
+        items = []
+        reached_stored = False
+        for item in data.get("items", []):
+            # Private and deleted videos have no videoPublishedAt and are skipped, like search does
+            published_at = item.get("contentDetails", {}).get("videoPublishedAt")
+            if not published_at:
+                continue
+            if stop_before and datetime.strptime(published_at, "%Y-%m-%dT%H:%M:%SZ") < stop_before:
+                reached_stored = True
+                break
+            items.append((item["contentDetails"]["videoId"], item["snippet"]["title"], item["snippet"]["description"], published_at))
+
+        page_token = None if reached_stored else data.get("nextPageToken")
+        yield items, page_token
+        if not page_token:
+            break
+
+
+# Pipeline stage: resolve each page's statistics with batched videos.list calls
+def enrich_pages(api_key, channel_id, pages, client):
+    for items, next_page_token in pages:
+        video_stats = get_video_statistics(api_key, [item[0] for item in items], client)
+        video_data = [
+            build_video_record(video_id, channel_id, title, description, published_at, video_stats.get(video_id))
+            for video_id, title, description, published_at in items
+        ]
+        yield video_data, next_page_token
+
+
+# Function to get the saved resume point of an interrupted ingest of a channel
+def get_checkpoint(channel_id, mode):
+    connection = get_database_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(
+            "SELECT page_token, stop_before, videos_saved FROM ingest_checkpoint WHERE channel_id = %s AND mode = %s",
+            (channel_id, mode)
+        )
+        row = cursor.fetchone()
+        cursor.close()
+    finally:
+        connection.close()
+    return {"page_token": row[0], "stop_before": row[1], "videos_saved": row[2]} if row else None
+
+
+# Function to save the resume point on an open cursor, in the same transaction as the page's videos
+def save_checkpoint(cursor, channel_id, mode, page_token, stop_before, videos_saved):
+    cursor.execute(
+        """
+        INSERT INTO ingest_checkpoint (channel_id, mode, page_token, stop_before, videos_saved)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            mode = VALUES(mode),
+            page_token = VALUES(page_token),
+            stop_before = VALUES(stop_before),
+            videos_saved = VALUES(videos_saved)
+        """,
+        (channel_id, mode, page_token, stop_before, videos_saved)
+    )
+
+
+# Function to remove a channel's resume point once its ingest has finished
+def clear_checkpoint(channel_id):
+    connection = get_database_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("DELETE FROM ingest_checkpoint WHERE channel_id = %s", (channel_id,))
+        connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+
+
+# Function to get the newest stored publish time of a channel's videos
+def get_latest_published_at(channel_id):
+    connection = get_database_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT MAX(published_at) FROM video WHERE channel_id = %s", (channel_id,))
+        latest_published_at = cursor.fetchone()[0]
+        cursor.close()
+    finally:
+        connection.close()
+    return latest_published_at
+
+
+# Function to count a channel's stored videos
+def get_stored_video_count(channel_id):
+    connection = get_database_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM video WHERE channel_id = %s", (channel_id,))
+        stored_videos = cursor.fetchone()[0]
+        cursor.close()
+    finally:
+        connection.close()
+    return stored_videos
+
+
+# Generator over a channel's stored video IDs in batches of batch_size, keyed on video_id,
+# only of videos published before published_before. Each batch's read transaction is
+# ended before it is yielded, so the caller can start a new transaction on the connection.
+def iter_stored_video_ids(connection, channel_id, published_before, batch_size=50):
+    last_video_id = ""
+    cursor = connection.cursor()
+    try:
+        while True:
+            cursor.execute(
+                "SELECT video_id FROM video WHERE channel_id = %s AND published_at < %s AND video_id > %s ORDER BY video_id LIMIT %s",
+                (channel_id, published_before, last_video_id, batch_size)
+            )
+            video_ids = [row[0] for row in cursor.fetchall()]
+            connection.rollback()
+            if not video_ids:
+                break
+            yield video_ids
+            last_video_id = video_ids[-1]
+    finally:
+        cursor.close()
+
+
+# Function to update only the statistics of a channel's stored videos from videos.list items,
+# in one transaction on the given connection
+def update_video_statistics(connection, channel_id, video_stats):
+    # Some private or restricted videos come back without a statistics part
+    video_values = [
+        (
+            to_count(item.get("statistics", {}).get("viewCount")),
+            to_count(item.get("statistics", {}).get("likeCount")),
+            to_count(item.get("statistics", {}).get("commentCount")),
+            video_id
+        )
+        for video_id, item in video_stats.items()
+    ]
+    if not video_values:
+        return 0
+
+    cursor = connection.cursor()
+    try:
+        summary_created = lock_channel_summary(cursor, channel_id)
+        previous_stats = get_stored_video_stats(cursor, [values[3] for values in video_values])
+        cursor.executemany("UPDATE video SET views = %s, likes = %s, total_comments = %s WHERE video_id = %s", video_values)
+        new_stats = {
+            video_id: (previous_stats[video_id][0], views, likes, total_comments, previous_stats[video_id][4])
+            for views, likes, total_comments, video_id in video_values
+            if video_id in previous_stats
+        }
+        update_channel_summary(cursor, channel_id, previous_stats, new_stats, summary_created)
+        record_video_statistics(cursor, previous_stats, new_stats)
+        bump_data_version(cursor, channel_id)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return len(video_values)
+
+
+# Function to refresh the statistics of a channel's stored videos published before
+# published_before, 50 IDs per call, on one database connection for the whole refresh
+@instrumented("refresh_video_statistics")
+def refresh_video_statistics(api_key, channel_id, published_before, client=None):
+    client = client or get_youtube_client(api_key)
+    refreshed = 0
+    connection = get_database_connection()
+    try:
+        for video_ids in iter_stored_video_ids(connection, channel_id, published_before):
+            video_stats = get_video_statistics(api_key, video_ids, client, part="statistics")
+            refreshed += update_video_statistics(connection, channel_id, video_stats)
+    finally:
+        connection.close()
+    return refreshed
+
+
+# Function to get the channel counts kept in the statistics history
+def get_channel_counts(channel_data):
+    return tuple(to_count(channel_data[key]) for key in ["Subscriber Count", "Total Videos", "Total Views"])
+
+
+# Function to save channel details and video data to the database in one transaction,
+# upserting videos in executemany chunks instead of a SELECT plus UPDATE/INSERT per video.
+# The channel's summary row and the statistics history are updated in the same
+# transaction. With a checkpoint (mode, next_page_token, stop_before, videos_saved) the
+# resume point is committed too.
+@instrumented("save_channel_details_to_database")
+def save_channel_details_to_database(channel_data, video_data, chunk_size=SAVE_CHUNK_SIZE, checkpoint=None):
+    video_rows = normalize_video_rows(video_data)
+
+    connection = get_database_connection()
+    cursor = connection.cursor()
+    try:
+        summary_created = lock_channel_summary(cursor, channel_data["Channel ID"])
+        previous_channel_stats = get_stored_channel_stats(cursor, channel_data["Channel ID"])
+        upsert_channel(cursor, channel_data)
+        record_channel_statistics(cursor, channel_data["Channel ID"], previous_channel_stats, get_channel_counts(channel_data))
+        previous_stats = get_stored_video_stats(cursor, [row[0] for row in video_rows])
+        upsert_videos(cursor, video_rows, chunk_size)
+        new_stats = {row[0]: (row[2], row[4], row[5], row[6], row[9]) for row in video_rows}
+        update_channel_summary(cursor, channel_data["Channel ID"], previous_stats, new_stats, summary_created)
+        record_video_statistics(cursor, previous_stats, new_stats)
+        if checkpoint:
+            save_checkpoint(cursor, channel_data["Channel ID"], *checkpoint)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+
+# Function to stream a channel's videos into the database page by page. Incremental mode
+# walks the uploads playlist down to the newest stored video; full mode walks search.
+# An unfinished run of the same mode resumes from its checkpoint. on_progress is called
+# with (videos_saved, page_videos) after every committed page. Returns the videos saved
+# and, for incremental mode, the publish time the listing stopped at (None on a first sync).
+def stream_channel_videos(api_key, channel_data, client=None, incremental=True, on_progress=None):
+    client = client or get_youtube_client(api_key)
+    channel_id = channel_data["Channel ID"]
+    mode = "incremental" if incremental else "full"
+
+    checkpoint = get_checkpoint(channel_id, mode)
+    if checkpoint:
+        page_token, stop_before, videos_saved = checkpoint["page_token"], checkpoint["stop_before"], checkpoint["videos_saved"]
+    else:
+        page_token, stop_before, videos_saved = None, None, 0
+        if incremental:
+            stop_before = get_latest_published_at(channel_id)
+
+    if incremental:
+        pages = iter_playlist_pages(client, channel_data["Uploads Playlist ID"], page_token, stop_before)
+    else:
+        pages = iter_search_pages(client, channel_id, page_token)
+
+    for video_data, next_page_token in enrich_pages(api_key, channel_id, pages, client):
+        videos_saved += len(video_data)
+        save_channel_details_to_database(channel_data, video_data, checkpoint=(mode, next_page_token, stop_before, videos_saved))
+        if on_progress:
+            on_progress(videos_saved, video_data)
+
+    clear_checkpoint(channel_id)
+    return videos_saved, stop_before
+
+
+# Function to save only the channel row and its statistics history, for a sync that
+# saved no page of videos
+def save_channel_statistics(channel_data):
+    connection = get_database_connection()
+    cursor = connection.cursor()
+    try:
+        previous_channel_stats = get_stored_channel_stats(cursor, channel_data["Channel ID"])
+        upsert_channel(cursor, channel_data)
+        record_channel_statistics(cursor, channel_data["Channel ID"], previous_channel_stats, get_channel_counts(channel_data))
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+
+# Function to incrementally sync a channel: save uploads newer than the newest stored video
+# and refresh only the statistics of videos already stored. The uploads saved by this run,
+# all published at or after the point the listing stopped at, already have fresh
+# statistics and are not fetched again; a first sync has nothing to refresh.
+def sync_channel(api_key, channel_data, client=None, refresh_stats=True, on_progress=None):
+    client = client or get_youtube_client(api_key)
+    new_videos, stop_before = stream_channel_videos(api_key, channel_data, client, incremental=True, on_progress=on_progress)
+    if not new_videos:
+        # The channel's counts are still recorded when it has no new uploads
+        save_channel_statistics(channel_data)
+
+    refreshed = 0
+    if refresh_stats and stop_before is not None:
+        refreshed = refresh_video_statistics(api_key, channel_data["Channel ID"], stop_before, client)
+
+    return new_videos, refreshed
+
+
+# Function to refuse a channel up front rather than running out of quota halfway through it
+def check_quota(client, channel_data, incremental=True):
+    if incremental:
+        quota_needed = estimate_channel_quota(channel_data["Total Videos"], "playlistItems", get_stored_video_count(channel_data["Channel ID"]))
+    else:
+        quota_needed = estimate_channel_quota(channel_data["Total Videos"], "search")
+    if not client.quota.can_afford(quota_needed):
+        raise QuotaExhaustedError(f"Needs about {quota_needed} quota units, {client.quota.remaining} left today")
+
+
+# Function to fetch and save a single channel, returning a summary row for the results table
+@instrumented("ingest_channel")
+def ingest_channel(api_key, channel_id, client=None, incremental=True, on_progress=None):
+    client = client or get_youtube_client(api_key)
+    try:
+        channel_data = get_channel_details(api_key, channel_id, client)
+        check_quota(client, channel_data, incremental)
+
+        if incremental:
+            videos_saved, refreshed = sync_channel(api_key, channel_data, client, on_progress=on_progress)
+        else:
+            videos_saved, refreshed = stream_channel_videos(api_key, channel_data, client, incremental=False, on_progress=on_progress)[0], 0
+        result = {"Channel ID": channel_id, "Channel Name": channel_data["Channel Name"], "Videos Saved": videos_saved, "Stats Refreshed": refreshed, "Status": "Success", "Error": ""}
+    except QuotaExhaustedError as e:
+        result = {"Channel ID": channel_id, "Channel Name": "", "Videos Saved": 0, "Stats Refreshed": 0, "Status": "Deferred", "Error": str(e)}
+    except Exception as e:
+        result = {"Channel ID": channel_id, "Channel Name": "", "Videos Saved": 0, "Stats Refreshed": 0, "Status": "Failed", "Error": str(e)}
+
+    # The columnar snapshot is refreshed once per channel rather than after every page,
+    # also after a failure since the pages committed before it are in the database
+    if SNAPSHOT_ENABLED:
+        try:
+            refresh_channel_snapshot([channel_id])
+        except Exception as e:
+            result["Error"] = "; ".join(filter(None, [result["Error"], f"Snapshot refresh failed: {e}"]))
+    return result
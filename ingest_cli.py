@@ -0,0 +1,175 @@
+# Headless channel ingestion for cron and scripts.
+#
+# Reads channel IDs (one per line or comma separated, "#" starts a comment) from a file
+# or stdin, ingests them across worker processes and prints a JSON summary. Progress
+# lines go to stderr. Only the standard library is imported up front; the ingest code
+# (pandas, MySQL, requests) is imported by the worker processes, so startup is fast.
+#
+#   python ingest_cli.py channels.txt --processes 8 --output summary.json
+#   cut -d, -f1 channels.csv | python ingest_cli.py --full
+#
+# Each channel is claimed as a running job in the ingest_job queue first, so a channel
+# that a job worker (or another run) is already ingesting is skipped rather than fetched
+# twice. The daily quota is counted in MySQL and shared with those processes.
+#
+# Exits with status 1 when any channel failed; channels deferred for lack of quota or
+# skipped because they were busy do not count as failures and are picked up by the next run.
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+# Function to collect unique channel IDs from lines of text, in input order
+def read_channel_ids(lines):
+    channel_ids = []
+    for line in lines:
+        line = line.split("#", 1)[0]
+        channel_ids += [channel_id.strip() for channel_id in line.split(",")]
+    return list(dict.fromkeys(channel_id for channel_id in channel_ids if channel_id))
+
+
+# Runs in each worker process before any ingest code is imported. Workers write no metrics
+# file: each returns its metrics with every result and the parent writes one file for all of
+# them. The request rate is split between the processes, so together they stay within
+# YT_REQUESTS_PER_SECOND.
+def init_worker(requests_per_second):
+    os.environ["METRICS_FILE"] = ""
+    os.environ["YT_REQUESTS_PER_SECOND"] = str(requests_per_second)
+
+
+# Function to ingest one channel as a job of the ingest_job queue, sending heartbeats while
+# it runs so job workers do not requeue it as stale
+def run_channel(channel_id, incremental):
+    from ingest import ingest_channel
+    from ingest_jobs import JOB_HEARTBEAT_SECONDS, finish_job, send_heartbeats, start_job
+
+    started = time.perf_counter()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}/cli"
+    job_id = start_job(channel_id, worker_id, incremental)
+    if job_id is None:
+        return {"Channel ID": channel_id, "Channel Name": "", "Videos Saved": 0, "Stats Refreshed": 0, "Status": "Skipped",
+                "Error": "Already queued or running as an ingest job", "Seconds": round(time.perf_counter() - started, 3)}
+
+    stopping = threading.Event()
+
+    def heartbeat():
+        while not stopping.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                send_heartbeats([job_id])
+            except Exception:
+                pass
+
+    heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+    heartbeat_thread.start()
+    try:
+        result = ingest_channel(os.getenv("API_KEY"), channel_id, incremental=incremental)
+    except Exception as e:
+        result = {"Channel ID": channel_id, "Channel Name": "", "Videos Saved": 0, "Stats Refreshed": 0, "Status": "Failed", "Error": str(e)}
+    finally:
+        stopping.set()
+        heartbeat_thread.join()
+    # The next run retries a deferred channel, so its job is not left queued for the job workers
+    finish_job(job_id, worker_id, result, requeue_deferred=False)
+    result["Seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+# Function to ingest one channel in a worker process, returning the metrics recorded for it
+# along with the result. A worker runs one channel at a time, so the metrics are reset first.
+def run_channel_in_worker(channel_id, incremental):
+    from metrics import metrics
+
+    metrics.reset()
+    result = run_channel(channel_id, incremental)
+    return result, metrics.snapshot()
+
+
+# Function to ingest the channels on a pool of processes, reporting each result as it finishes
+def run_channels(channel_ids, processes, incremental, on_result):
+    if processes == 1:
+        for channel_id in channel_ids:
+            on_result(run_channel(channel_id, incremental))
+        return
+
+    from metrics import metrics, start_metrics_writer
+    start_metrics_writer()
+
+    requests_per_second = float(os.getenv("YT_REQUESTS_PER_SECOND", "10")) / processes
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_worker, initargs=(requests_per_second,)) as executor:
+        futures = {executor.submit(run_channel_in_worker, channel_id, incremental): channel_id for channel_id in channel_ids}
+        for future in as_completed(futures):
+            try:
+                result, snapshot = future.result()
+                metrics.merge(snapshot)
+            except Exception as e:
+                # The worker process itself died; the channel is reported as failed
+                result = {"Channel ID": futures[future], "Channel Name": "", "Videos Saved": 0, "Stats Refreshed": 0, "Status": "Failed", "Error": str(e), "Seconds": None}
+            on_result(result)
+
+
+def build_summary(results, started_at, seconds):
+    statuses = [result["Status"] for result in results]
+    return {
+        "started_at": started_at,
+        "seconds": round(seconds, 3),
+        "channels": len(results),
+        "succeeded": statuses.count("Success"),
+        "deferred": statuses.count("Deferred"),
+        "skipped": statuses.count("Skipped"),
+        "failed": statuses.count("Failed"),
+        "videos_saved": sum(result["Videos Saved"] for result in results),
+        "stats_refreshed": sum(result["Stats Refreshed"] for result in results),
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest YouTube channels into MySQL without the Streamlit app.")
+    parser.add_argument("channels", nargs="?", default="-", help="file of channel IDs, or - for stdin (default)")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--full", action="store_true", help="re-fetch every video instead of an incremental sync")
+    parser.add_argument("--output", help="write the JSON summary to this file instead of stdout")
+    args = parser.parse_args()
+
+    if args.channels == "-":
+        channel_ids = read_channel_ids(sys.stdin)
+    else:
+        with open(args.channels, encoding="utf-8") as channels_file:
+            channel_ids = read_channel_ids(channels_file)
+    if not channel_ids:
+        parser.error("no channel IDs given")
+
+    # The .env file is only needed once there is work to do
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    started_at = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    started = time.perf_counter()
+    results = []
+
+    def on_result(result):
+        results.append(result)
+        print(f"[{len(results)}/{len(channel_ids)}] {result['Channel ID']} {result['Status']} "
+              f"videos={result['Videos Saved']} refreshed={result['Stats Refreshed']} {result['Error']}".rstrip(), file=sys.stderr)
+
+    run_channels(channel_ids, max(1, min(args.processes, len(channel_ids))), not args.full, on_result)
+
+    summary = json.dumps(build_summary(results, started_at, time.perf_counter() - started), indent=2, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(summary + "\n")
+    else:
+        print(summary)
+
+    sys.exit(1 if any(result["Status"] == "Failed" for result in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+# Background ingestion jobs: a persistent queue in the ingest_job table, worked by a pool
+# of threads so the Streamlit page only enqueues channels and polls their progress.
+#
+# There is at most one queued or running job per channel (enforced by a unique key), so
+# two users asking for the same channel share one fetch. Running jobs send heartbeats;
+# a job whose worker died is queued again and resumes from its ingest checkpoint. A job
+# deferred for lack of quota is queued again to run after the next quota reset.
+#
+#   python ingest_jobs.py --workers 4    run workers outside the Streamlit server
+
+import argparse
+import os
+import socket
+import threading
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+from database import get_database_connection
+from ingest import ingest_channel
+from youtube_api import next_quota_reset
+
+load_dotenv()
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "120"))
+
+# Set JOB_WORKERS_IN_APP=0 when the workers run as separate ingest_jobs.py processes
+JOB_WORKERS_IN_APP = os.getenv("JOB_WORKERS_IN_APP", "1") == "1"
+
+JOB_COLUMNS = ["job_id", "channel_id", "mode", "status", "channel_name", "videos_saved", "stats_refreshed",
+               "error", "attempts", "created_at", "started_at", "finished_at", "run_after"]
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# ingest_channel result status -> final job status
+RESULT_STATUSES = {"Success": "succeeded", "Deferred": "deferred", "Failed": "failed"}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# Function to run one statement on a short-lived connection and commit it; returns the cursor's
+# (rowcount, lastrowid) for writes or all rows for reads
+def run_statement(query, params=None, fetch=False):
+    connection = get_database_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(query, params)
+        result = cursor.fetchall() if fetch else (cursor.rowcount, cursor.lastrowid)
+        connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+    return result
+
+
+# Function to queue an ingest of a channel unless one is already queued or running;
+# returns (job_id, created) where job_id is the existing job's for a duplicate
+def enqueue_job(channel_id, incremental=True):
+    # On a duplicate active channel, LAST_INSERT_ID(job_id) reports the existing job's id
+    rowcount, job_id = run_statement(
+        """
+        INSERT INTO ingest_job (channel_id, mode) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE job_id = LAST_INSERT_ID(job_id)
+        """,
+        (channel_id, "incremental" if incremental else "full")
+    )
+    return job_id, rowcount == 1
+
+
+# Function to start a running job for a caller that ingests the channel itself, such as
+# ingest_cli, so job workers neither claim it nor start the same channel meanwhile;
+# returns the job_id, or None when the channel already has a queued or running job
+def start_job(channel_id, worker_id, incremental=True):
+    rowcount, job_id = run_statement(
+        """
+        INSERT INTO ingest_job (channel_id, mode, status, worker_id, attempts, started_at, heartbeat_at)
+        VALUES (%s, %s, 'running', %s, 1, NOW(), NOW())
+        ON DUPLICATE KEY UPDATE job_id = job_id
+        """,
+        (channel_id, "incremental" if incremental else "full", worker_id)
+    )
+    return job_id if rowcount == 1 else None
+
+
+def rows_to_jobs(rows):
+    return [dict(zip(JOB_COLUMNS, row)) for row in rows]
+
+
+# Function to get the current state of the given jobs, in the given order
+def get_jobs(job_ids):
+    if not job_ids:
+        return []
+    query = f"SELECT {', '.join(JOB_COLUMNS)} FROM ingest_job WHERE job_id IN (%s)" % ','.join(['%s'] * len(job_ids))
+    jobs = {job["job_id"]: job for job in rows_to_jobs(run_statement(query, tuple(job_ids), fetch=True))}
+    return [jobs[job_id] for job_id in job_ids if job_id in jobs]
+
+
+# Function to get the most recently created jobs of all users
+def get_recent_jobs(limit=20):
+    query = f"SELECT {', '.join(JOB_COLUMNS)} FROM ingest_job ORDER BY job_id DESC LIMIT %s"
+    return rows_to_jobs(run_statement(query, (limit,), fetch=True))
+
+
+# Function to claim the oldest queued job that is due for a worker; SKIP LOCKED lets
+# concurrent workers, in this or other processes, claim different jobs without waiting on each other
+def claim_job(worker_id):
+    connection = get_database_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("""
+            SELECT job_id, channel_id, mode FROM ingest_job
+            WHERE status = 'queued' AND (run_after IS NULL OR run_after <= UTC_TIMESTAMP())
+            ORDER BY job_id LIMIT 1 FOR UPDATE SKIP LOCKED
+            """)
+        row = cursor.fetchone()
+        if row:
+            cursor.execute(
+                """
+                UPDATE ingest_job
+                SET status = 'running', worker_id = %s, attempts = attempts + 1,
+                    started_at = NOW(), heartbeat_at = NOW(), error = NULL
+                WHERE job_id = %s
+                """,
+                (worker_id, row[0])
+            )
+        connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+    return {"job_id": row[0], "channel_id": row[1], "mode": row[2]} if row else None
+
+
+# Function to record a running job's progress, which also counts as a heartbeat
+def update_job_progress(job_id, videos_saved):
+    run_statement("UPDATE ingest_job SET videos_saved = %s, heartbeat_at = NOW() WHERE job_id = %s", (videos_saved, job_id))
+
+
+# Function to mark the running jobs of a worker pool as alive
+def send_heartbeats(job_ids):
+    if job_ids:
+        query = "UPDATE ingest_job SET heartbeat_at = NOW() WHERE status = 'running' AND job_id IN (%s)" % ','.join(['%s'] * len(job_ids))
+        run_statement(query, tuple(job_ids))
+
+
+# Function to store the outcome of a job from its ingest_channel result row, unless the
+# job was meanwhile requeued and claimed by another worker. With requeue_deferred a job
+# deferred for lack of quota is queued again to run after the next quota reset.
+def finish_job(job_id, worker_id, result, requeue_deferred=True):
+    if requeue_deferred and result["Status"] == "Deferred":
+        run_statement(
+            """
+            UPDATE ingest_job
+            SET status = 'queued', worker_id = NULL, error = %s, run_after = %s
+            WHERE job_id = %s AND worker_id = %s
+            """,
+            (f"Deferred until the quota resets: {result['Error']}", next_quota_reset(), job_id, worker_id)
+        )
+        return
+    run_statement(
+        """
+        UPDATE ingest_job
+        SET status = %s, channel_name = %s, videos_saved = %s, stats_refreshed = %s, error = %s, finished_at = NOW()
+        WHERE job_id = %s AND worker_id = %s
+        """,
+        (RESULT_STATUSES[result["Status"]], result["Channel Name"] or None, result["Videos Saved"],
+         result["Stats Refreshed"], result["Error"] or None, job_id, worker_id)
+    )
+
+
+# Function to queue again the running jobs whose worker stopped sending heartbeats
+def requeue_stale_jobs(stale_seconds=JOB_STALE_SECONDS):
+    rowcount, _ = run_statement(
+        "UPDATE ingest_job SET status = 'queued', worker_id = NULL WHERE status = 'running' AND heartbeat_at < NOW() - INTERVAL %s SECOND",
+        (stale_seconds,)
+    )
+    return rowcount
+
+
+# Pool of worker threads that claim and run queued jobs until stopped
+class JobWorkerPool:
+    def __init__(self, api_key, workers=JOB_WORKERS, poll_seconds=JOB_POLL_SECONDS):
+        self.api_key = api_key
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.name = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.running_jobs = set()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.threads = []
+
+    def start(self):
+        self.threads = [threading.Thread(target=self.work, args=(number,), name=f"ingest-worker-{number}", daemon=True) for number in range(self.workers)]
+        self.threads.append(threading.Thread(target=self.heartbeat, name="ingest-heartbeat", daemon=True))
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self, wait=True):
+        self.stopping.set()
+        if wait:
+            for thread in self.threads:
+                thread.join()
+
+    def heartbeat(self):
+        while not self.stopping.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                with self.lock:
+                    job_ids = list(self.running_jobs)
+                send_heartbeats(job_ids)
+                requeue_stale_jobs()
+            except Exception:
+                # The database may be briefly unavailable; try again on the next beat
+                pass
+
+    def work(self, number):
+        worker_id = f"{self.name}/{number}"
+        while not self.stopping.is_set():
+            try:
+                job = claim_job(worker_id)
+            except Exception:
+                job = None
+            if job is None:
+                self.stopping.wait(self.poll_seconds)
+                continue
+            self.run_job(job, worker_id)
+
+    def run_job(self, job, worker_id):
+        job_id = job["job_id"]
+        with self.lock:
+            self.running_jobs.add(job_id)
+
+        def on_progress(videos_saved, video_data):
+            update_job_progress(job_id, videos_saved)
+
+        try:
+            result = ingest_channel(self.api_key, job["channel_id"], incremental=job["mode"] == "incremental", on_progress=on_progress)
+            finish_job(job_id, worker_id, result)
+        except Exception as e:
+            # Leave the job running if even the failure cannot be recorded; it is requeued once stale
+            try:
+                finish_job(job_id, worker_id, {"Status": "Failed", "Channel Name": "", "Videos Saved": 0, "Stats Refreshed": 0, "Error": str(e)})
+            except Exception:
+                pass
+        finally:
+            with self.lock:
+                self.running_jobs.discard(job_id)
+
+
+# Function to start the process-wide worker pool once; later calls return the same pool
+def start_job_workers(api_key, workers=JOB_WORKERS):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = JobWorkerPool(api_key, workers).start()
+        return _pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background channel ingestion workers.")
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS, help="number of concurrent jobs")
+    args = parser.parse_args()
+
+    pool = start_job_workers(os.getenv("API_KEY"), args.workers)
+    print(f"Started {args.workers} ingestion workers as {pool.name}. Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Stopping after the running jobs finish...")
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
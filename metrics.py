@@ -0,0 +1,270 @@
+import atexit
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+# Prometheus text file scraped by monitoring (e.g. node_exporter's textfile collector);
+# an empty METRICS_FILE disables it
+METRICS_FILE = os.getenv("METRICS_FILE", "metrics/yt_data_analysis.prom")
+METRICS_WRITE_INTERVAL = float(os.getenv("METRICS_WRITE_INTERVAL", "15"))
+
+# SQL statements slower than SLOW_QUERY_MS are written to the slow query log
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "logs/slow_queries.log")
+SLOW_QUERY_HISTORY = 50
+
+slow_query_logger = logging.getLogger("yt_data_analysis.slow_queries")
+
+
+# Function to collapse a SQL statement to one line, with IN lists of any length written alike
+def normalize_sql(query):
+    query = " ".join(query.split())
+    return re.sub(r"IN \((?:%s,\s*)*%s\)", "IN (...)", query, flags=re.IGNORECASE)
+
+
+# Function to label a SQL statement by its verb, first table and a short hash of its text,
+# so every call of the same statement shares one metric series
+def query_label(query):
+    normalized = normalize_sql(query)
+    verb = normalized.split(" ", 1)[0].lower() if normalized else "query"
+    table = re.search(r"\b(?:FROM|INTO|UPDATE)\s+`?(\w+)", normalized, flags=re.IGNORECASE)
+    digest = hashlib.md5(normalized.encode("utf-8")).hexdigest()[:6]
+    return f"{verb} {table.group(1) if table else '-'} #{digest}"
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Thread-safe, process-wide registry of stage timings, HTTP calls, quota units and SQL
+# statements. Timings are kept as count/sum/max per series, like a Prometheus summary.
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.stages = {}
+            self.http = {}
+            self.queries = {}
+            self.slow_queries = deque(maxlen=SLOW_QUERY_HISTORY)
+            self.slow_query_count = 0
+
+    @staticmethod
+    def observe(series, seconds):
+        series["count"] += 1
+        series["seconds"] += seconds
+        series["max_seconds"] = max(series["max_seconds"], seconds)
+
+    def record_stage(self, stage, seconds, failed=False):
+        with self.lock:
+            series = self.stages.setdefault(stage, {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "errors": 0})
+            self.observe(series, seconds)
+            series["errors"] += int(failed)
+
+    def record_http(self, endpoint, status, seconds, response_bytes, quota_units):
+        with self.lock:
+            series = self.http.setdefault(endpoint, {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "bytes": 0, "quota_units": 0, "statuses": {}})
+            self.observe(series, seconds)
+            series["bytes"] += response_bytes
+            series["quota_units"] += quota_units
+            series["statuses"][status] = series["statuses"].get(status, 0) + 1
+
+    def record_query(self, query, seconds, rows):
+        label = query_label(query)
+        with self.lock:
+            series = self.queries.setdefault(label, {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0, "sql": normalize_sql(query)[:300]})
+            self.observe(series, seconds)
+            series["rows"] += rows
+            slow = seconds * 1000 >= SLOW_QUERY_MS
+            if slow:
+                self.slow_query_count += 1
+                self.slow_queries.append({"time": time.strftime("%Y-%m-%d %H:%M:%S"), "query": label, "ms": round(seconds * 1000, 1), "rows": rows, "sql": series["sql"]})
+        if slow:
+            log_slow_query(label, seconds, rows, normalize_sql(query))
+
+    # Function to get a copy of every series for display
+    def snapshot(self):
+        with self.lock:
+            return {
+                "stages": {stage: dict(series) for stage, series in self.stages.items()},
+                "http": {endpoint: dict(series, statuses=dict(series["statuses"])) for endpoint, series in self.http.items()},
+                "queries": {label: dict(series) for label, series in self.queries.items()},
+                "slow_queries": list(self.slow_queries),
+                "slow_query_count": self.slow_query_count,
+            }
+
+    # Function to add a snapshot taken in another process (e.g. an ingest_cli worker) to
+    # these series, so one process can write the metrics file for all of them
+    def merge(self, snapshot):
+        def add(series_by_key, key, other):
+            series = series_by_key.get(key)
+            if series is None:
+                series_by_key[key] = dict(other, statuses=dict(other["statuses"])) if "statuses" in other else dict(other)
+                return
+            for field, value in other.items():
+                if field == "max_seconds":
+                    series[field] = max(series[field], value)
+                elif field == "statuses":
+                    for status, count in value.items():
+                        series[field][status] = series[field].get(status, 0) + count
+                elif field != "sql":
+                    series[field] += value
+
+        with self.lock:
+            for stage, other in snapshot["stages"].items():
+                add(self.stages, stage, other)
+            for endpoint, other in snapshot["http"].items():
+                add(self.http, endpoint, other)
+            for label, other in snapshot["queries"].items():
+                add(self.queries, label, other)
+            self.slow_queries.extend(snapshot["slow_queries"])
+            self.slow_query_count += snapshot["slow_query_count"]
+
+    # Function to render every series in the Prometheus text exposition format
+    def render_prometheus(self):
+        snapshot = self.snapshot()
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                label_text = ",".join(f'{key}="{escape_label(label)}"' for key, label in labels.items())
+                lines.append(f"{name}{suffix}{{{label_text}}} {value}" if label_text else f"{name}{suffix} {value}")
+
+        def summary(series_by_key, key):
+            samples = []
+            for label, series in sorted(series_by_key.items()):
+                samples.append(("_count", {key: label}, series["count"]))
+                samples.append(("_sum", {key: label}, round(series["seconds"], 6)))
+            return samples
+
+        stages, http, queries = snapshot["stages"], snapshot["http"], snapshot["queries"]
+        family("yt_stage_seconds", "summary", "Time spent in instrumented ingestion and analytics stages.", summary(stages, "stage"))
+        family("yt_stage_max_seconds", "gauge", "Slowest single call of each stage.",
+               [("", {"stage": stage}, round(series["max_seconds"], 6)) for stage, series in sorted(stages.items())])
+        family("yt_stage_errors_total", "counter", "Calls of each stage that raised.",
+               [("", {"stage": stage}, series["errors"]) for stage, series in sorted(stages.items())])
+        family("yt_http_requests_total", "counter", "YouTube Data API requests by endpoint and HTTP status.",
+               [("", {"endpoint": endpoint, "status": status}, count)
+                for endpoint, series in sorted(http.items()) for status, count in sorted(series["statuses"].items(), key=lambda item: str(item[0]))])
+        family("yt_http_request_seconds", "summary", "YouTube Data API request latency.", summary(http, "endpoint"))
+        family("yt_http_response_bytes_total", "counter", "YouTube Data API response bytes.",
+               [("", {"endpoint": endpoint}, series["bytes"]) for endpoint, series in sorted(http.items())])
+        family("yt_quota_units_total", "counter", "YouTube Data API quota units spent.",
+               [("", {"endpoint": endpoint}, series["quota_units"]) for endpoint, series in sorted(http.items())])
+        family("yt_sql_query_seconds", "summary", "SQL statement latency.", summary(queries, "query"))
+        family("yt_sql_query_max_seconds", "gauge", "Slowest single execution of each SQL statement.",
+               [("", {"query": label}, round(series["max_seconds"], 6)) for label, series in sorted(queries.items())])
+        family("yt_sql_rows_total", "counter", "Rows returned or written by each SQL statement.",
+               [("", {"query": label}, series["rows"]) for label, series in sorted(queries.items())])
+        family("yt_sql_slow_queries_total", "counter", f"SQL statements slower than {SLOW_QUERY_MS:g} ms.",
+               [("", {}, snapshot["slow_query_count"])])
+        lines.append("# HELP yt_process_start_time_seconds Start time of the process since the epoch.")
+        lines.append("# TYPE yt_process_start_time_seconds gauge")
+        lines.append(f"yt_process_start_time_seconds {self.started:.0f}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+_writer = None
+_writer_lock = threading.Lock()
+_slow_log_handler = None
+
+
+# Function to append a slow statement to SLOW_QUERY_LOG, opening the log on first use
+def log_slow_query(label, seconds, rows, sql):
+    global _slow_log_handler
+    if not SLOW_QUERY_LOG:
+        return
+    with _writer_lock:
+        if _slow_log_handler is None:
+            os.makedirs(os.path.dirname(SLOW_QUERY_LOG) or ".", exist_ok=True)
+            _slow_log_handler = logging.FileHandler(SLOW_QUERY_LOG, encoding="utf-8")
+            _slow_log_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            slow_query_logger.addHandler(_slow_log_handler)
+            slow_query_logger.setLevel(logging.WARNING)
+            slow_query_logger.propagate = False
+    slow_query_logger.warning("%.1f ms rows=%d [%s] %s", seconds * 1000, rows, label, sql)
+
+
+# Function to write the metrics file atomically, so a scrape never reads half a file
+def write_metrics_file(path=METRICS_FILE):
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as metrics_file:
+        metrics_file.write(metrics.render_prometheus())
+    os.replace(temp_path, path)
+
+
+def write_metrics_periodically():
+    while True:
+        time.sleep(METRICS_WRITE_INTERVAL)
+        try:
+            write_metrics_file()
+        except OSError:
+            pass
+
+
+# Function to start the background thread that rewrites the metrics file every
+# METRICS_WRITE_INTERVAL seconds; the file is also written once more at exit
+def start_metrics_writer():
+    global _writer
+    if not METRICS_FILE:
+        return
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=write_metrics_periodically, name="metrics-writer", daemon=True)
+            _writer.start()
+            atexit.register(write_metrics_file)
+
+
+# Context manager that records the duration of a stage, counting it as an error if it raises
+@contextmanager
+def timed(stage):
+    start_metrics_writer()
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        metrics.record_stage(stage, time.perf_counter() - started, failed)
+
+
+# Decorator that times every call of a function as a stage named after it
+def instrumented(stage):
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Function to time one SQL statement executed on a cursor; rows is the number of rows
+# it returned or, for writes, the rows sent
+@contextmanager
+def timed_query(query, rows=None):
+    start_metrics_writer()
+    started = time.perf_counter()
+    result = {"rows": rows or 0}
+    try:
+        yield result
+    finally:
+        metrics.record_query(query, time.perf_counter() - started, result["rows"])
@@ -0,0 +1,106 @@
+# Versioned schema migrations for the channel and video tables.
+#
+# Migrations live in migrations/ as NNNN_description.sql or NNNN_description.py and
+# are applied in version order. Applied versions are recorded in schema_migrations,
+# so running this again only applies what is new.
+#
+#   python migrate.py            apply pending migrations
+#   python migrate.py --status   list applied and pending migrations
+
+import argparse
+import importlib.util
+import os
+import re
+
+from database import get_database_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d{4})_[\w-]+\.(sql|py)$")
+
+
+# Function to list the migration files as (version, name, path) in version order
+def get_migrations():
+    migrations = []
+    for name in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILE_PATTERN.match(name)
+        if match:
+            migrations.append((match.group(1), name, os.path.join(MIGRATIONS_DIR, name)))
+    return migrations
+
+
+# Function to get the versions already applied, creating the bookkeeping table if needed
+def get_applied_versions(connection):
+    cursor = connection.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version CHAR(4) PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    applied = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return applied
+
+
+# Function to split a .sql migration into statements, dropping "--" comment lines
+def split_sql_statements(sql):
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+
+# Function to apply one migration file and record it
+def apply_migration(connection, version, name, path):
+    if path.endswith(".sql"):
+        with open(path) as sql_file:
+            statements = split_sql_statements(sql_file.read())
+        cursor = connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+    else:
+        spec = importlib.util.spec_from_file_location(f"migration_{version}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.migrate(connection)
+
+    cursor = connection.cursor()
+    cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+    connection.commit()
+    cursor.close()
+
+
+# Function to apply every pending migration in order, stopping at the first failure
+def migrate(connection):
+    applied = get_applied_versions(connection)
+    pending = [migration for migration in get_migrations() if migration[0] not in applied]
+    for version, name, path in pending:
+        print(f"Applying {name} ...")
+        apply_migration(connection, version, name, path)
+    print(f"{len(pending)} migration(s) applied, schema is up to date.")
+
+
+def show_status(connection):
+    applied = get_applied_versions(connection)
+    for version, name, _ in get_migrations():
+        print(f"{'applied' if version in applied else 'pending':<8} {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations to the .env database.")
+    parser.add_argument("--status", action="store_true", help="list applied and pending migrations")
+    args = parser.parse_args()
+
+    connection = get_database_connection()
+    try:
+        if args.status:
+            show_status(connection)
+        else:
+            migrate(connection)
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+-- Store each video's duration as whole seconds, parsed once at ingest,
+-- so analytics can aggregate it in SQL instead of parsing ISO 8601 strings.
+ALTER TABLE video ADD COLUMN duration_seconds INT UNSIGNED NULL AFTER duration;
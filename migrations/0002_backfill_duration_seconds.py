@@ -0,0 +1,36 @@
+# Backfill duration_seconds for videos saved before it was parsed at ingest.
+# Rows are read and updated in batches keyed on video_id so memory stays flat.
+
+import pandas as pd
+
+from database import SAVE_CHUNK_SIZE, parse_iso8601_durations
+
+
+def migrate(connection):
+    cursor = connection.cursor()
+    last_video_id = ""
+    while True:
+        cursor.execute(
+            """
+            SELECT video_id, duration FROM video
+            WHERE video_id > %s AND duration_seconds IS NULL AND duration IS NOT NULL
+            ORDER BY video_id
+            LIMIT %s
+            """,
+            (last_video_id, SAVE_CHUNK_SIZE)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+
+        seconds = parse_iso8601_durations([row[1] for row in rows])
+        updates = [
+            (int(value), row[0])
+            for row, value in zip(rows, seconds)
+            if pd.notna(value)
+        ]
+        if updates:
+            cursor.executemany("UPDATE video SET duration_seconds = %s WHERE video_id = %s", updates)
+        connection.commit()
+        last_video_id = rows[-1][0]
+    cursor.close()
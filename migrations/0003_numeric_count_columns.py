@@ -0,0 +1,32 @@
+# Convert the count columns to nullable BIGINT so they sort numerically and can be
+# indexed. Values that are not plain digits (the old "Not Available" placeholder)
+# become NULL first. Columns that are already BIGINT are left alone.
+
+COUNT_COLUMNS = {
+    "video": ["views", "likes", "total_comments"],
+    "channel": ["subscriber_count", "total_videos", "total_views"],
+}
+
+
+def migrate(connection):
+    cursor = connection.cursor()
+    for table, columns in COUNT_COLUMNS.items():
+        cursor.execute(
+            """
+            SELECT column_name, data_type FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s
+            """,
+            (table,)
+        )
+        data_types = {row[0].lower(): row[1].lower() for row in cursor.fetchall()}
+        pending = [column for column in columns if data_types.get(column) != "bigint"]
+        if not pending:
+            continue
+
+        # Relax to nullable text first so placeholders can be cleared whatever the current type
+        cursor.execute(f"ALTER TABLE {table} " + ", ".join(f"MODIFY {column} VARCHAR(32) NULL" for column in pending))
+        for column in pending:
+            cursor.execute(f"UPDATE {table} SET {column} = NULL WHERE {column} NOT REGEXP '^[0-9]+$'")
+        connection.commit()
+        cursor.execute(f"ALTER TABLE {table} " + ", ".join(f"MODIFY {column} BIGINT UNSIGNED NULL" for column in pending))
+    cursor.close()
@@ -0,0 +1,8 @@
+-- Indexes behind the Analytics page lookups: channels are selected by name, videos
+-- are reached by channel and ranked by views, likes and comments, and report 8
+-- filters on a published_at range.
+CREATE INDEX idx_channel_name ON channel (channel_name);
+CREATE INDEX idx_video_channel_views ON video (channel_id, views);
+CREATE INDEX idx_video_channel_likes ON video (channel_id, likes);
+CREATE INDEX idx_video_channel_comments ON video (channel_id, total_comments);
+CREATE INDEX idx_video_published_at ON video (published_at);
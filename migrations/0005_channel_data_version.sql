@@ -0,0 +1,3 @@
+-- Per-channel data version, bumped by every save of the channel or its videos.
+-- Analytics result cache keys include it, so an ingest invalidates cached reports.
+ALTER TABLE channel ADD COLUMN data_version BIGINT UNSIGNED NOT NULL DEFAULT 0;
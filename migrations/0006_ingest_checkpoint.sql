@@ -0,0 +1,10 @@
+-- Resume point of an unfinished channel ingest: the next API page token, committed
+-- in the same transaction as the videos of the page before it.
+CREATE TABLE IF NOT EXISTS ingest_checkpoint (
+    channel_id VARCHAR(64) PRIMARY KEY,
+    mode VARCHAR(16) NOT NULL,
+    page_token VARCHAR(255) NULL,
+    stop_before DATETIME NULL,
+    videos_saved INT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
@@ -0,0 +1,23 @@
+-- Persistent queue of channel ingests run by background workers. active_channel_id is
+-- only set while a job is queued or running, so its unique key allows one active job
+-- per channel while keeping any number of finished ones.
+CREATE TABLE IF NOT EXISTS ingest_job (
+    job_id BIGINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    channel_id VARCHAR(64) NOT NULL,
+    mode VARCHAR(16) NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'queued',
+    active_channel_id VARCHAR(64) GENERATED ALWAYS AS (IF(status IN ('queued', 'running'), channel_id, NULL)) STORED,
+    channel_name VARCHAR(255) NULL,
+    videos_saved INT UNSIGNED NOT NULL DEFAULT 0,
+    stats_refreshed INT UNSIGNED NOT NULL DEFAULT 0,
+    error TEXT NULL,
+    worker_id VARCHAR(128) NULL,
+    attempts INT UNSIGNED NOT NULL DEFAULT 0,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME NULL,
+    heartbeat_at DATETIME NULL,
+    finished_at DATETIME NULL,
+    UNIQUE KEY uq_ingest_job_active_channel (active_channel_id),
+    KEY idx_ingest_job_status (status, job_id),
+    KEY idx_ingest_job_channel (channel_id, job_id)
+);
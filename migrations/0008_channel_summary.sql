@@ -0,0 +1,16 @@
+-- Per-channel aggregates behind reports 2, 5, 7, 9 and 10, maintained by every save of
+-- a channel's videos so those reports read one row per selected channel.
+CREATE TABLE IF NOT EXISTS channel_summary (
+    channel_id VARCHAR(64) PRIMARY KEY,
+    video_count INT UNSIGNED NOT NULL DEFAULT 0,
+    total_views BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    duration_videos INT UNSIGNED NOT NULL DEFAULT 0,
+    duration_seconds_total BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    top_liked_video_id VARCHAR(64) NULL,
+    top_liked_title VARCHAR(255) NULL,
+    top_liked_likes BIGINT UNSIGNED NULL,
+    top_commented_video_id VARCHAR(64) NULL,
+    top_commented_title VARCHAR(255) NULL,
+    top_commented_comments BIGINT UNSIGNED NULL,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
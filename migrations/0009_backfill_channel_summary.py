@@ -0,0 +1,11 @@
+# Build channel_summary for the channels saved before it was maintained at ingest.
+
+from channel_summary import compute_summaries, save_summary
+
+
+def migrate(connection):
+    cursor = connection.cursor()
+    for summary in compute_summaries(cursor):
+        save_summary(cursor, summary)
+    connection.commit()
+    cursor.close()
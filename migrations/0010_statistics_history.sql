@@ -0,0 +1,28 @@
+-- Append-only history of video and channel counts. A row is written only when a count
+-- changed since the previous row of the same video or channel, so the tables grow with
+-- the number of changes rather than the number of syncs. The primary keys cluster each
+-- video's or channel's rows in time order for the growth reports.
+CREATE TABLE IF NOT EXISTS video_statistics_history (
+    video_id VARCHAR(64) NOT NULL,
+    recorded_at DATETIME NOT NULL,
+    views BIGINT UNSIGNED NULL,
+    likes BIGINT UNSIGNED NULL,
+    total_comments BIGINT UNSIGNED NULL,
+    PRIMARY KEY (video_id, recorded_at)
+);
+
+CREATE TABLE IF NOT EXISTS channel_statistics_history (
+    channel_id VARCHAR(64) NOT NULL,
+    recorded_at DATETIME NOT NULL,
+    subscriber_count BIGINT UNSIGNED NULL,
+    total_videos BIGINT UNSIGNED NULL,
+    total_views BIGINT UNSIGNED NULL,
+    PRIMARY KEY (channel_id, recorded_at)
+);
+
+-- The counts stored so far become the first snapshot
+INSERT IGNORE INTO video_statistics_history (video_id, recorded_at, views, likes, total_comments)
+SELECT video_id, UTC_TIMESTAMP(), views, likes, total_comments FROM video;
+
+INSERT IGNORE INTO channel_statistics_history (channel_id, recorded_at, subscriber_count, total_videos, total_views)
+SELECT channel_id, UTC_TIMESTAMP(), subscriber_count, total_videos, total_views FROM channel;
@@ -0,0 +1,9 @@
+-- Quota units spent per API key and quota day (Pacific Time), shared by every process
+-- that calls the API with the key: the Streamlit server, job workers and ingest_cli runs.
+-- Keys are stored as SHA-256 hashes.
+CREATE TABLE IF NOT EXISTS api_quota_usage (
+    api_key_hash CHAR(64) NOT NULL,
+    quota_day DATE NOT NULL,
+    used_units INT UNSIGNED NOT NULL DEFAULT 0,
+    PRIMARY KEY (api_key_hash, quota_day)
+);
@@ -0,0 +1,8 @@
+-- Per-channel catalog change time, set only when a channel is added or renamed. The
+-- Analytics channel catalog is reloaded when the channel count or the latest change time
+-- changes, so statistics refreshes, which bump data_version on every ingest page, no
+-- longer reload it. The time only moves forward, so a channel deleted and another added
+-- still changes the version; the index makes MAX() a single index lookup.
+ALTER TABLE channel
+    ADD COLUMN catalog_changed_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    ADD INDEX idx_channel_catalog_changed_at (catalog_changed_at);
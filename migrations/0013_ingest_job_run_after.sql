@@ -0,0 +1,3 @@
+-- Earliest time (UTC) a queued job may be claimed. A job deferred for lack of quota is
+-- queued again with run_after set to the next quota reset instead of finishing.
+ALTER TABLE ingest_job ADD COLUMN run_after DATETIME NULL;
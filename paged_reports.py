@@ -0,0 +1,224 @@
+import csv
+import importlib.util
+import os
+import time
+
+import pandas as pd
+
+# Reports with one row per video are paged at the database instead of loaded whole
+REPORT_PAGE_SIZE = int(os.getenv("REPORT_PAGE_SIZE", "100"))
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "10000"))
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+# Streamlit holds a download in memory, so larger exports are only kept on the server,
+# for EXPORT_MAX_AGE_HOURS like every export left behind
+EXPORT_DOWNLOAD_MAX_MB = float(os.getenv("EXPORT_DOWNLOAD_MAX_MB", "100"))
+EXPORT_MAX_AGE_HOURS = float(os.getenv("EXPORT_MAX_AGE_HOURS", "24"))
+
+# Parquet exports need the optional pyarrow package
+EXPORT_FORMATS = ["csv"] + (["parquet"] if importlib.util.find_spec("pyarrow") else [])
+
+# Output columns (label, SQL expression, export type) and sortable columns of each paged
+# report. Sorts are plain columns, so the keyset condition and ORDER BY can use the
+# (channel_id, count) indexes; NULLs sort first ascending and last descending, as in MySQL.
+# frame_sorts are the same sorts as columns of a snapshot report frame.
+PAGED_REPORTS = {
+    1: {
+        "columns": [("Video Title", "v.title", "string"), ("Channel Name", "c.channel_name", "string")],
+        "sorts": {"Video Title": "v.title", "Channel Name": "c.channel_name"},
+        "frame_sorts": {"Video Title": "title", "Channel Name": "channel_name"},
+        "count_column": None,
+    },
+    4: {
+        "columns": [("Video Title", "v.title", "string"), ("Number of Comments", "v.total_comments", "int64")],
+        "sorts": {"Number of Comments": "v.total_comments", "Video Title": "v.title"},
+        "frame_sorts": {"Number of Comments": "total_comments", "Video Title": "title"},
+        "count_column": "v.total_comments",
+    },
+    6: {
+        "columns": [("Video Title", "v.title", "string"), ("Total Likes", "v.likes", "int64")],
+        "sorts": {"Total Likes": "v.likes", "Video Title": "v.title"},
+        "frame_sorts": {"Total Likes": "likes", "Video Title": "title"},
+        "count_column": "v.likes",
+    },
+}
+
+
+# Function to escape LIKE wildcards so a title filter matches literally
+def escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# Function to build the condition selecting the rows after a keyset cursor (sort value,
+# video_id) in ORDER BY sort_column, video_id. A NULL sort value never compares, so rows
+# with NULL keys are matched with IS NULL / IS NOT NULL instead.
+def build_keyset_condition(sort_column, descending, after):
+    value, video_id = after
+    if value is None:
+        if descending:
+            # NULLs come last: only the rest of the NULL keys follow
+            return f"({sort_column} IS NULL AND v.video_id < %s)", [video_id]
+        # NULLs come first: the rest of the NULL keys and then every other row follow
+        return f"({sort_column} IS NOT NULL OR v.video_id > %s)", [video_id]
+    if descending:
+        return f"({sort_column} < %s OR ({sort_column} = %s AND v.video_id < %s) OR {sort_column} IS NULL)", [value, value, video_id]
+    return f"({sort_column} > %s OR ({sort_column} = %s AND v.video_id > %s))", [value, value, video_id]
+
+
+# Function to build a report query for the selected channel IDs with optional filters, keyset
+# cursor and limit. Rows are ordered by the sort column with video_id as tie-breaker, and
+# carry both as trailing columns so the last row of a page is the next page's cursor.
+def build_report_query(number, channel_ids, sort_by, descending=False, title_filter="", min_count=None, after=None, limit=None):
+    report = PAGED_REPORTS[number]
+    sort_column = report["sorts"][sort_by]
+    direction = "DESC" if descending else "ASC"
+
+    select = ", ".join(f"{expression} AS '{label}'" for label, expression, _ in report["columns"])
+    conditions = ["v.channel_id IN (%s)" % ','.join(['%s'] * len(channel_ids))]
+    params = list(channel_ids)
+
+    if title_filter:
+        conditions.append("v.title LIKE %s")
+        params.append(f"%{escape_like(title_filter)}%")
+    if min_count is not None and report["count_column"]:
+        conditions.append(f"{report['count_column']} >= %s")
+        params.append(min_count)
+    if after is not None:
+        condition, condition_params = build_keyset_condition(sort_column, descending, after)
+        conditions.append(condition)
+        params += condition_params
+
+    query = f"""
+        SELECT {select}, {sort_column} AS sort_key, v.video_id
+        FROM video v
+        JOIN channel c ON v.channel_id = c.channel_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {sort_column} {direction}, v.video_id {direction}
+    """
+    if limit is not None:
+        query += f" LIMIT {int(limit)}"
+    return query, tuple(params)
+
+
+# Function to fetch one page of a report; returns the rows, the cursor of the next page
+# (None on the last page) and the output column names
+def fetch_report_page(execute_query, number, channel_ids, sort_by, descending=False, title_filter="", min_count=None, after=None, page_size=REPORT_PAGE_SIZE):
+    query, params = build_report_query(number, channel_ids, sort_by, descending, title_filter, min_count, after, page_size + 1)
+    rows = execute_query(query, params)
+    if rows is None:
+        return None, None, None
+
+    # One extra row is fetched only to learn whether another page follows
+    next_cursor = tuple(rows[page_size - 1][-2:]) if len(rows) > page_size else None
+    columns = [label for label, _, _ in PAGED_REPORTS[number]["columns"]]
+    return [row[:-2] for row in rows[:page_size]], next_cursor, columns
+
+
+# Function to get the report frame column behind a SQL expression such as "v.title"
+def frame_column(expression):
+    return expression.split(".", 1)[1]
+
+
+# Function to filter and order a report frame (see analytics_engine) like build_report_query,
+# for reports read from the columnar snapshot. Returns the output columns followed by
+# sort_key and video_id, the same shape as the query rows.
+def select_report_rows(frame, number, sort_by, descending=False, title_filter="", min_count=None, after=None):
+    report = PAGED_REPORTS[number]
+    videos = frame[frame["video_id"].notna()]
+
+    if title_filter:
+        videos = videos[videos["title"].str.contains(title_filter, case=False, regex=False, na=False)]
+    if min_count is not None and report["count_column"]:
+        videos = videos[videos[frame_column(report["count_column"])] >= min_count]
+
+    rows = videos.assign(sort_key=videos[report["frame_sorts"][sort_by]])
+    # Rows with and without a sort value are filtered and ordered apart, as the NULL keys
+    # come first ascending and last descending
+    present = rows[rows["sort_key"].notna()]
+    missing = rows[rows["sort_key"].isna()]
+
+    if after is not None:
+        value, video_id = after
+        if value is None:
+            missing = missing[missing["video_id"] < video_id] if descending else missing[missing["video_id"] > video_id]
+            if descending:
+                present = present.iloc[:0]
+        else:
+            if descending:
+                keep = (present["sort_key"] < value) | ((present["sort_key"] == value) & (present["video_id"] < video_id))
+            else:
+                keep = (present["sort_key"] > value) | ((present["sort_key"] == value) & (present["video_id"] > video_id))
+                missing = missing.iloc[:0]
+            present = present[keep]
+
+    present = present.sort_values(["sort_key", "video_id"], ascending=not descending, kind="stable")
+    missing = missing.sort_values("video_id", ascending=not descending, kind="stable")
+    rows = pd.concat([present, missing] if descending else [missing, present])
+    return rows[[frame_column(expression) for _, expression, _ in report["columns"]] + ["sort_key", "video_id"]]
+
+
+# Function to convert report rows to tuples with None for missing values
+def to_row_tuples(rows):
+    return list(rows.astype(object).where(rows.notna(), None).itertuples(index=False, name=None))
+
+
+# Function to get one page of a report from a snapshot frame, with the same result as fetch_report_page
+def page_report_frame(frame, number, sort_by, descending=False, title_filter="", min_count=None, after=None, page_size=REPORT_PAGE_SIZE):
+    rows = to_row_tuples(select_report_rows(frame, number, sort_by, descending, title_filter, min_count, after).head(page_size + 1))
+    next_cursor = tuple(rows[page_size - 1][-2:]) if len(rows) > page_size else None
+    columns = [label for label, _, _ in PAGED_REPORTS[number]["columns"]]
+    return [row[:-2] for row in rows[:page_size]], next_cursor, columns
+
+
+# Function to yield the full report from a snapshot frame in chunks, for export_report
+def iter_report_frame_chunks(frame, number, sort_by, descending=False, title_filter="", min_count=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    rows = select_report_rows(frame, number, sort_by, descending, title_filter, min_count)
+    for start in range(0, len(rows), chunk_rows):
+        yield to_row_tuples(rows.iloc[start:start + chunk_rows])
+
+
+# Function to write the full report to CSV or Parquet from chunks of rows, so only one
+# chunk is held in memory at a time; returns the number of rows written
+def export_report(number, row_chunks, path, file_format="csv"):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    columns = [label for label, _, _ in PAGED_REPORTS[number]["columns"]]
+    total = 0
+
+    if file_format == "parquet":
+        # pyarrow is only needed for Parquet exports
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([(label, pa.string() if kind == "string" else pa.int64()) for label, _, kind in PAGED_REPORTS[number]["columns"]])
+        with pq.ParquetWriter(path, schema) as writer:
+            for rows in row_chunks:
+                arrays = [pa.array([row[i] for row in rows], type=field.type) for i, field in enumerate(schema)]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                total += len(rows)
+        return total
+
+    with open(path, "w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(columns)
+        for rows in row_chunks:
+            writer.writerows(row[:len(columns)] for row in rows)
+            total += len(rows)
+    return total
+
+
+# Function to delete export files older than max_age_hours; returns the number deleted
+def remove_old_exports(directory=EXPORT_DIR, max_age_hours=EXPORT_MAX_AGE_HOURS):
+    removed = 0
+    cutoff = time.time() - max_age_hours * 3600
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return removed
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            # Removed meanwhile by another session
+            pass
+    return removed
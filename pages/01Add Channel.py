@@ -1,10 +1,12 @@
 import streamlit as st
-import requests
 import pandas as pd
-import mysql.connector
-from datetime import datetime
 from dotenv import load_dotenv
 import os
+import mysql.connector
+from ingest import get_youtube_client
+from ingest_jobs import (ACTIVE_STATUSES, JOB_COLUMNS, JOB_POLL_SECONDS, JOB_WORKERS_IN_APP, enqueue_job, get_jobs,
+                         get_recent_jobs, start_job_workers)
+from performance_panel import show_performance_panel
 
 # Set page configuration and enable dark theme for Altair plots
 st.set_page_config(
@@ -18,221 +20,119 @@ st.set_page_config(
 
 load_dotenv()
 
-# Function to fetch channel details from YouTube Data API
-def get_channel_details(api_key, channel_id):
-    url = f"https://www.googleapis.com/youtube/v3/channels?part=snippet,status,statistics&id={channel_id}&key={api_key}"
-    response = requests.get(url)
-    data = response.json()
-    channel_data = {
-        "Channel ID": channel_id,
-        "Channel Name": data["items"][0]["snippet"]["title"],
-        "Description": data["items"][0]["snippet"]["description"],
-        "Subscriber Count": data["items"][0]["statistics"]["subscriberCount"],
-        "Total Videos": data["items"][0]["statistics"]["videoCount"],
-        "Total Views": data["items"][0]["statistics"]["viewCount"],
-        "Channel Status": data["items"][0]['status']['privacyStatus']
-    }
-    return channel_data
-
-# Function to fetch video details from YouTube Data API
-def get_video_details(api_key, channel_id):
-    videos_data = []
-    next_page_token = None
-
-    while True:
-        url = f"https://www.googleapis.com/youtube/v3/search?part=snippet&channelId={channel_id}&key={api_key}&order=date&maxResults=50"
-        if next_page_token:
-            url += f"&pageToken={next_page_token}"
-        response = requests.get(url)
-        data = response.json()
-        
-        for item in data.get("items", []):
-            if "id" in item and "videoId" in item["id"]:
-                video_id = item["id"]["videoId"]
-               
-                video_title = item["snippet"]["title"]
-                video_description = item["snippet"]["description"]
-                video_published_at = item["snippet"]["publishedAt"]
-                
-                # Fetch video statistics
-                video_stats_url = f"https://www.googleapis.com/youtube/v3/videos?part=statistics,contentDetails&id={video_id}&key={api_key}"
-                stats_response = requests.get(video_stats_url)
-                stats_data = stats_response.json()
-                if stats_data["items"]:
-                    stats = stats_data["items"][0]["statistics"]
-                    duration = stats_data["items"][0]["contentDetails"]["duration"]
-                else:
-                    stats = {"viewCount": "Not Available", "likeCount": "Not Available", "commentCount": "Not Available"}
-                    
-                video_data = {
-                    "Video ID": video_id,
-                    "Channel ID": channel_id,
-                    "Title": video_title,
-                    "Description": video_description,
-                    "Views": stats.get("viewCount", "Not Available"),
-                    "Likes": stats.get("likeCount", "Not Available"),
-                    "Total Comments": stats.get("commentCount", "Not Available"),
-                    "Duration":duration,
-                    "Published Date & Time":video_published_at
-                }
-                videos_data.append(video_data)
-            
-        if "nextPageToken" in data:
-            next_page_token = data["nextPageToken"]
-        else:
-            break
-            
-    return videos_data
+JOB_TABLE_LABELS = {
+    "job_id": "Job", "channel_id": "Channel ID", "mode": "Mode", "status": "Status", "channel_name": "Channel Name",
+    "videos_saved": "Videos Saved", "stats_refreshed": "Stats Refreshed", "error": "Error", "attempts": "Attempts",
+    "created_at": "Queued At", "started_at": "Started At", "finished_at": "Finished At", "run_after": "Runs After (UTC)",
+}
+
+# Function to collect unique channel IDs from the textarea and an uploaded CSV file
+def parse_channel_ids(text, uploaded_file=None):
+    channel_ids = [line.strip() for line in text.replace(",", "\n").splitlines()]
+    if uploaded_file is not None:
+        csv_df = pd.read_csv(uploaded_file, dtype=str)
+        column = "channel_id" if "channel_id" in csv_df.columns else csv_df.columns[0]
+        channel_ids += csv_df[column].dropna().str.strip().tolist()
+    return list(dict.fromkeys(channel_id for channel_id in channel_ids if channel_id))
 
 # Streamlit web app
 def main():
     st.title("YouTube Data Harvesting")
-    
-    
-    channel_id = st.text_input("Enter a YouTube Channel ID:", placeholder="Paste YouTube ID here...")
-
-    if st.button("Fetch & Save"):
-        if not channel_id:
-            st.error("Please enter the YouTube Channel ID.")
-        else:
-            api_key = os.getenv("API_KEY")
-            
-            try:
-                 # Fetch channel details
-                st.write("### Channel Details")
-                channel_data = get_channel_details(api_key, channel_id)
-                st.dataframe(channel_data, width=500)
-                st.write("### Video Details")
-                with st.spinner("Fetching video details..."):
-                    video_data = get_video_details(api_key, channel_id)
-                    video_df = pd.DataFrame(video_data)
-                    st.dataframe(video_df, width=1200, height=400)
-                
-                
-                # Save channel and video data to database
-                save_channel_details_to_database(channel_data, video_data)
-                # print(video_data)
-               
-            except Exception as e:
-                st.error(f"Error: {str(e)}")
-                st.error("Please check the Channel ID.")
 
-    # else:
-    #     welcome_message()
-
-# Function to save channel details and video data to the database
-def save_channel_details_to_database(channel_data, video_data):
-    
-        connection = mysql.connector.connect(
-            host=os.getenv("HOST"),
-            user=os.getenv("USER"),
-            password=os.getenv("PASS"),  
-            database=os.getenv("DATABASE"),
-            auth_plugin='mysql_native_password'
-        )
-       
-        
-        cursor = connection.cursor()
-
-        # Check if the channel already exists in the database
-        cursor.execute("SELECT * FROM channel WHERE channel_id = %s", (channel_data["Channel ID"],))
-        existing_channel = cursor.fetchone()
-        
-        # If the channel exists, update the record; otherwise, insert a new record
-        if existing_channel:
-            update_channel_query = """
-                UPDATE channel
-                SET channel_name = %s, description = %s, subscriber_count = %s, total_videos = %s, total_views = %s, channel_status = %s
-                WHERE channel_id = %s
-            """
-            channel_values = (
-                channel_data["Channel Name"],
-                channel_data["Description"],
-                channel_data["Subscriber Count"],
-                channel_data["Total Videos"],
-                channel_data["Total Views"],
-                channel_data["Channel Status"],
-                channel_data["Channel ID"]
-            )
-            cursor.execute(update_channel_query, channel_values)
-        else:
-            insert_channel_query = """
-                INSERT INTO channel (channel_id, channel_name, description, subscriber_count, total_videos, total_views, channel_status)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """
-            channel_values = (
-                channel_data["Channel ID"],
-                channel_data["Channel Name"],
-                channel_data["Description"],
-                channel_data["Subscriber Count"],
-                channel_data["Total Videos"],
-                channel_data["Total Views"],
-                channel_data["Channel Status"]
-            )
-            cursor.execute(insert_channel_query, channel_values)
-        
-        # Consume any unread result set
-        for result in cursor.stored_results():
-            result.fetchall()
-
-        # Check if each video already exists in the database
-        for video in video_data:
-            # Convert ISO 8601 datetime string to MySQL datetime format
-            published_at = datetime.strptime(video["Published Date & Time"], "%Y-%m-%dT%H:%M:%SZ").strftime("%Y-%m-%d %H:%M:%S")
-
-            cursor.execute("SELECT * FROM video WHERE video_id = %s", (video["Video ID"],))
-            existing_video = cursor.fetchone()
-
-            # If the video exists, update the record; otherwise, insert a new record
-            if existing_video:
-                update_video_query = """
-                    UPDATE video
-                    SET title = %s, description = %s, views = %s, likes = %s, total_comments = %s, duration = %s, published_at = %s
-                    WHERE video_id = %s
-                """
-                video_values = (
-                    video["Title"],
-                    video["Description"],
-                    video["Views"],
-                    int(video["Likes"]) if video["Likes"] != "Not Available" else None,  
-                    int(video["Total Comments"]) if video["Total Comments"] != "Not Available" else None, 
-                    video["Duration"],
-                    published_at,
-                    video["Video ID"]
-                )
-                cursor.execute(update_video_query, video_values)
-            else:
-                insert_video_query = """
-                    INSERT INTO video (video_id, channel_id, title, description, views, likes, total_comments, duration, published_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                video_values = (
-                    video["Video ID"],
-                    video["Channel ID"],
-                    video["Title"],
-                    video["Description"],
-                    video["Views"],
-                    int(video["Likes"]) if video["Likes"] != "Not Available" else None,  
-                    int(video["Total Comments"]) if video["Total Comments"] != "Not Available" else None, 
-                    video["Duration"],
-                    published_at  # Use the converted datetime value
-                )
-                cursor.execute(insert_video_query, video_values)
-
-        # Commit the transaction after processing all videos
-        connection.commit()
+    api_key = os.getenv("API_KEY")
+    if JOB_WORKERS_IN_APP:
+        start_job_workers(api_key)
 
+    # The remaining quota is read from MySQL, where every process using the key counts it
+    quota = get_youtube_client(api_key).quota
+    try:
+        st.caption(f"API quota remaining today: {quota.remaining:,} of {quota.daily_units:,} units")
+    except mysql.connector.Error as e:
+        st.error(f"Error loading the API quota: {str(e)}")
 
+    mode = st.radio("Mode:", ["Single channel", "Bulk"], horizontal=True)
 
-        # Consume any unread result set
-        for result in cursor.stored_results():
-            result.fetchall()
+    if mode == "Bulk":
+        bulk_main()
+    else:
+        channel_id = st.text_input("Enter a YouTube Channel ID:", placeholder="Paste YouTube ID here...")
+        incremental = st.checkbox("Incremental sync (only fetch new uploads and refresh stored statistics)", value=True)
 
-        connection.commit()
-        st.success("Data saved successfully.")
+        if st.button("Fetch & Save"):
+            if not channel_id:
+                st.error("Please enter the YouTube Channel ID.")
+            else:
+                enqueue_channels([channel_id.strip()], incremental)
 
-        
+    # else:
+    #     welcome_message()
 
+    if st.session_state.get("job_ids"):
+        show_jobs()
+
+    with st.expander("Recent jobs"):
+        try:
+            show_jobs_table(get_recent_jobs())
+        except mysql.connector.Error as e:
+            st.error(f"Error loading jobs: {str(e)}")
+
+# Bulk mode: queue a list of channels for the background workers
+def bulk_main():
+    channel_text = st.text_area("Enter YouTube Channel IDs (one per line):", placeholder="Paste YouTube IDs here...")
+    uploaded_file = st.file_uploader("Or upload a CSV of Channel IDs:", type="csv")
+    incremental = st.checkbox("Incremental sync (only fetch new uploads and refresh stored statistics)", value=True)
+
+    if st.button("Fetch & Save All"):
+        channel_ids = parse_channel_ids(channel_text, uploaded_file)
+        if not channel_ids:
+            st.error("Please enter at least one YouTube Channel ID.")
+            return
+        enqueue_channels(channel_ids, incremental)
+
+# Function to queue channels and remember their jobs in the session; a channel that is
+# already queued or running is not fetched twice, its existing job is followed instead
+def enqueue_channels(channel_ids, incremental):
+    try:
+        results = [enqueue_job(channel_id, incremental) for channel_id in channel_ids]
+    except mysql.connector.Error as e:
+        st.error(f"Error queuing channels: {str(e)}")
+        return
+    st.session_state["job_ids"] = [job_id for job_id, _ in results]
+    duplicates = sum(1 for _, created in results if not created)
+    message = f"Queued {len(results) - duplicates} channel(s)."
+    if duplicates:
+        message += f" {duplicates} already queued or running; following the existing job(s)."
+    st.success(message)
+
+# Function to display jobs with their progress
+def show_jobs_table(jobs):
+    jobs_df = pd.DataFrame(jobs, columns=JOB_COLUMNS).rename(columns=JOB_TABLE_LABELS)
+    jobs_df.index = jobs_df.index + 1
+    jobs_df.index.name = "S.no"
+    st.dataframe(jobs_df, width=1200)
+
+# Polls the session's jobs every few seconds without rerunning the whole page
+@st.experimental_fragment(run_every=JOB_POLL_SECONDS)
+def show_jobs():
+    try:
+        jobs = get_jobs(st.session_state["job_ids"])
+    except mysql.connector.Error as e:
+        st.error(f"Error loading jobs: {str(e)}")
+        return
+    if not jobs:
+        return
+    finished = sum(1 for job in jobs if job["status"] not in ACTIVE_STATUSES)
+    videos_saved = sum(job["videos_saved"] for job in jobs)
+    text = f"{finished} of {len(jobs)} channels finished, {videos_saved:,} videos saved so far"
+    waiting = sum(1 for job in jobs if job["status"] == "queued" and job["run_after"])
+    if waiting:
+        text += f"; {waiting} deferred until the daily quota resets"
+    st.progress(finished / len(jobs), text=text)
+
+    succeeded = sum(1 for job in jobs if job["status"] == "succeeded")
+    if finished == len(jobs):
+        st.write(f"### Results: {succeeded} of {len(jobs)} channels saved")
+    show_jobs_table(jobs)
 
 # Function to display welcome message
 # def welcome_message():
@@ -246,3 +146,5 @@ def save_channel_details_to_database(channel_data, video_data):
 
 if __name__ == "__main__":
     main()
+    # Rendered last so the panel includes the work done in this run
+    show_performance_panel()
@@ -1,302 +1,264 @@
 import streamlit as st
 import mysql.connector
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 from dotenv import load_dotenv
 import os
+from analytics_reports import REPORTS, ReportContext
+from channel_catalog import channel_catalog, snapshot_channel_catalog
+from database import DB_POOL_SIZE, get_pool_stats, pooled_connection, stream_query
+from metrics import timed_query
+from paged_reports import (EXPORT_CHUNK_ROWS, EXPORT_DIR, EXPORT_DOWNLOAD_MAX_MB, EXPORT_FORMATS, PAGED_REPORTS, REPORT_PAGE_SIZE, build_report_query,
+                           export_report, iter_report_frame_chunks, remove_old_exports)
+from performance_panel import show_performance_panel
+from result_cache import result_cache
+from snapshot import ANALYTICS_SOURCE, SNAPSHOT_DIR, SNAPSHOT_ENABLED, read_snapshot_channel_names, read_snapshot_version, read_versions
 
 load_dotenv()
 
-# Function to execute SQL queries
-def execute_query(query, params=None):
-    try:
-        connection = mysql.connector.connect(
-            host=os.getenv("HOST"),
-            user=os.getenv("USER"),
-            password=os.getenv("PASS"), 
-            database=os.getenv("DATABASE"),
-            auth_plugin='mysql_native_password'
-        )
+# With ANALYTICS_SOURCE=snapshot the page reads the columnar snapshot written at ingest
+# (see snapshot.py) and sends no queries to MySQL
+USE_SNAPSHOT = ANALYTICS_SOURCE == "snapshot" and SNAPSHOT_ENABLED
 
+# Report sections computed at once; each holds a pooled connection while it queries
+ANALYTICS_WORKERS = max(1, min(int(os.getenv("ANALYTICS_WORKERS", "4")), DB_POOL_SIZE))
+
+# Function to run a SQL query on a connection borrowed from the shared pool; raises
+# mysql.connector.Error, so it can be used on the report worker threads
+def run_query(query, params=None):
+    with pooled_connection() as connection:
         cursor = connection.cursor()
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        result = cursor.fetchall()
-        connection.commit()
-        return result
+        try:
+            with timed_query(query) as query_stats:
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                result = cursor.fetchall()
+                query_stats["rows"] = len(result)
+            # End the read transaction so the next borrower sees fresh data
+            connection.commit()
+            return result
+        finally:
+            cursor.close()
 
+# Function to execute SQL queries, showing an error instead of raising
+def execute_query(query, params=None):
+    try:
+        return run_query(query, params)
     except mysql.connector.Error as error:
         st.error(f"Error executing query: {error}")
 
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
-
-# Function to get all channel names from the database
-def get_all_channel_names():
-    query = "SELECT channel_name FROM channel;"
-    results = execute_query(query)
-    return [result[0] for result in results]
+# Function to show connection pool usage in the sidebar
+def show_pool_stats():
+    with st.sidebar.expander("Connection pool"):
+        stats = get_pool_stats()
+        st.metric("Connections in use", f"{stats['in_use']} / {stats['pool_size']}")
+        st.json(stats)
+
+# Function to show result cache hit and miss counts in the sidebar
+def show_cache_stats():
+    with st.sidebar.expander("Result cache"):
+        stats = result_cache.stats()
+        col_hits, col_misses = st.columns(2)
+        col_hits.metric("Hits", stats["hits"])
+        col_misses.metric("Misses", stats["misses"])
+        st.json(stats)
+
+# Function to get the data versions of the selected channels, in channel ID order; in
+# snapshot mode these are the versions of the snapshot partitions
+def get_channel_versions(channel_ids):
+    if USE_SNAPSHOT:
+        versions = read_versions()
+        return tuple((channel_id, versions[channel_id]) for channel_id in sorted(channel_ids) if channel_id in versions)
+
+    query = "SELECT channel_id, data_version FROM channel WHERE channel_id IN (%s) ORDER BY channel_id;"
+    query = query % ','.join(['%s'] * len(channel_ids))
+    result = execute_query(query, tuple(channel_ids))
+    return tuple(tuple(row) for row in result) if result is not None else None
+
+# Function to pick channels by ID from a search of the in-memory catalog; only the matches
+# and the current selection are sent to the browser. The selection is kept in session
+# state, and the options only change when the search text does, as a multiselect whose
+# options change starts over empty.
+def select_channels(catalog):
+    search = st.text_input("Search channels:", placeholder="Type part of a channel name, or a channel ID...")
+    selected = st.session_state.setdefault("selected_channel_ids", [])
+
+    picker = st.session_state.get("channel_picker")
+    if picker is None or picker["search"] != search:
+        picker = {"search": search, "options": list(dict.fromkeys(selected + catalog.search(search)))}
+        st.session_state["channel_picker"] = picker
+        st.session_state["channel_picker_value"] = selected
+
+    selected = st.multiselect(f"Select Channels ({len(catalog):,} in catalog):", picker["options"], format_func=catalog.label, key="channel_picker_value")
+    st.session_state["selected_channel_ids"] = selected
+    return selected
 
 # Streamlit web app
 def main():
     st.title("YouTube Data Analysis")
-
-    # Retrieve all channel names from the database
-    channel_names = get_all_channel_names()
+    show_pool_stats()
+    show_cache_stats()
+
+    # The channel catalog is loaded once per version and searched in memory
+    if USE_SNAPSHOT:
+        st.caption(f"Reading the columnar snapshot in {SNAPSHOT_DIR}")
+        catalog = snapshot_channel_catalog.get_from(read_snapshot_version, read_snapshot_channel_names)
+    else:
+        catalog = channel_catalog.get(execute_query)
+    if catalog is None:
+        return
 
     # Select multiple channels
-    selected_channels = st.multiselect("Select Channels:", channel_names)
+    selected_channels = select_channels(catalog)
 
+    col_overall, col_per_channel, col_growth = st.columns(3)
+    settings = {
+        "top_n_overall": col_overall.number_input("Top videos overall:", min_value=1, max_value=100, value=10),
+        "top_n_per_channel": col_per_channel.number_input("Top videos per channel:", min_value=1, max_value=50, value=1),
+        "growth_days": col_growth.number_input("Growth window (days):", min_value=1, max_value=365, value=30),
+    }
+
+    # Remember the fetched selection so paging and sorting reruns keep the reports on screen
     if st.button("Fetch Data"):
         if not selected_channels:
             st.error("Please select at least one channel.")
+            st.session_state.pop("fetched_channels", None)
         else:
-            # Query 1: Names of all videos and their corresponding channels
-           
-            st.header("1.Names of all videos and their corresponding channels")
-
-            with st.expander("View Results"):
-                query_1 = "SELECT video.title AS 'Video Title', channel.channel_name AS 'Channel Name' FROM video JOIN channel ON video.channel_id = channel.channel_id WHERE channel.channel_name IN (%s);"
-                query_1 = query_1 % ','.join(['%s'] * len(selected_channels))
-                result_1 = execute_query(query_1, tuple(selected_channels))
-                df_1 = pd.DataFrame(result_1, columns=["Video Title", "Channel Name"])
-
-                # Modify the DataFrame to include an index starting from 1
-                df_1.index = df_1.index + 1
-                df_1.index.name = "S.no"
-
-                # Display the DataFrame
-                st.dataframe(df_1)
-
-            # Query 2: Channels with the most number of videos and their total counts
-            st.header("2. Channels with the most number of videos and their total counts")
-            with st.expander("View Results"):
-                query_2 = "SELECT channel_name, total_videos FROM channel WHERE channel_name IN (%s);"
-                query_2 = query_2 % ','.join(['%s'] * len(selected_channels))
-                result_2 = execute_query(query_2, tuple(selected_channels))
-                df_2 = pd.DataFrame(result_2, columns=["Channel Name", "Total Videos"])
-                df_2.index = df_2.index + 1
-                df_2.index.name = "S.no"
-                st.dataframe(df_2)
-
-                # Query 3: Top 10 most viewed videos and their respective channels
-            st.header("3. Top 10 most viewed videos and their respective channels")
-            with st.expander("View Results"):
-                query_3 = """
-                    SELECT v.title AS 'Video Title', c.channel_name AS 'Channel Name', v.views AS 'Views'
-                    FROM video v
-                    JOIN channel c ON v.channel_id = c.channel_id
-                    WHERE c.channel_name IN (%s)
-                    ORDER BY v.views DESC
-                    LIMIT 10;
-                """
-                query_3 = query_3 % ','.join(['%s'] * len(selected_channels))
-                result_3 = execute_query(query_3, tuple(selected_channels))
-                df_3 = pd.DataFrame(result_3, columns=["Video Title", "Channel Name", "Views"])
-                df_3.index = df_3.index + 1
-                df_3.index.name = "S.no"
-                st.dataframe(df_3)
-
-             # Query 4: Number of comments made on each video and their corresponding video names
-            st.header("4. Number of comments made on each video and their corresponding video names")
-            with st.expander("View Results"):
-                query_4 = """
-                    SELECT v.title AS 'Video Title', v.total_comments AS 'Number of Comments'
-                    FROM video v
-                    WHERE v.channel_id IN (
-                        SELECT channel_id FROM channel WHERE channel_name IN (%s)
-                    );
-                """
-                query_4 = query_4 % ','.join(['%s'] * len(selected_channels))
-                result_4 = execute_query(query_4, tuple(selected_channels))
-                df_4 = pd.DataFrame(result_4, columns=["Video Title", "Number of Comments"])
-                df_4.index = df_4.index + 1
-                df_4.index.name = "S.no"
-                st.dataframe(df_4)
-
-           # Query 5: Videos with the highest number of likes for each selected channel
-            st.header("5. Videos with the highest number of likes for each selected channel")
-            with st.expander("View Results"):
-                video_data_likes = []
-
-                for channel in selected_channels:
-                    # SQL query to get the video with the highest number of likes for the current channel
-                    query_5 = """
-                        SELECT v.title AS 'Video Title', v.likes AS 'Total Likes', c.channel_name AS 'Channel Name'
-                        FROM video v
-                        JOIN channel c ON v.channel_id = c.channel_id
-                        WHERE c.channel_name = %s
-                        ORDER BY v.likes DESC
-                        LIMIT 1;
-                    """
-                    # Execute the query for the current channel
-                    result_5 = execute_query(query_5, (channel,))
-
-                    # Check if there are any results
-                    if result_5:
-                        video_title = result_5[0][0]
-                        total_likes = result_5[0][1]
-                        channel_name = result_5[0][2]
-                        video_data_likes.append({"Video Title": video_title, "Total Likes": total_likes, "Channel Name": channel_name})
-                    else:
-                        video_data_likes.append({"Video Title": "No videos found", "Total Likes": "N/A", "Channel Name": channel})
-
-                # Create DataFrame
-                df_5 = pd.DataFrame(video_data_likes)
-                df_5.index = df_5.index + 1
-                df_5.index.name = "S.no"
-                # Display DataFrame
-                st.dataframe(df_5)
-
-            #Total number of likes for each video and their corresponding video names
-            st.header("6. Total number of likes for each video and their corresponding video names")
-            with st.expander("View Results"):
-                query_6 = """
-                    SELECT v.title AS 'Video Title', v.likes AS 'Total Likes'
-                    FROM video v
-                    JOIN channel c ON v.channel_id = c.channel_id
-                    WHERE c.channel_name IN (%s);
-                """
-                query_6 = query_6 % ','.join(['%s'] * len(selected_channels))
-                result_6 = execute_query(query_6, tuple(selected_channels))
-                df_6 = pd.DataFrame(result_6, columns=["Video Title", "Total Likes"])
-                df_6.index = df_6.index + 1
-                df_6.index.name = "S.no"
-                st.dataframe(df_6)
-
-
-            # Query 7: Total number of views for each channel and their corresponding channel names
-            st.header("7. Total number of views for each channel and their corresponding channel names")
-            with st.expander("View Results"):
-                query_7 = "SELECT channel_name AS 'Channel Name', total_views AS 'Total Views' FROM channel WHERE channel_name IN (%s);"
-                query_7 = query_7 % ','.join(['%s'] * len(selected_channels))
-                result_7 = execute_query(query_7, tuple(selected_channels))
-                df_7 = pd.DataFrame(result_7, columns=["Channel Name", "Total Views"])
-                df_7.index = df_7.index + 1
-                df_7.index.name = "S.no"
-                st.dataframe(df_7)
-
-            # Query 8: Names of selected channels that have published videos in the year 2022
-            st.header("8. Names of selected channels that have published videos in the year 2022")
-            with st.expander("View Results"):
-                query_8 = """
-                    SELECT DISTINCT c.channel_name AS 'Channel Name'
-                    FROM video v
-                    JOIN channel c ON v.channel_id = c.channel_id
-                    WHERE YEAR(v.published_at) = 2022
-                    AND c.channel_name IN (%s);
-                """
-                query_8 = query_8 % ','.join(['%s'] * len(selected_channels))
-                result_8 = execute_query(query_8, tuple(selected_channels))
-                df_8 = pd.DataFrame(result_8, columns=["Channel Name"])
-                df_8.index = df_8.index + 1
-                df_8.index.name = "S.no"
-                st.dataframe(df_8)
-
-            # Query 9: Average duration of videos for selected channels
-            st.header("9. Average duration of videos for selected channels")
-            
-            with st.expander("View Results"):
-                # Initialize list to store results for each channel
-                channel_results = []
-            
-                # Loop through each selected channel
-                for channel_name in selected_channels:
-                    # Query to fetch durations for the current channel
-                    query_check_duration = """
-                        SELECT duration
-                        FROM video v
-                        JOIN channel c ON v.channel_id = c.channel_id
-                        WHERE c.channel_name = %s
-                    """
-                    result_check_duration = execute_query(query_check_duration, (channel_name,))
-            
-                    total_duration_seconds = 0
-                    total_videos = 0
-            
-                    # Calculate total duration and count of valid videos for the current channel
-                    for row in result_check_duration:
-                        duration = row[0]
-                        if duration:
-                            # Parse duration in ISO 8601 format and calculate total duration in seconds
-                            duration_components = duration[2:].split('M')
-                            try:
-                                hours = int(duration_components[0][:-1])
-                            except ValueError:
-                                hours = 0
-                            try:
-                                minutes = int(duration_components[1][:-1]) if len(duration_components) > 1 else 0
-                            except ValueError:
-                                minutes = 0
-                            total_duration_seconds += hours * 3600 + minutes * 60
-                            total_videos += 1
-            
-                    # Calculate average duration for the current channel
-                    if total_videos > 0:
-                        average_duration_seconds = total_duration_seconds / total_videos
-                    else:
-                        average_duration_seconds = 0
-            
-                    # Convert average duration to ISO 8601 format
-                    average_duration_iso8601 = f"PT{int(average_duration_seconds // 3600)}H{int((average_duration_seconds % 3600) // 60)}M{int(average_duration_seconds % 60)}S"
-            
-                    # Append results for the current channel to the list
-                    channel_results.append({
-                        "Channel Name": channel_name,
-                        "Total Videos": total_videos,
-                        "Total Duration (Seconds)": total_duration_seconds,
-                        "Average Duration (ISO 8601)": average_duration_iso8601
-                    })
-            
-                # Create DataFrame from the list of results
-                df_results = pd.DataFrame(channel_results)
-            
-                # Modify the DataFrame to include an index starting from 1
-                df_results.index = df_results.index + 1
-                df_results.index.name = "S.no"
-            
-                # Display DataFrame
-                st.dataframe(df_results)
-
-
-            # Query 10: Videos with the highest number of comments for each selected channel
-            st.header("10. Videos with the highest number of comments for each selected channel")
-            with st.expander("View Results"):
-                video_data = []
-
-                for channel in selected_channels:
-                    # SQL query to get the video with the highest number of comments for the current channel
-                    query_10 = """
-                        SELECT v.title AS 'Video Title', v.total_comments AS 'Total Comments', c.channel_name AS 'Channel Name'
-                        FROM video v
-                        JOIN channel c ON v.channel_id = c.channel_id
-                        WHERE c.channel_name = %s
-                        ORDER BY v.total_comments DESC
-                        LIMIT 1;
-                    """
-
-                    # Execute the query for the current channel
-                    result_10 = execute_query(query_10, (channel,))
-
-                    # Check if there are any results
-                    if result_10:
-                        video_title = result_10[0][0]
-                        total_comments = result_10[0][1]
-                        channel_name = result_10[0][2]
-                        video_data.append({"Video Title": video_title, "Total Comments": total_comments, "Channel Name": channel_name})
-                    else:
-                        video_data.append({"Video Title": "No videos found", "Total Comments": "N/A", "Channel Name": channel})
-
-                # Create DataFrame
-                df_10 = pd.DataFrame(video_data)
-                df_10.index = df_10.index + 1
-                df_10.index.name = "S.no"
-                # Display DataFrame
-                st.dataframe(df_10)
+            st.session_state["fetched_channels"] = tuple(sorted(set(selected_channels), key=lambda channel_id: (catalog.label(channel_id).casefold(), channel_id)))
+
+    if "fetched_channels" in st.session_state:
+        channels = st.session_state["fetched_channels"]
+        versions = get_channel_versions(channels)
+        if versions is None:
+            return
+        compute_all = st.toggle("Compute all reports", key="compute_all_reports")
+        show_reports(ReportContext(channels, versions, settings, run_query, USE_SNAPSHOT), compute_all)
+
+# Function to display the registered report sections. A section is computed only once it
+# is opened, or for every section with compute_all; the open sections are computed
+# concurrently on a bounded thread pool and each is rendered in its place as soon as it
+# is ready, so the first result takes as long as its own query.
+def show_reports(context, compute_all):
+    sections = {}
+    for number, report in REPORTS.items():
+        st.header(report.title(context.settings))
+        reason = report.unavailable(context)
+        if reason:
+            st.info(reason)
+        elif compute_all or st.toggle("View Results", key=f"open_report_{number}"):
+            sections[number] = st.empty()
+            sections[number].caption("Computing...")
+            if report.paged:
+                context.page_settings[number] = get_page_settings(number, context)
+    if not sections:
+        return
+
+    with ThreadPoolExecutor(max_workers=ANALYTICS_WORKERS) as executor:
+        futures = {executor.submit(REPORTS[number].get, context): number for number in sections}
+        for future in as_completed(futures):
+            number = futures[future]
+            # Replace the "Computing..." caption with the report
+            with sections[number].container():
+                # Any failure, including pandas or pyarrow errors, is confined to its section
+                try:
+                    result = future.result()
+                except Exception as error:
+                    st.error(f"Error computing report: {error}")
+                    continue
+                if REPORTS[number].paged:
+                    show_paged_report(number, context, *result)
+                else:
+                    show_report(result)
+
+# Function to get the default values of a paged report's controls
+def page_control_defaults(number):
+    report = PAGED_REPORTS[number]
+    return {
+        "sort_by": list(report["sorts"])[0],
+        "descending": report["count_column"] is not None,
+        "page_size": REPORT_PAGE_SIZE,
+        "title_filter": "",
+        "min_count": 0,
+    }
+
+# Function to get the keyset cursors of the pages visited so far; any setting change starts over
+def get_page_cursors(number, settings):
+    state_key = f"report_pages_{number}"
+    if st.session_state.get(state_key, {}).get("settings") != settings:
+        st.session_state[state_key] = {"settings": settings, "cursors": [None]}
+    return st.session_state[state_key]["cursors"]
+
+# Function to read a paged report's page settings from its controls' session state before
+# they are drawn, so the page can be fetched along with the other open reports
+def get_page_settings(number, context):
+    values = {name: st.session_state.get(f"{name}_{number}", default) for name, default in page_control_defaults(number).items()}
+    min_count = (values["min_count"] or None) if PAGED_REPORTS[number]["count_column"] else None
+    cursors = get_page_cursors(number, (context.channels, context.versions, values["sort_by"], values["descending"], values["page_size"], values["title_filter"], min_count))
+    return (values["sort_by"], values["descending"], values["page_size"], values["title_filter"], min_count, cursors[-1])
+
+# Function to display a per-video report one database page at a time, with sort,
+# filter and export controls; only the visible page is ever loaded. The page was fetched
+# with the settings get_page_settings read from these controls' state.
+def show_paged_report(number, context, page_df, next_cursor):
+    report = PAGED_REPORTS[number]
+    defaults = page_control_defaults(number)
+    col_sort, col_order, col_size, col_filter = st.columns(4)
+    sort_by = col_sort.selectbox("Sort by:", list(report["sorts"]), key=f"sort_by_{number}")
+    descending = col_order.checkbox("Descending", value=defaults["descending"], key=f"descending_{number}")
+    page_size = col_size.number_input("Rows per page:", min_value=10, max_value=5000, value=defaults["page_size"], step=10, key=f"page_size_{number}")
+    title_filter = col_filter.text_input("Title contains:", key=f"title_filter_{number}")
+    min_count = None
+    if report["count_column"]:
+        min_count = st.number_input("Minimum count:", min_value=0, value=defaults["min_count"], key=f"min_count_{number}") or None
+
+    cursors = get_page_cursors(number, (context.channels, context.versions, sort_by, descending, page_size, title_filter, min_count))
+    page_df = page_df.set_axis(page_df.index + 1 + (len(cursors) - 1) * page_size)
+    page_df.index.name = "S.no"
+    st.dataframe(page_df)
+
+    col_previous, col_page, col_next = st.columns([1, 2, 1])
+    col_previous.button("Previous page", key=f"previous_{number}", disabled=len(cursors) == 1, on_click=cursors.pop)
+    col_page.caption(f"Page {len(cursors)}")
+    col_next.button("Next page", key=f"next_{number}", disabled=next_cursor is None, on_click=cursors.append, args=(next_cursor,))
+
+    # Export streams every matching row through a server-side cursor in bounded chunks
+    col_format, col_export = st.columns(2)
+    file_format = col_format.selectbox("Export format:", EXPORT_FORMATS, key=f"export_format_{number}")
+    if col_export.button("Export all", key=f"export_{number}"):
+        remove_old_exports()
+        path = os.path.join(EXPORT_DIR, f"report_{number}_{datetime.now():%Y%m%d_%H%M%S}.{file_format}")
+        try:
+            if USE_SNAPSHOT:
+                row_chunks = iter_report_frame_chunks(context.frame(), number, sort_by, descending, title_filter, min_count)
+            else:
+                query, params = build_report_query(number, context.channels, sort_by, descending, title_filter, min_count)
+                row_chunks = stream_query(query, params, EXPORT_CHUNK_ROWS)
+            with st.spinner("Exporting..."):
+                total = export_report(number, row_chunks, path, file_format)
+        except Exception as error:
+            st.error(f"Error exporting report: {error}")
+            return
+        size_mb = os.path.getsize(path) / 2 ** 20
+        if size_mb > EXPORT_DOWNLOAD_MAX_MB:
+            st.info(f"Exported {total:,} rows ({size_mb:,.0f} MB) to {os.path.abspath(path)} on the server; "
+                    f"downloads are limited to {EXPORT_DOWNLOAD_MAX_MB:,.0f} MB.")
+            return
+        with open(path, "rb") as export_file:
+            st.download_button(f"Download {total:,} rows", export_file, file_name=os.path.basename(path), key=f"download_{number}")
+        # The download button keeps its own copy of the file
+        os.remove(path)
+
+# Function to display a report with an index starting from 1; reports may be
+# shared through the result cache, so the index is set on a copy
+def show_report(df):
+    df = df.set_axis(df.index + 1)
+    df.index.name = "S.no"
+    st.dataframe(df)
 
 
 if __name__ == "__main__":
     main()
+    # Rendered last so the panel includes the work done in this run
+    show_performance_panel()
@@ -0,0 +1,54 @@
+import pandas as pd
+import streamlit as st
+
+from metrics import METRICS_FILE, SLOW_QUERY_LOG, SLOW_QUERY_MS, metrics
+
+
+def timing_columns(series):
+    return {
+        "Calls": series["count"],
+        "Total s": round(series["seconds"], 3),
+        "Mean ms": round(1000 * series["seconds"] / series["count"], 1) if series["count"] else 0.0,
+        "Max ms": round(1000 * series["max_seconds"], 1),
+    }
+
+
+# Function to show stage timings, API calls and SQL latency of this server process in an
+# optional sidebar panel
+def show_performance_panel():
+    if not st.sidebar.checkbox("Show performance panel", key="show_performance_panel"):
+        return
+
+    snapshot = metrics.snapshot()
+    with st.sidebar.expander("Performance", expanded=True):
+        st.write("**Stages**")
+        stages_df = pd.DataFrame(
+            [{"Stage": stage, **timing_columns(series), "Errors": series["errors"]} for stage, series in snapshot["stages"].items()]
+        )
+        st.dataframe(stages_df.sort_values("Total s", ascending=False) if not stages_df.empty else stages_df, hide_index=True)
+
+        st.write("**YouTube API**")
+        http_df = pd.DataFrame([
+            {
+                "Endpoint": endpoint,
+                **timing_columns(series),
+                "Cached": series["statuses"].get("cached", 0) + series["statuses"].get(304, 0),
+                "Errors": sum(count for status, count in series["statuses"].items() if status == "error" or (isinstance(status, int) and status >= 400)),
+                "MB": round(series["bytes"] / 2 ** 20, 2),
+                "Quota units": series["quota_units"],
+            }
+            for endpoint, series in snapshot["http"].items()
+        ])
+        st.dataframe(http_df, hide_index=True)
+
+        st.write("**SQL**")
+        queries_df = pd.DataFrame(
+            [{"Query": label, **timing_columns(series), "Rows": series["rows"], "SQL": series["sql"]} for label, series in snapshot["queries"].items()]
+        )
+        st.dataframe(queries_df.sort_values("Total s", ascending=False) if not queries_df.empty else queries_df, hide_index=True)
+
+        st.write(f"**Slow queries** (over {SLOW_QUERY_MS:g} ms, {snapshot['slow_query_count']} in total)")
+        if snapshot["slow_queries"]:
+            st.dataframe(pd.DataFrame(snapshot["slow_queries"][::-1]), hide_index=True)
+        st.caption(f"Metrics file: {METRICS_FILE or 'disabled'} · Slow query log: {SLOW_QUERY_LOG or 'disabled'}")
+        st.button("Reset metrics", on_click=metrics.reset)
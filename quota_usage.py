@@ -0,0 +1,104 @@
+# Daily quota usage of an API key kept in MySQL (the api_quota_usage table), so every
+# process calling the API with the key draws on one budget. An in-memory QuotaBudget
+# starts at zero in each process and after every restart, so a cron run, the job workers
+# and the Streamlit server would each assume the whole YT_DAILY_QUOTA.
+#
+# A process does not write every API call: it leases units from the table in blocks of
+# YT_QUOTA_LEASE_UNITS with one conditional upsert and spends them from memory. Units
+# leased but not spent when a process stops stay counted as used, so the leak is at most
+# one block per process. The store has a connection of its own rather than one from the
+# pool the Analytics page and the job workers share.
+
+import hashlib
+import os
+import threading
+
+from dotenv import load_dotenv
+
+from database import get_database_connection
+
+load_dotenv()
+
+QUOTA_LEASE_UNITS = int(os.getenv("YT_QUOTA_LEASE_UNITS", "100"))
+
+# Inserts report 1 row, updates 2 and an unchanged row (the units did not fit) 0
+LEASE_QUERY = """
+    INSERT INTO api_quota_usage (api_key_hash, quota_day, used_units) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE used_units = IF(used_units + VALUES(used_units) <= %s, used_units + VALUES(used_units), used_units)
+"""
+
+EXHAUST_QUERY = """
+    INSERT INTO api_quota_usage (api_key_hash, quota_day, used_units) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE used_units = GREATEST(used_units, VALUES(used_units))
+"""
+
+
+class MySQLQuotaStore:
+    def __init__(self, api_key, lease_units=QUOTA_LEASE_UNITS):
+        self.key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+        self.lease_units = lease_units
+        # Units leased from the table for lease_day and not spent yet
+        self.lease_day = None
+        self.leased = 0
+        self.connection = None
+        self.lock = threading.Lock()
+
+    # Function to run one statement on the store's own connection and commit it; must be
+    # called with the lock held
+    def run(self, query, params, fetch=False):
+        if self.connection is None or not self.connection.is_connected():
+            self.connection = get_database_connection()
+        try:
+            cursor = self.connection.cursor()
+            try:
+                cursor.execute(query, params)
+                result = cursor.fetchone() if fetch else cursor.rowcount
+                self.connection.commit()
+                return result
+            finally:
+                cursor.close()
+        except Exception:
+            # Start over on a new connection next time
+            self.connection.close()
+            self.connection = None
+            raise
+
+    def roll_over(self, day):
+        if self.lease_day != day:
+            self.lease_day, self.leased = day, 0
+
+    # Function to lease units for a quota day unless that would pass daily_units
+    def lease(self, day, units, daily_units):
+        return units <= daily_units and self.run(LEASE_QUERY, (self.key_hash, day, units, daily_units)) > 0
+
+    # Function to get the units used on a quota day by every process, not counting the
+    # units this process leased and has not spent
+    def used(self, day):
+        with self.lock:
+            self.roll_over(day)
+            row = self.run("SELECT used_units FROM api_quota_usage WHERE api_key_hash = %s AND quota_day = %s", (self.key_hash, day), fetch=True)
+            return max(0, (row[0] if row else 0) - self.leased)
+
+    # Function to spend units on a quota day unless that would pass daily_units; returns
+    # whether they were spent. A new block is leased only when the current one runs out,
+    # and the exact shortfall when a whole block no longer fits.
+    def reserve(self, day, units, daily_units):
+        with self.lock:
+            self.roll_over(day)
+            if units > self.leased:
+                needed = units - self.leased
+                block = max(needed, self.lease_units)
+                if not self.lease(day, block, daily_units):
+                    if block == needed or not self.lease(day, needed, daily_units):
+                        return False
+                    block = needed
+                self.leased += block
+            self.leased -= units
+            return True
+
+    # Function to mark a quota day as fully spent
+    def mark_exhausted(self, day, daily_units):
+        with self.lock:
+            self.roll_over(day)
+            self.run(EXHAUST_QUERY, (self.key_hash, day, daily_units))
+            self.leased = 0
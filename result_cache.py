@@ -0,0 +1,76 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+RESULT_CACHE_MB = float(os.getenv("RESULT_CACHE_MB", "256"))
+
+
+# Function to estimate the memory held by a cached value
+def estimate_size(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+# Thread-safe LRU cache bounded by the estimated memory of its values. Keys carry
+# the data versions of the channels they were computed from, so an ingest makes
+# old entries unreachable and they age out of the LRU order.
+class ResultCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.current_bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self.entries),
+                "evictions": self.evictions,
+                "used_mb": round(self.current_bytes / 2 ** 20, 2),
+                "max_mb": round(self.max_bytes / 2 ** 20, 2),
+            }
+
+
+# Shared by every Streamlit session in the server process
+result_cache = ResultCache(int(RESULT_CACHE_MB * 2 ** 20))
@@ -0,0 +1,214 @@
+# Columnar snapshot of the channel and video tables for the Analytics page.
+#
+# Each channel is one partition: SNAPSHOT_DIR/channel/<channel_id>.<version>.arrow and
+# SNAPSHOT_DIR/video/<channel_id>.<version>.arrow, where version is the channel's
+# data_version. The files are uncompressed Arrow IPC (Feather v2), so readers memory-map
+# them and only the pages of the projected columns are ever touched. The video file is
+# written first, so a channel file marks a complete partition, and the previous version
+# is kept for readers that listed the directory just before a refresh.
+#
+# Ingest refreshes a channel's partition once the channel is done; a refresh writes only
+# channels whose data_version changed and removes channels that no longer exist.
+#
+#   python snapshot.py    bring the snapshot up to date with the database
+
+import importlib.util
+import os
+import threading
+from urllib.parse import quote, unquote
+
+from dotenv import load_dotenv
+
+from database import get_database_connection
+from metrics import instrumented
+
+load_dotenv()
+
+# The snapshot is opt-in, as every ingest rewrites the partitions of the channels it
+# changed: it is kept only when SNAPSHOT_DIR is set, or in ./snapshot when the Analytics
+# page reads from it (ANALYTICS_SOURCE=snapshot). It also needs the optional pyarrow package.
+ANALYTICS_SOURCE = os.getenv("ANALYTICS_SOURCE", "mysql")
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR") or ("snapshot" if ANALYTICS_SOURCE == "snapshot" else "")
+SNAPSHOT_ENABLED = bool(SNAPSHOT_DIR) and importlib.util.find_spec("pyarrow") is not None
+
+# Versions of each partition kept on disk: the current one and the one before it
+SNAPSHOT_KEEP_VERSIONS = 2
+
+SNAPSHOT_TABLES = {
+    "channel": [
+        ("channel_id", "string"), ("channel_name", "string"), ("description", "string"),
+        ("subscriber_count", "int64"), ("total_videos", "int64"), ("total_views", "int64"),
+        ("channel_status", "string"), ("data_version", "int64"),
+    ],
+    "video": [
+        ("video_id", "string"), ("channel_id", "string"), ("title", "string"), ("description", "string"),
+        ("views", "int64"), ("likes", "int64"), ("total_comments", "int64"),
+        ("duration", "string"), ("duration_seconds", "int64"), ("published_at", "timestamp"),
+    ],
+}
+
+SNAPSHOT_QUERIES = {
+    table: f"SELECT {', '.join(name for name, _ in columns)} FROM {table} WHERE channel_id = %s"
+    for table, columns in SNAPSHOT_TABLES.items()
+}
+
+
+def get_schema(table):
+    import pyarrow as pa
+
+    types = {"string": pa.string(), "int64": pa.int64(), "timestamp": pa.timestamp("s")}
+    return pa.schema([(name, types[kind]) for name, kind in SNAPSHOT_TABLES[table]])
+
+
+def partition_path(directory, table, channel_id, version):
+    return os.path.join(directory, table, f"{quote(channel_id, safe='')}.{version}.arrow")
+
+
+# Function to list the partition files of a table as {channel_id: [versions]}, oldest first
+def list_partitions(directory, table):
+    partitions = {}
+    try:
+        names = os.listdir(os.path.join(directory, table))
+    except FileNotFoundError:
+        return partitions
+    for name in names:
+        if not name.endswith(".arrow"):
+            continue
+        channel_id, version, _ = name.rsplit(".", 2)
+        partitions.setdefault(unquote(channel_id), []).append(int(version))
+    return {channel_id: sorted(versions) for channel_id, versions in partitions.items()}
+
+
+# Function to get the latest complete version of every channel in the snapshot
+def read_versions(directory=SNAPSHOT_DIR):
+    return {channel_id: versions[-1] for channel_id, versions in list_partitions(directory, "channel").items()}
+
+
+# Function to build a typed Arrow table from database rows in the column order of the table
+def build_table(table, rows):
+    import pyarrow as pa
+
+    schema = get_schema(table)
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    return pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema)
+
+
+# Function to write a partition file atomically, so readers never map a partial file
+def write_partition(arrow_table, path):
+    from pyarrow import feather
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    feather.write_feather(arrow_table, temp_path, compression="uncompressed")
+    os.replace(temp_path, path)
+
+
+# Function to delete a channel's partition files, keeping the newest `keep` versions of each table
+def remove_partitions(directory, channel_id, keep=0):
+    for table in SNAPSHOT_TABLES:
+        versions = list_partitions(directory, table).get(channel_id, [])
+        for version in versions[:max(len(versions) - keep, 0)]:
+            try:
+                os.remove(partition_path(directory, table, channel_id, version))
+            except OSError:
+                pass
+
+
+# Function to write one channel's partition if its data_version is not in the snapshot yet.
+# Both tables are read in the same transaction, so the files agree with each other.
+# Returns True when a new version was written.
+def export_channel(cursor, channel_id, directory=SNAPSHOT_DIR):
+    cursor.execute(SNAPSHOT_QUERIES["channel"], (channel_id,))
+    channel_rows = cursor.fetchall()
+    if not channel_rows:
+        remove_partitions(directory, channel_id)
+        return False
+
+    version = channel_rows[0][-1]
+    if version in list_partitions(directory, "channel").get(channel_id, []):
+        return False
+
+    cursor.execute(SNAPSHOT_QUERIES["video"], (channel_id,))
+    write_partition(build_table("video", cursor.fetchall()), partition_path(directory, "video", channel_id, version))
+    write_partition(build_table("channel", channel_rows), partition_path(directory, "channel", channel_id, version))
+    remove_partitions(directory, channel_id, keep=SNAPSHOT_KEEP_VERSIONS)
+    return True
+
+
+# Function to refresh the partitions of the given channels after an ingest
+@instrumented("refresh_channel_snapshot")
+def refresh_channel_snapshot(channel_ids, directory=SNAPSHOT_DIR):
+    connection = get_database_connection()
+    cursor = connection.cursor()
+    try:
+        exported = 0
+        for channel_id in channel_ids:
+            exported += export_channel(cursor, channel_id, directory)
+            # End the read transaction so the next channel is read as of now
+            connection.rollback()
+        return exported
+    finally:
+        cursor.close()
+        connection.close()
+
+
+# Function to bring the whole snapshot up to date: export every channel whose data_version
+# changed and remove the partitions of channels that were deleted
+@instrumented("refresh_snapshot")
+def refresh_snapshot(directory=SNAPSHOT_DIR):
+    connection = get_database_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT channel_id, data_version FROM channel")
+        current = dict(cursor.fetchall())
+        connection.rollback()
+    finally:
+        cursor.close()
+        connection.close()
+
+    on_disk = read_versions(directory)
+    changed = [channel_id for channel_id, version in current.items() if on_disk.get(channel_id) != version]
+    removed = [channel_id for channel_id in on_disk if channel_id not in current]
+    for channel_id in removed:
+        remove_partitions(directory, channel_id)
+    exported = refresh_channel_snapshot(changed, directory) if changed else 0
+    return {"channels": len(current), "exported": exported, "removed": len(removed), "unchanged": len(current) - len(changed)}
+
+
+# Function to read the given (channel_id, version) partitions of a table into one Arrow table.
+# Files are memory-mapped and only the listed columns are read.
+def read_partitions(table, versions, columns, directory=SNAPSHOT_DIR):
+    import pyarrow as pa
+    from pyarrow import feather
+
+    tables = [
+        feather.read_table(partition_path(directory, table, channel_id, version), columns=columns, memory_map=True)
+        for channel_id, version in versions
+    ]
+    if not tables:
+        schema = get_schema(table)
+        return pa.schema([schema.field(column) for column in columns]).empty_table()
+    return pa.concat_tables(tables)
+
+
+# Function to get the catalog version of the snapshot: every channel's latest version
+def read_snapshot_version(directory=SNAPSHOT_DIR):
+    return tuple(sorted(read_versions(directory).items()))
+
+
+# Function to read the (channel_id, channel_name) rows of a snapshot catalog version
+def read_snapshot_channel_names(version, directory=SNAPSHOT_DIR):
+    names = read_partitions("channel", version, ["channel_id", "channel_name"], directory)
+    return list(zip(names.column("channel_id").to_pylist(), names.column("channel_name").to_pylist()))
+
+
+def main():
+    if not SNAPSHOT_ENABLED:
+        raise SystemExit("The snapshot needs SNAPSHOT_DIR or ANALYTICS_SOURCE=snapshot to be set and pyarrow to be installed.")
+    result = refresh_snapshot()
+    print(f"Snapshot in {SNAPSHOT_DIR}: {result['exported']} channel(s) exported, {result['removed']} removed, "
+          f"{result['unchanged']} unchanged of {result['channels']}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+# Append-only history of video and channel counts for the growth reports.
+#
+# Every save of a channel or its videos compares the new counts with the stored ones and
+# appends a row to video_statistics_history / channel_statistics_history only for what
+# changed, in the same transaction. The growth reports load the rows of a time window
+# plus the last row before it, and compute changes and rates per day with grouped
+# diffs over those rows.
+
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from metrics import instrumented
+
+VIDEO_HISTORY_COLUMNS = ["views", "likes", "total_comments"]
+CHANNEL_HISTORY_COLUMNS = ["subscriber_count", "total_videos", "total_views"]
+
+# Two saves within the same second keep the later counts
+RECORD_VIDEO_QUERY = """
+    INSERT INTO video_statistics_history (video_id, recorded_at, views, likes, total_comments)
+    VALUES (%s, UTC_TIMESTAMP(), %s, %s, %s)
+    ON DUPLICATE KEY UPDATE views = VALUES(views), likes = VALUES(likes), total_comments = VALUES(total_comments)
+"""
+
+RECORD_CHANNEL_QUERY = """
+    INSERT INTO channel_statistics_history (channel_id, recorded_at, subscriber_count, total_videos, total_views)
+    VALUES (%s, UTC_TIMESTAMP(), %s, %s, %s)
+    ON DUPLICATE KEY UPDATE subscriber_count = VALUES(subscriber_count), total_videos = VALUES(total_videos), total_views = VALUES(total_views)
+"""
+
+# The rows of the window, plus each video's last row before it as the starting value
+VIDEO_GROWTH_QUERY = """
+    SELECT video_id, title, channel_name, recorded_at, views FROM (
+        SELECT h.video_id, v.title, c.channel_name, h.recorded_at, h.views,
+               ROW_NUMBER() OVER (PARTITION BY h.video_id ORDER BY h.recorded_at DESC) AS position
+        FROM video v
+        JOIN channel c ON c.channel_id = v.channel_id
+        JOIN video_statistics_history h ON h.video_id = v.video_id
+        WHERE v.channel_id IN ({channels}) AND h.recorded_at <= %s
+    ) baseline
+    WHERE position = 1
+    UNION ALL
+    SELECT h.video_id, v.title, c.channel_name, h.recorded_at, h.views
+    FROM video v
+    JOIN channel c ON c.channel_id = v.channel_id
+    JOIN video_statistics_history h ON h.video_id = v.video_id
+    WHERE v.channel_id IN ({channels}) AND h.recorded_at > %s
+"""
+
+CHANNEL_GROWTH_QUERY = """
+    SELECT channel_id, channel_name, recorded_at, subscriber_count FROM (
+        SELECT h.channel_id, c.channel_name, h.recorded_at, h.subscriber_count,
+               ROW_NUMBER() OVER (PARTITION BY h.channel_id ORDER BY h.recorded_at DESC) AS position
+        FROM channel_statistics_history h
+        JOIN channel c ON c.channel_id = h.channel_id
+        WHERE h.channel_id IN ({channels}) AND h.recorded_at <= %s
+    ) baseline
+    WHERE position = 1
+    UNION ALL
+    SELECT h.channel_id, c.channel_name, h.recorded_at, h.subscriber_count
+    FROM channel_statistics_history h
+    JOIN channel c ON c.channel_id = h.channel_id
+    WHERE h.channel_id IN ({channels}) AND h.recorded_at > %s
+"""
+
+
+# Function to append the counts of new videos and of videos whose counts changed. Both
+# arguments map video_id -> (title, views, likes, total_comments, duration_seconds), as
+# get_stored_video_stats returns them. Returns the number of rows appended.
+def record_video_statistics(cursor, previous_stats, new_stats):
+    changed = [
+        (video_id, *stats[1:4])
+        for video_id, stats in new_stats.items()
+        if video_id not in previous_stats or previous_stats[video_id][1:4] != tuple(stats[1:4])
+    ]
+    if changed:
+        cursor.executemany(RECORD_VIDEO_QUERY, changed)
+    return len(changed)
+
+
+# Function to get a channel's stored (subscriber_count, total_videos, total_views), or None
+def get_stored_channel_stats(cursor, channel_id):
+    cursor.execute(f"SELECT {', '.join(CHANNEL_HISTORY_COLUMNS)} FROM channel WHERE channel_id = %s", (channel_id,))
+    row = cursor.fetchone()
+    return tuple(row) if row else None
+
+
+# Function to append a channel's counts if they changed; returns whether a row was appended
+def record_channel_statistics(cursor, channel_id, previous, current):
+    if previous is not None and tuple(previous) == tuple(current):
+        return False
+    cursor.execute(RECORD_CHANNEL_QUERY, (channel_id, *current))
+    return True
+
+
+# Function to compute the change of a count over the window for each key from its history
+# rows (the last row before the window and the rows within it). Consecutive rows are
+# diffed per key, so the change and the fastest rate between two snapshots come from
+# grouped window operations rather than a loop over keys. A count is only known to have
+# changed somewhere between two snapshots, so the change of an interval that starts
+# before the window is counted in proportion to the part of it inside the window.
+@instrumented("compute_growth")
+def compute_growth(history, key, column, window_start, as_of):
+    history = history[history[column].notna()].sort_values([key, "recorded_at"], kind="stable")
+    grouped = history.groupby(key, sort=False)
+    change = grouped[column].diff().astype("float64")
+    previous_at = grouped["recorded_at"].shift()
+    elapsed = (history["recorded_at"] - previous_at).dt.total_seconds()
+    in_window = (history["recorded_at"] - previous_at.clip(lower=window_start)).dt.total_seconds()
+    history = history.assign(
+        change=change * (in_window / elapsed.where(elapsed > 0)).fillna(1),
+        change_per_day=change / (elapsed.where(elapsed > 0) / 86400),
+    )
+
+    grouped = history.groupby(key, sort=False)
+    growth = grouped.agg(
+        current=(column, "last"),
+        change=("change", "sum"),
+        peak_per_day=("change_per_day", "max"),
+        started_at=("recorded_at", "first"),
+    )
+    # A key first seen within the window is measured from its first row
+    days = (as_of - growth["started_at"].clip(lower=window_start)).dt.total_seconds() / 86400
+    growth["per_day"] = growth["change"] / days.where(days > 0)
+    return growth
+
+
+# Function to load a growth query's rows for the selected channels from window_start on
+def load_history(execute_query, query, columns, channel_ids, window_start):
+    placeholders = ','.join(['%s'] * len(channel_ids))
+    params = tuple(channel_ids) + (window_start,) + tuple(channel_ids) + (window_start,)
+    rows = execute_query(query.format(channels=placeholders), params)
+    if rows is None:
+        return None
+    history = pd.DataFrame(rows, columns=columns)
+    history[columns[-1]] = pd.to_numeric(history[columns[-1]], errors="coerce").astype("Int64")
+    history["recorded_at"] = pd.to_datetime(history["recorded_at"])
+    return history
+
+
+# Function to get the start of a window of the last `days` days and the time it is measured
+# up to, both as naive UTC like the recorded_at columns
+def get_window(days, as_of=None):
+    as_of = as_of or datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    return as_of - timedelta(days=days), as_of
+
+
+# Function to build the views-per-day report of the selected channels' videos over the
+# last `days` days, fastest growing first; returns None when the query failed
+def get_video_growth_report(execute_query, channel_ids, days, top_n, as_of=None):
+    window_start, as_of = get_window(days, as_of)
+    history = load_history(execute_query, VIDEO_GROWTH_QUERY, ["video_id", "title", "channel_name", "recorded_at", "views"], channel_ids, window_start)
+    if history is None:
+        return None
+
+    growth = compute_growth(history, "video_id", "views", pd.Timestamp(window_start), pd.Timestamp(as_of))
+    names = history.drop_duplicates("video_id").set_index("video_id")[["title", "channel_name"]]
+    growth = growth.join(names).sort_values(["per_day", "change"], ascending=False, na_position="last", kind="stable").head(top_n)
+    return pd.DataFrame({
+        "Video Title": growth["title"],
+        "Channel Name": growth["channel_name"],
+        "Views": growth["current"],
+        f"Views Gained ({days}d)": growth["change"].round().astype("int64"),
+        "Views per Day": growth["per_day"].round(1),
+        "Peak Views per Day": growth["peak_per_day"].round(1),
+    }).reset_index(drop=True)
+
+
+# Function to build the subscriber change report of the selected channels over the last
+# `days` days; returns None when the query failed
+def get_subscriber_growth_report(execute_query, channel_ids, days, as_of=None):
+    window_start, as_of = get_window(days, as_of)
+    history = load_history(execute_query, CHANNEL_GROWTH_QUERY, ["channel_id", "channel_name", "recorded_at", "subscriber_count"], channel_ids, window_start)
+    if history is None:
+        return None
+
+    growth = compute_growth(history, "channel_id", "subscriber_count", pd.Timestamp(window_start), pd.Timestamp(as_of))
+    names = history.drop_duplicates("channel_id").set_index("channel_id")["channel_name"]
+    growth = growth.join(names).sort_values("change", ascending=False, kind="stable")
+    return pd.DataFrame({
+        "Channel Name": growth["channel_name"],
+        "Subscribers": growth["current"],
+        f"Subscriber Change ({days}d)": growth["change"].round().astype("int64"),
+        "Change per Day": growth["per_day"].round(1),
+    }).reset_index(drop=True)
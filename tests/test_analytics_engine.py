@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from analytics_engine import build_report_frame, compute_reports, get_published_in_year_report, get_top_viewed_report
+
+
+# execute_query stand-in that records the query and returns canned rows
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def __call__(self, query, params=None):
+        self.calls.append((" ".join(query.split()), params))
+        return self.rows
+
+
+def test_top_viewed_report_orders_and_limits_in_sql():
+    execute_query = FakeQuery([("Most", "Channel", 900), ("Next", "Channel", 800)])
+    report = get_top_viewed_report(execute_query, ["UC1", "UC2"], 2)
+    query, params = execute_query.calls[0]
+    assert "ORDER BY v.views DESC, v.video_id LIMIT %s" in query
+    assert params == ("UC1", "UC2", 2)
+    assert report.to_dict("list") == {"Video Title": ["Most", "Next"], "Channel Name": ["Channel", "Channel"], "Views": [900, 800]}
+
+
+def test_published_in_year_report_queries_a_published_at_range():
+    execute_query = FakeQuery([("UC3", "Three"), ("UC1", "One")])
+    report = get_published_in_year_report(execute_query, ["UC1", "UC2", "UC3"], 2022)
+    query, params = execute_query.calls[0]
+    assert "v.published_at >= %s AND v.published_at < %s" in query
+    assert params[-2:] == (datetime(2022, 1, 1), datetime(2023, 1, 1))
+    # Selection order, not the order the rows came back in
+    assert report["Channel Name"].tolist() == ["One", "Three"]
+
+
+def test_query_reports_pass_on_a_failed_query():
+    assert get_top_viewed_report(FakeQuery(None), ["UC1"], 10) is None
+    assert get_published_in_year_report(FakeQuery(None), ["UC1"]) is None
+
+
+# Report frame rows of two channels with videos and one without
+FRAME_ROWS = [
+    ("UC1", "One", 3, 600, "v1", "First", 100, 10, 1, 3661, datetime(2022, 3, 1)),
+    ("UC1", "One", 3, 600, "v2", "Second", 300, 5, 7, 60, datetime(2021, 6, 1)),
+    ("UC1", "One", 3, 600, "v3", "Third", 200, None, 2, None, datetime(2023, 1, 1)),
+    ("UC2", "Two", 1, 50, "v4", "Fourth", 50, 20, 0, 30, datetime(2022, 12, 31, 23, 59)),
+    ("UC3", "Three", 0, 0, None, None, None, None, None, None, None),
+]
+
+
+def test_compute_reports_from_one_frame():
+    frame = build_report_frame(FRAME_ROWS, ["UC1", "UC2", "UC3"])
+    reports = compute_reports(frame, top_n_overall=2, top_n_per_channel=1, year=2022)
+
+    assert reports[2].to_dict("list") == {"Channel Name": ["One", "Two", "Three"], "Total Videos": [3, 1, 0]}
+    assert reports[3].to_dict("list") == {"Video Title": ["Second", "Third"], "Channel Name": ["One", "One"], "Views": [300, 200]}
+    assert reports[5].to_dict("list") == {
+        "Video Title": ["First", "Fourth", "No videos found"],
+        "Total Likes": [10, 20, "N/A"],
+        "Channel Name": ["One", "Two", "Three"],
+    }
+    assert reports[7].to_dict("list") == {"Channel Name": ["One", "Two", "Three"], "Total Views": [600, 50, 0]}
+    # The range ends before the first instant of the next year
+    assert reports[8]["Channel Name"].tolist() == ["One", "Two"]
+    assert reports[9].to_dict("list") == {
+        "Channel Name": ["One", "Two", "Three"],
+        "Total Videos": [2, 1, 0],
+        "Total Duration (Seconds)": [3721, 30, 0],
+        "Average Duration (ISO 8601)": ["PT0H31M0S", "PT0H0M30S", "PT0H0M0S"],
+    }
+    assert reports[10]["Video Title"].tolist() == ["Second", "Fourth", "No videos found"]
+
+
+def test_compute_reports_only_the_requested_numbers():
+    frame = build_report_frame(FRAME_ROWS, ["UC1", "UC2", "UC3"])
+    assert sorted(compute_reports(frame, numbers=[5, 9])) == [5, 9]
+
+
+def test_compute_reports_keeps_several_top_videos_per_channel():
+    frame = build_report_frame([row for row in FRAME_ROWS if row[0] != "UC3"], ["UC2", "UC1"])
+    report = compute_reports(frame, top_n_per_channel=2, numbers=[10])[10]
+    # Channels in selection order, each channel's videos by comment count
+    assert report["Video Title"].tolist() == ["Fourth", "Second", "Third"]
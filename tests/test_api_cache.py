@@ -0,0 +1,56 @@
+import os
+import time
+
+from api_cache import ResponseCache, normalize_request, parse_ttls
+
+
+def test_cache_key_ignores_the_api_key_and_parameter_order():
+    assert normalize_request("videos", {"id": "a", "part": "snippet", "key": "secret"}) == "videos?id=a&part=snippet"
+    assert ResponseCache.key("videos", {"part": "snippet", "id": "a", "key": "one"}) == ResponseCache.key("videos", {"id": "a", "part": "snippet", "key": "two"})
+
+
+def test_parse_ttls():
+    ttls = parse_ttls("channels=600, videos=60")
+    assert ttls["channels"] == 600 and ttls["videos"] == 60 and ttls["search"] == 0
+
+
+def test_entries_are_fresh_only_within_their_ttl(tmp_path):
+    cache = ResponseCache(str(tmp_path), 2 ** 20, ttls={"channels": 300, "videos": 0})
+    cache.put("channels", {"id": "UC1"}, '"etag1"', {"items": [1]})
+    cache.put("videos", {"id": "v1"}, '"etag2"', {"items": [2]})
+
+    entry = cache.get("channels", {"id": "UC1"})
+    assert entry["fresh"] and entry["etag"] == '"etag1"' and entry["response"] == {"items": [1]}
+    assert not cache.get("videos", {"id": "v1"})["fresh"]
+
+    # Validated more than the TTL ago
+    path = cache.path(cache.key("channels", {"id": "UC1"}))
+    os.utime(path, (time.time() - 301, time.time() - 301))
+    assert not cache.get("channels", {"id": "UC1"})["fresh"]
+    cache.touch("channels", {"id": "UC1"})
+    assert cache.get("channels", {"id": "UC1"})["fresh"]
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    payload = {"items": ["x" * 100]}
+    probe = ResponseCache(str(tmp_path / "probe"), 2 ** 20)
+    probe.put("videos", {"id": "0"}, None, payload)
+    entry_size = probe.current_bytes
+
+    cache = ResponseCache(str(tmp_path / "cache"), entry_size * 2)
+    cache.put("videos", {"id": "1"}, None, payload)
+    cache.put("videos", {"id": "2"}, None, payload)
+    cache.get("videos", {"id": "1"})
+    cache.put("videos", {"id": "3"}, None, payload)
+
+    assert cache.get("videos", {"id": "2"}) is None
+    assert cache.get("videos", {"id": "1"}) is not None
+    assert cache.get("videos", {"id": "3"}) is not None
+    assert cache.stats()["evictions"] == 1
+    assert not os.path.exists(cache.path(cache.key("videos", {"id": "2"})))
+
+
+def test_index_is_reloaded_from_disk(tmp_path):
+    cache = ResponseCache(str(tmp_path), 2 ** 20)
+    cache.put("videos", {"id": "1"}, None, {"items": []})
+    assert ResponseCache(str(tmp_path), 2 ** 20).get("videos", {"id": "1"})["response"] == {"items": []}
@@ -0,0 +1,47 @@
+from channel_catalog import ChannelCatalog, ChannelCatalogService
+
+ROWS = [("UC1", "Music Box"), ("UC2", "music lab"), ("UC3", "The Music"), ("UC4", "Cooking"), ("UC5", ""), ("UC6", "Cooking")]
+
+
+def test_search_lists_prefix_matches_before_substring_matches():
+    catalog = ChannelCatalog(ROWS)
+    assert catalog.search("mus") == ["UC1", "UC2", "UC3"]
+    assert catalog.search("  MUSIC l") == ["UC2"]
+    assert catalog.search("zzz") == []
+
+
+def test_search_matches_channel_ids_and_respects_the_limit():
+    catalog = ChannelCatalog(ROWS)
+    assert catalog.search("UC4") == ["UC4"]
+    assert catalog.search("music", limit=2) == ["UC1", "UC2"]
+    assert catalog.search("", limit=3) == ["UC5", "UC4", "UC6"]
+
+
+def test_labels_show_the_id_when_the_name_is_ambiguous():
+    catalog = ChannelCatalog(ROWS)
+    assert catalog.label("UC1") == "Music Box"
+    assert catalog.label("UC4") == "Cooking (UC4)"
+    assert catalog.label("UC5") == "UC5"
+    assert catalog.label("UC9") == "UC9 (not found)"
+
+
+def test_service_reloads_only_when_the_version_changes():
+    service = ChannelCatalogService(refresh_seconds=0)
+    versions = iter([(6, 6), (6, 6), (7, 7)])
+    loaded = []
+
+    def load_rows(version):
+        loaded.append(version)
+        return ROWS
+
+    first = service.get_from(lambda: next(versions), load_rows)
+    assert service.get_from(lambda: next(versions), load_rows) is first
+    assert service.get_from(lambda: next(versions), load_rows) is not first
+    assert loaded == [(6, 6), (7, 7)]
+
+
+def test_service_keeps_the_last_catalog_when_the_source_fails():
+    service = ChannelCatalogService(refresh_seconds=0)
+    catalog = service.get_from(lambda: 1, lambda version: ROWS)
+    assert service.get_from(lambda: None, lambda version: ROWS) is catalog
+    assert service.get_from(lambda: 2, lambda version: None) is catalog
@@ -0,0 +1,115 @@
+from channel_summary import SUMMARY_COLUMNS, beats, update_channel_summary
+
+
+# Cursor that answers the summary row lookup and records every statement
+class FakeCursor:
+    def __init__(self, summary_row):
+        self.summary_row = summary_row
+        self.statements = []
+
+    def execute(self, query, params=None):
+        self.statements.append((" ".join(query.split()), params))
+
+    def fetchone(self):
+        return self.summary_row
+
+    def fetchall(self):
+        return []
+
+    def saved_summary(self):
+        saved = [params for query, params in self.statements if query.startswith("INSERT INTO channel_summary")]
+        return dict(zip(SUMMARY_COLUMNS, saved[-1])) if saved else None
+
+    def rebuilt(self):
+        return any("ROW_NUMBER()" in query for query, _ in self.statements)
+
+
+def summary_row(**values):
+    summary = {
+        "channel_id": "UC1", "video_count": 2, "total_views": 300, "duration_videos": 2, "duration_seconds_total": 120,
+        "top_liked_video_id": "v1", "top_liked_title": "one", "top_liked_likes": 10,
+        "top_commented_video_id": "v2", "top_commented_title": "two", "top_commented_comments": 5,
+    }
+    summary.update(values)
+    return tuple(summary[column] for column in SUMMARY_COLUMNS)
+
+
+def test_beats_prefers_higher_counts_then_lower_video_ids():
+    assert beats(5, "b", None, None)
+    assert beats(6, "b", 5, "a")
+    assert not beats(4, "a", 5, "b")
+    assert beats(5, "a", 5, "b")
+    assert not beats(5, "b", 5, "a")
+
+
+def test_beats_ranks_null_counts_last():
+    assert beats(0, "b", None, "a")
+    assert not beats(None, "a", 0, "b")
+    assert not beats(None, "a", None, "b")
+
+
+def test_beats_compares_video_ids_by_code_point():
+    # Binary order, not a case-insensitive collation: "B" < "a"
+    assert beats(5, "B", 5, "a")
+    assert not beats(5, "a", 5, "B")
+
+
+def test_new_video_is_added_to_the_totals():
+    cursor = FakeCursor(summary_row())
+    update_channel_summary(cursor, "UC1", {}, {"v3": ("three", 50, 1, 0, 30)})
+    summary = cursor.saved_summary()
+    assert summary["video_count"] == 3
+    assert summary["total_views"] == 350
+    assert summary["duration_videos"] == 3
+    assert summary["duration_seconds_total"] == 150
+    assert summary["top_liked_video_id"] == "v1"
+    assert not cursor.rebuilt()
+
+
+def test_updated_video_adds_only_the_difference():
+    cursor = FakeCursor(summary_row())
+    update_channel_summary(cursor, "UC1", {"v2": ("two", 100, 3, 5, 60)}, {"v2": ("two", 130, 3, 5, None)})
+    summary = cursor.saved_summary()
+    assert summary["video_count"] == 2
+    assert summary["total_views"] == 330
+    assert summary["duration_videos"] == 1
+    assert summary["duration_seconds_total"] == 60
+
+
+def test_video_that_beats_the_top_video_replaces_it():
+    cursor = FakeCursor(summary_row())
+    update_channel_summary(cursor, "UC1", {}, {"v0": ("zero", 1, 10, 7, None)})
+    summary = cursor.saved_summary()
+    # Ties on likes go to the lower video_id
+    assert (summary["top_liked_video_id"], summary["top_liked_title"], summary["top_liked_likes"]) == ("v0", "zero", 10)
+    assert (summary["top_commented_video_id"], summary["top_commented_comments"]) == ("v0", 7)
+
+
+def test_top_video_that_grows_keeps_its_place_with_new_values():
+    cursor = FakeCursor(summary_row())
+    update_channel_summary(cursor, "UC1", {"v1": ("one", 200, 10, 1, 60)}, {"v1": ("renamed", 200, 12, 1, 60)})
+    summary = cursor.saved_summary()
+    assert (summary["top_liked_video_id"], summary["top_liked_title"], summary["top_liked_likes"]) == ("v1", "renamed", 12)
+    assert not cursor.rebuilt()
+
+
+def test_top_video_that_drops_rebuilds_the_channel():
+    cursor = FakeCursor(summary_row())
+    update_channel_summary(cursor, "UC1", {"v1": ("one", 200, 10, 1, 60)}, {"v1": ("one", 200, 9, 1, 60)})
+    assert cursor.rebuilt()
+
+
+def test_top_video_whose_count_is_hidden_rebuilds_the_channel():
+    cursor = FakeCursor(summary_row())
+    update_channel_summary(cursor, "UC1", {"v2": ("two", 100, 3, 5, 60)}, {"v2": ("two", 100, 3, None, 60)})
+    assert cursor.rebuilt()
+
+
+def test_new_or_missing_summary_row_is_rebuilt():
+    cursor = FakeCursor(None)
+    update_channel_summary(cursor, "UC1", {}, {"v1": ("one", 1, 1, 1, 1)})
+    assert cursor.rebuilt()
+
+    cursor = FakeCursor(summary_row())
+    update_channel_summary(cursor, "UC1", {}, {"v1": ("one", 1, 1, 1, 1)}, created=True)
+    assert cursor.rebuilt()
@@ -0,0 +1,34 @@
+import pandas as pd
+
+from database import normalize_video_rows, parse_iso8601_durations, to_count
+
+
+def test_parse_iso8601_durations():
+    seconds = parse_iso8601_durations(["PT1H2M3S", "PT45S", "PT10M", "P1DT2H", "PT0S"])
+    assert seconds.tolist() == [3723, 45, 600, 93600, 0]
+
+
+def test_parse_iso8601_durations_keeps_missing_values_null():
+    seconds = parse_iso8601_durations([None, "", "not a duration", "PT5S"])
+    assert seconds.isna().tolist() == [True, True, True, False]
+    assert seconds.iloc[3] == 5
+
+
+def test_to_count():
+    assert to_count("12") == 12
+    assert to_count(None) is None
+    assert to_count("Not Available") is None
+
+
+def test_normalize_video_rows():
+    rows = normalize_video_rows([
+        ("v1", "UC1", "One", "", "10", "Not Available", "3", "PT1M5S", "2024-01-31T12:00:00Z"),
+        ("v2", "UC1", "Two", "", None, "4", "0", None, "2022-06-01T00:00:00Z"),
+    ])
+    assert rows[0] == ("v1", "UC1", "One", "", 10, None, 3, "PT1M5S", "2024-01-31 12:00:00", 65)
+    assert rows[1] == ("v2", "UC1", "Two", "", None, 4, 0, None, "2022-06-01 00:00:00", None)
+    assert not any(value is pd.NA for row in rows for value in row)
+
+
+def test_normalize_video_rows_without_videos():
+    assert normalize_video_rows([]) == []
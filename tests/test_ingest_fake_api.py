@@ -0,0 +1,110 @@
+from datetime import datetime
+
+import pytest
+
+import ingest
+from benchmarks.fake_youtube_api import PRIVATE_EVERY, FakeYouTubeAPI, fake_channel_id, video_id
+from youtube_api import YouTubeClient
+
+VIDEOS = 120
+CHANNEL_ID = fake_channel_id(VIDEOS)
+
+
+class FakeConnection:
+    def close(self):
+        pass
+
+
+# Replaces every database call of ingest with in-memory stand-ins, recording what would be
+# saved. stored_video_ids are the channel's videos already in the database.
+@pytest.fixture
+def database(monkeypatch):
+    saved = {"pages": [], "refreshed": [], "stored_video_ids": [], "latest_published_at": None}
+
+    def iter_stored_video_ids(connection, channel_id, published_before, batch_size=50):
+        for start in range(0, len(saved["stored_video_ids"]), batch_size):
+            yield saved["stored_video_ids"][start:start + batch_size]
+
+    def update_video_statistics(connection, channel_id, video_stats):
+        saved["refreshed"].append(video_stats)
+        return len(video_stats)
+
+    monkeypatch.setattr(ingest, "SNAPSHOT_ENABLED", False)
+    monkeypatch.setattr(ingest, "get_checkpoint", lambda channel_id, mode: None)
+    monkeypatch.setattr(ingest, "clear_checkpoint", lambda channel_id: None)
+    monkeypatch.setattr(ingest, "get_latest_published_at", lambda channel_id: saved["latest_published_at"])
+    monkeypatch.setattr(ingest, "get_stored_video_count", lambda channel_id: len(saved["stored_video_ids"]))
+    monkeypatch.setattr(ingest, "save_channel_details_to_database",
+                        lambda channel_data, video_data, checkpoint=None: saved["pages"].append(video_data))
+    monkeypatch.setattr(ingest, "save_channel_statistics", lambda channel_data: None)
+    monkeypatch.setattr(ingest, "get_database_connection", FakeConnection)
+    monkeypatch.setattr(ingest, "iter_stored_video_ids", iter_stored_video_ids)
+    monkeypatch.setattr(ingest, "update_video_statistics", update_video_statistics)
+    return saved
+
+
+# Function to start the fake API and a client for it with no rate limit and no backoff wait
+@pytest.fixture
+def fake_api(request):
+    api = FakeYouTubeAPI({CHANNEL_ID: VIDEOS}, **getattr(request, "param", {})).start()
+    client = YouTubeClient("test-key", requests_per_second=10 ** 6, daily_quota=10 ** 6, max_retries=10,
+                           backoff_base=0, base_url=api.base_url)
+    yield api, client
+    api.stop()
+
+
+def saved_videos(database):
+    return [video for page in database["pages"] for video in page]
+
+
+def test_full_ingest_resolves_statistics_in_batches_of_50(database, fake_api):
+    api, client = fake_api
+    result = ingest.ingest_channel("test-key", CHANNEL_ID, client, incremental=False)
+
+    assert result["Status"] == "Success"
+    assert result["Videos Saved"] == VIDEOS
+    calls = api.stats()["calls"]
+    assert calls["search"] == 3
+    assert calls["videos"] == 3  # ceil(120 / 50)
+    assert len(saved_videos(database)) == VIDEOS
+
+
+def test_videos_missing_from_videos_list_are_not_available(database, fake_api):
+    _, client = fake_api
+    ingest.ingest_channel("test-key", CHANNEL_ID, client, incremental=False)
+
+    videos = {video["Video ID"]: video for video in saved_videos(database)}
+    missing = videos[video_id(CHANNEL_ID, PRIVATE_EVERY - 1)]
+    assert (missing["Views"], missing["Likes"], missing["Total Comments"], missing["Duration"]) == ("Not Available",) * 3 + (None,)
+    assert videos[video_id(CHANNEL_ID, 0)]["Views"] == "100"
+
+
+def test_incremental_sync_refreshes_only_videos_stored_before_it(database, fake_api):
+    api, client = fake_api
+    # Videos 0-19 are new uploads; the listing stops after reaching the newest stored video, 20
+    database["stored_video_ids"] = [video_id(CHANNEL_ID, index) for index in range(20, VIDEOS)]
+    database["latest_published_at"] = datetime.strptime(api.published_at(CHANNEL_ID, 20), "%Y-%m-%dT%H:%M:%SZ")
+
+    result = ingest.ingest_channel("test-key", CHANNEL_ID, client)
+
+    assert result["Status"] == "Success"
+    assert result["Videos Saved"] == 21
+    assert result["Stats Refreshed"] == VIDEOS - 20 - 1  # video 96 is missing from videos.list
+    calls = api.stats()["calls"]
+    assert calls["playlistItems"] == 1
+    assert calls["search"] == 0
+    assert calls["videos"] == 1 + 2  # one batch for the new uploads, ceil(100 / 50) to refresh
+    assert [len(video_stats) for video_stats in database["refreshed"]] == [50, 49]
+
+
+@pytest.mark.parametrize("fake_api", [{"error_rate": 0.3, "seed": 1}], indirect=True)
+def test_ingest_retries_transient_server_errors(database, fake_api):
+    api, client = fake_api
+    result = ingest.ingest_channel("test-key", CHANNEL_ID, client, incremental=False)
+
+    stats = api.stats()
+    assert stats["errors_sent"] > 0
+    assert result["Status"] == "Success"
+    assert result["Videos Saved"] == VIDEOS
+    # Every error was retried: each endpoint was called once per page plus once per error
+    assert stats["total_calls"] == 1 + 3 + 3 + stats["errors_sent"]
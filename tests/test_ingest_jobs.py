@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import ingest_jobs
+from ingest_jobs import enqueue_job, finish_job, get_jobs, requeue_stale_jobs, start_job
+from youtube_api import QUOTA_TIMEZONE, next_quota_reset
+
+QUOTA_RESET = datetime(2024, 1, 2, 8, 0)
+
+
+# In-memory stand-in for the ingest_job table, answering the statements of ingest_jobs like
+# MySQL would, including the unique key that allows one queued or running job per channel
+class FakeJobTable:
+    def __init__(self):
+        self.jobs = {}
+        self.now = datetime(2024, 1, 1, 12, 0)
+
+    def active_job(self, channel_id):
+        return next((job for job in self.jobs.values() if job["channel_id"] == channel_id and job["status"] in ("queued", "running")), None)
+
+    def insert(self, channel_id, mode, **values):
+        existing = self.active_job(channel_id)
+        if existing:
+            # The duplicate key update changes nothing, so no row is counted
+            return 0, existing["job_id"]
+        job_id = len(self.jobs) + 1
+        job = {column: None for column in ingest_jobs.JOB_COLUMNS}
+        job.update(job_id=job_id, channel_id=channel_id, mode=mode, status="queued", videos_saved=0, stats_refreshed=0,
+                   attempts=0, worker_id=None, heartbeat_at=None)
+        self.jobs[job_id] = dict(job, **values)
+        return 1, job_id
+
+    # Updates a job only while the given worker still holds it
+    def update(self, job_id, holder, **values):
+        job = self.jobs.get(job_id)
+        if not job or job["worker_id"] != holder:
+            return 0, 0
+        job.update(values)
+        return 1, 0
+
+    def run_statement(self, query, params=None, fetch=False):
+        query = " ".join(query.split())
+        if query.startswith("INSERT INTO ingest_job (channel_id, mode) VALUES"):
+            return self.insert(*params)
+        if query.startswith("INSERT INTO ingest_job (channel_id, mode, status"):
+            return self.insert(params[0], params[1], status="running", worker_id=params[2], attempts=1, started_at=self.now, heartbeat_at=self.now)
+        if query.startswith("SELECT"):
+            return [tuple(self.jobs[job_id][column] for column in ingest_jobs.JOB_COLUMNS) for job_id in params if job_id in self.jobs]
+        if "SET status = 'queued', worker_id = NULL, error" in query:
+            error, run_after, job_id, worker_id = params
+            return self.update(job_id, worker_id, status="queued", worker_id=None, error=error, run_after=run_after)
+        if "SET status = %s" in query:
+            status, channel_name, videos_saved, stats_refreshed, error, job_id, worker_id = params
+            return self.update(job_id, worker_id, status=status, channel_name=channel_name, videos_saved=videos_saved,
+                               stats_refreshed=stats_refreshed, error=error, finished_at=self.now)
+        if "heartbeat_at < NOW() - INTERVAL" in query:
+            stale = [job for job in self.jobs.values()
+                     if job["status"] == "running" and job["heartbeat_at"] < self.now - timedelta(seconds=params[0])]
+            for job in stale:
+                job.update(status="queued", worker_id=None)
+            return len(stale), 0
+        raise AssertionError(f"Unexpected statement: {query}")
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = FakeJobTable()
+    monkeypatch.setattr(ingest_jobs, "run_statement", table.run_statement)
+    monkeypatch.setattr(ingest_jobs, "next_quota_reset", lambda: QUOTA_RESET)
+    return table
+
+
+def result(status, error=""):
+    return {"Status": status, "Channel Name": "Channel", "Videos Saved": 5, "Stats Refreshed": 0, "Error": error}
+
+
+def test_a_channel_has_one_active_job(table):
+    job_id, created = enqueue_job("UC1")
+    assert created
+    assert enqueue_job("UC1") == (job_id, False)
+    assert enqueue_job("UC2")[1]
+
+    # A job started by ingest_cli is skipped while the channel is queued
+    assert start_job("UC1", "cli") is None
+
+
+def test_a_finished_channel_can_be_queued_again(table):
+    job_id = start_job("UC1", "worker")
+    finish_job(job_id, "worker", result("Success"))
+    assert get_jobs([job_id])[0]["status"] == "succeeded"
+
+    new_job_id, created = enqueue_job("UC1")
+    assert created and new_job_id != job_id
+
+
+def test_a_deferred_job_is_queued_again_after_the_quota_reset(table):
+    job_id = start_job("UC1", "worker")
+    finish_job(job_id, "worker", result("Deferred", "Needs about 300 quota units, 0 left today"))
+
+    job = get_jobs([job_id])[0]
+    assert (job["status"], job["run_after"]) == ("queued", QUOTA_RESET)
+    assert job["error"].startswith("Deferred until the quota resets")
+    # Still the channel's active job, so it is not queued twice
+    assert enqueue_job("UC1") == (job_id, False)
+
+
+def test_a_deferred_job_can_be_finished_instead(table):
+    job_id = start_job("UC1", "cli")
+    finish_job(job_id, "cli", result("Deferred"), requeue_deferred=False)
+    assert get_jobs([job_id])[0]["status"] == "deferred"
+
+
+def test_stale_running_jobs_are_queued_again(table):
+    stale_job_id = start_job("UC1", "dead-worker")
+    table.now += timedelta(minutes=10)
+    live_job_id = start_job("UC2", "live-worker")
+
+    assert requeue_stale_jobs(stale_seconds=120) == 1
+    assert [job["status"] for job in get_jobs([stale_job_id, live_job_id])] == ["queued", "running"]
+
+    # The dead worker's late result does not overwrite the requeued job
+    finish_job(stale_job_id, "dead-worker", result("Failed", "boom"))
+    assert get_jobs([stale_job_id])[0]["status"] == "queued"
+
+
+def test_next_quota_reset_is_midnight_pacific_in_utc():
+    assert next_quota_reset(datetime(2024, 3, 9, 20, 0, tzinfo=QUOTA_TIMEZONE)) == datetime(2024, 3, 10, 8, 0)
+    # After the switch to daylight saving time midnight is 07:00 UTC
+    assert next_quota_reset(datetime(2024, 3, 10, 12, 0, tzinfo=QUOTA_TIMEZONE)) == datetime(2024, 3, 11, 7, 0)
+    # 07:30 UTC is still the previous evening in Pacific Time
+    assert next_quota_reset(datetime(2024, 3, 10, 7, 30, tzinfo=timezone.utc)) == datetime(2024, 3, 10, 8, 0)
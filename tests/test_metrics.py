@@ -0,0 +1,40 @@
+from metrics import Metrics
+
+
+def test_merge_adds_worker_series_to_the_parent():
+    parent = Metrics()
+    parent.record_http("videos", 200, 0.5, 100, 1)
+    parent.record_stage("sync_channel", 2.0)
+
+    worker = Metrics()
+    worker.record_http("videos", 200, 1.5, 50, 1)
+    worker.record_http("videos", 503, 0.1, 0, 0)
+    worker.record_http("search", 200, 0.2, 10, 100)
+    worker.record_stage("sync_channel", 1.0, failed=True)
+
+    parent.merge(worker.snapshot())
+    snapshot = parent.snapshot()
+
+    videos = snapshot["http"]["videos"]
+    assert videos["count"] == 3
+    assert videos["seconds"] == 2.1
+    assert videos["max_seconds"] == 1.5
+    assert videos["bytes"] == 150
+    assert videos["quota_units"] == 2
+    assert videos["statuses"] == {200: 2, 503: 1}
+    assert snapshot["http"]["search"]["quota_units"] == 100
+    assert snapshot["stages"]["sync_channel"] == {"count": 2, "seconds": 3.0, "max_seconds": 2.0, "errors": 1}
+
+
+def test_merge_keeps_the_snapshot_unchanged():
+    worker = Metrics()
+    worker.record_http("videos", 200, 0.5, 100, 1)
+    snapshot = worker.snapshot()
+
+    parent = Metrics()
+    parent.merge(snapshot)
+    parent.merge(snapshot)
+
+    assert snapshot["http"]["videos"]["count"] == 1
+    assert snapshot["http"]["videos"]["statuses"] == {200: 1}
+    assert parent.snapshot()["http"]["videos"]["statuses"] == {200: 2}
@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from paged_reports import build_report_query, page_report_frame, select_report_rows
+
+VIDEO_IDS = [f"v{i:02d}" for i in range(23)]
+
+
+def report_frame():
+    return pd.DataFrame({
+        "channel_id": "UC1",
+        "channel_name": "Channel",
+        "video_id": VIDEO_IDS,
+        "title": [None if i % 5 == 0 else f"title {i % 4}" for i in range(23)],
+        "likes": pd.array([None if i % 3 == 0 else i % 4 for i in range(23)], dtype="Int64"),
+        "total_comments": pd.array([i for i in range(23)], dtype="Int64"),
+    })
+
+
+def read_all_pages(frame, number, sort_by, descending, page_size):
+    rows, after = [], None
+    while True:
+        page, after, _ = page_report_frame(frame, number, sort_by, descending, after=after, page_size=page_size)
+        rows += page
+        if after is None:
+            return rows
+
+
+@pytest.mark.parametrize("sort_by", ["Total Likes", "Video Title"])
+@pytest.mark.parametrize("descending", [False, True])
+def test_keyset_pages_cover_every_row_once_in_order(sort_by, descending):
+    frame = report_frame()
+    expected = [tuple(None if pd.isna(value) else value for value in row)
+                for row in select_report_rows(frame, 6, sort_by, descending).iloc[:, :2].itertuples(index=False)]
+    assert read_all_pages(frame, 6, sort_by, descending, page_size=4) == expected
+    assert len(expected) == len(VIDEO_IDS)
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_null_sort_values_come_first_ascending_and_last_descending(descending):
+    rows = select_report_rows(report_frame(), 6, "Total Likes", descending)
+    nulls = rows["sort_key"].isna().tolist()
+    assert nulls == sorted(nulls, reverse=not descending)
+
+
+def test_report_query_pages_on_the_raw_column():
+    query, params = build_report_query(6, ["UC1", "UC2"], "Total Likes", descending=True, after=(3, "v07"), limit=11)
+    assert "COALESCE" not in query
+    assert "(v.likes < %s OR (v.likes = %s AND v.video_id < %s) OR v.likes IS NULL)" in query
+    assert "ORDER BY v.likes DESC, v.video_id DESC" in query
+    assert query.rstrip().endswith("LIMIT 11")
+    assert params == ("UC1", "UC2", 3, 3, "v07")
+
+
+def test_report_query_after_a_null_sort_value():
+    query, params = build_report_query(6, ["UC1"], "Total Likes", after=(None, "v07"))
+    assert "(v.likes IS NOT NULL OR v.video_id > %s)" in query
+    assert params == ("UC1", "v07")
+
+    query, params = build_report_query(6, ["UC1"], "Total Likes", descending=True, after=(None, "v07"))
+    assert "(v.likes IS NULL AND v.video_id < %s)" in query
+
+
+def test_report_query_filters():
+    query, params = build_report_query(4, ["UC1"], "Number of Comments", title_filter="50%_off", min_count=2)
+    assert "v.title LIKE %s" in query and "v.total_comments >= %s" in query
+    assert params == ("UC1", "%50\\%\\_off%", 2)
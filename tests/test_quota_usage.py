@@ -0,0 +1,96 @@
+import pytest
+
+import quota_usage
+from quota_usage import MySQLQuotaStore
+
+
+# In-memory stand-in for the api_quota_usage row of one key and day, answering the
+# store's statements like MySQL would
+class FakeQuotaTable:
+    def __init__(self):
+        self.used_units = 0
+        self.statements = 0
+
+    def connect(self):
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, table):
+        self.table = table
+
+    def is_connected(self):
+        return True
+
+    def cursor(self):
+        return FakeCursor(self.table)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, table):
+        self.table = table
+        self.rowcount = 0
+        self.row = None
+
+    def execute(self, query, params):
+        self.table.statements += 1
+        if query.strip().startswith("SELECT"):
+            self.row = (self.table.used_units,)
+        elif "GREATEST" in query:
+            self.table.used_units = max(self.table.used_units, params[2])
+        elif self.table.used_units + params[2] <= params[3]:
+            self.table.used_units += params[2]
+            self.rowcount = 2
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = FakeQuotaTable()
+    monkeypatch.setattr(quota_usage, "get_database_connection", table.connect)
+    return table
+
+
+def test_units_are_leased_in_blocks(table):
+    store = MySQLQuotaStore("key", lease_units=100)
+    assert all(store.reserve("2024-01-01", 1, 10000) for _ in range(250))
+    assert table.statements == 3
+    assert table.used_units == 300
+    # Leased but unspent units are not reported as used
+    assert store.used("2024-01-01") == 250
+
+
+def test_processes_share_the_daily_limit(table):
+    first, second = MySQLQuotaStore("key", lease_units=100), MySQLQuotaStore("key", lease_units=100)
+    assert first.reserve("2024-01-01", 100, 250)
+    assert second.reserve("2024-01-01", 100, 250)
+    # A whole block no longer fits, the exact shortfall does
+    assert first.reserve("2024-01-01", 50, 250)
+    assert not second.reserve("2024-01-01", 1, 250)
+    assert table.used_units == 250
+
+
+def test_mark_exhausted_spends_the_day_and_drops_the_lease(table):
+    store = MySQLQuotaStore("key", lease_units=100)
+    store.reserve("2024-01-01", 1, 1000)
+    store.mark_exhausted("2024-01-01", 1000)
+    assert store.used("2024-01-01") == 1000
+    assert not store.reserve("2024-01-01", 1, 1000)
+
+
+def test_a_new_day_starts_without_a_lease(table):
+    store = MySQLQuotaStore("key", lease_units=100)
+    store.reserve("2024-01-01", 1, 1000)
+    table.used_units = 0
+    assert store.used("2024-01-02") == 0
@@ -0,0 +1,80 @@
+import sys
+
+import pandas as pd
+
+import analytics_reports
+from analytics_reports import Report, ReportContext
+from result_cache import ResultCache, estimate_size
+
+VALUE_SIZE = sys.getsizeof(b"x" * 100)
+
+
+def value(fill):
+    return fill.encode("ascii") * 100
+
+
+def test_put_evicts_least_recently_used_entries_at_the_memory_cap():
+    cache = ResultCache(3 * VALUE_SIZE)
+    cache.put("a", value("a"))
+    cache.put("b", value("b"))
+    cache.put("c", value("c"))
+    assert cache.get("a") == value("a")  # a is now the most recently used
+
+    cache.put("d", value("d"))
+    assert cache.get("b") is None
+    assert [cache.get(key) is not None for key in ["a", "c", "d"]] == [True, True, True]
+    assert cache.current_bytes == 3 * VALUE_SIZE
+    assert cache.stats()["evictions"] == 1
+
+
+def test_replacing_an_entry_does_not_count_it_twice():
+    cache = ResultCache(2 * VALUE_SIZE)
+    cache.put("a", value("a"))
+    cache.put("a", value("b"))
+    cache.put("c", value("c"))
+    assert cache.current_bytes == 2 * VALUE_SIZE
+    assert cache.get("a") == value("b")
+    assert cache.stats()["evictions"] == 0
+
+
+def test_values_larger_than_the_cache_are_not_cached():
+    cache = ResultCache(VALUE_SIZE)
+    cache.put("a", value("a"))
+    cache.put("big", b"x" * 1000)
+    assert cache.get("big") is None
+    assert cache.get("a") == value("a")
+
+
+def test_data_frames_are_sized_by_their_memory_usage():
+    frame = pd.DataFrame({"title": ["a" * 1000, "b" * 1000]})
+    assert estimate_size(frame) > 2000
+
+
+class CountingReport(Report):
+    def __init__(self):
+        super().__init__(0, "Counting", params=("top_n_overall",))
+        self.computed = 0
+
+    def compute(self, context):
+        self.computed += 1
+        return pd.DataFrame({"computed": [self.computed]})
+
+
+def test_report_results_are_keyed_by_the_channel_versions_and_settings(monkeypatch):
+    monkeypatch.setattr(analytics_reports, "result_cache", ResultCache(2 ** 20))
+    report = CountingReport()
+    settings = {"top_n_overall": 10, "top_n_per_channel": 1}
+
+    def context(versions, **overrides):
+        return ReportContext(("UC1",), versions, dict(settings, **overrides), run_query=None)
+
+    report.get(context((("UC1", 1),)))
+    report.get(context((("UC1", 1),)))
+    assert report.computed == 1
+
+    # A re-ingest bumps the channel's data version, so the old result is not reused
+    assert report.get(context((("UC1", 2),)))["computed"].tolist() == [2]
+    # A setting the report depends on is part of the key; one it ignores is not
+    report.get(context((("UC1", 2),), top_n_overall=5))
+    report.get(context((("UC1", 2),), top_n_per_channel=3))
+    assert report.computed == 3
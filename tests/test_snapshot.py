@@ -0,0 +1,113 @@
+import importlib
+from datetime import datetime
+
+import pytest
+
+import snapshot
+from analytics_engine import build_report_frame, load_snapshot_frame
+from snapshot import export_channel, list_partitions, read_snapshot_channel_names, read_snapshot_version, refresh_snapshot
+
+CHANNEL_ROWS = {
+    "UC1": [("UC1", "One", "First channel", 10, 2, 300, "public", 1)],
+    "UC2": [("UC2", "Two", "Second channel", 5, 0, 0, "public", 4)],
+}
+VIDEO_ROWS = {
+    "UC1": [
+        ("v1", "UC1", "First", "", 100, 10, 1, "PT1M", 60, datetime(2022, 3, 1, 10, 0)),
+        ("v2", "UC1", "Second", "", 200, None, 2, None, None, datetime(2023, 1, 1)),
+    ],
+    "UC2": [],
+}
+
+
+# Cursor answering the snapshot queries from CHANNEL_ROWS and VIDEO_ROWS
+class FakeCursor:
+    def __init__(self, channel_rows):
+        self.channel_rows = channel_rows
+        self.rows = []
+
+    def execute(self, query, params=None):
+        if query == "SELECT channel_id, data_version FROM channel":
+            self.rows = [(rows[0][0], rows[0][-1]) for rows in self.channel_rows.values()]
+        elif query == snapshot.SNAPSHOT_QUERIES["channel"]:
+            self.rows = self.channel_rows.get(params[0], [])
+        else:
+            self.rows = VIDEO_ROWS.get(params[0], [])
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, channel_rows):
+        self.channel_rows = channel_rows
+
+    def cursor(self):
+        return FakeCursor(self.channel_rows)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_snapshot_frame_matches_the_database_frame(tmp_path):
+    cursor = FakeCursor(CHANNEL_ROWS)
+    assert export_channel(cursor, "UC1", tmp_path)
+    assert export_channel(cursor, "UC2", tmp_path)
+    # The same data_version is not written again
+    assert not export_channel(cursor, "UC1", tmp_path)
+
+    versions = read_snapshot_version(tmp_path)
+    assert versions == (("UC1", 1), ("UC2", 4))
+    frame = load_snapshot_frame(versions, ["UC2", "UC1"], tmp_path)
+
+    # The rows REPORT_FRAME_QUERY returns for the same data
+    expected = build_report_frame([
+        ("UC2", "Two", 0, 0, None, None, None, None, None, None, None),
+        ("UC1", "One", 2, 300, "v1", "First", 100, 10, 1, 60, datetime(2022, 3, 1, 10, 0)),
+        ("UC1", "One", 2, 300, "v2", "Second", 200, None, 2, None, datetime(2023, 1, 1)),
+    ], ["UC2", "UC1"])
+    assert frame.astype(object).where(frame.notna(), None).values.tolist() == \
+        expected.astype(object).where(expected.notna(), None).values.tolist()
+    assert read_snapshot_channel_names(versions, tmp_path) == [("UC1", "One"), ("UC2", "Two")]
+
+
+def test_refresh_keeps_two_versions_and_removes_deleted_channels(tmp_path, monkeypatch):
+    channel_rows = dict(CHANNEL_ROWS)
+    monkeypatch.setattr(snapshot, "get_database_connection", lambda: FakeConnection(channel_rows))
+    assert refresh_snapshot(tmp_path) == {"channels": 2, "exported": 2, "removed": 0, "unchanged": 0}
+
+    for version in (2, 3):
+        channel_rows["UC1"] = [CHANNEL_ROWS["UC1"][0][:-1] + (version,)]
+        refresh_snapshot(tmp_path)
+    assert list_partitions(tmp_path, "video")["UC1"] == [2, 3]
+
+    del channel_rows["UC2"]
+    assert refresh_snapshot(tmp_path) == {"channels": 1, "exported": 0, "removed": 1, "unchanged": 1}
+    assert read_snapshot_version(tmp_path) == (("UC1", 3),)
+    assert "UC2" not in list_partitions(tmp_path, "video")
+
+
+# Function to reload the snapshot module under the given environment
+@pytest.fixture
+def reload_snapshot(monkeypatch):
+    def reload(**environment):
+        for name in ["ANALYTICS_SOURCE", "SNAPSHOT_DIR"]:
+            monkeypatch.setenv(name, environment.get(name, ""))
+        return importlib.reload(snapshot)
+
+    yield reload
+    monkeypatch.undo()
+    importlib.reload(snapshot)
+
+
+def test_snapshot_is_opt_in(reload_snapshot):
+    assert not reload_snapshot().SNAPSHOT_ENABLED
+    assert reload_snapshot(SNAPSHOT_DIR="/tmp/snapshot").SNAPSHOT_DIR == "/tmp/snapshot"
+    assert reload_snapshot(SNAPSHOT_DIR="/tmp/snapshot").SNAPSHOT_ENABLED
+    assert reload_snapshot(ANALYTICS_SOURCE="snapshot").SNAPSHOT_DIR == "snapshot"
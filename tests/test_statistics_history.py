@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+from statistics_history import compute_growth, record_channel_statistics, record_video_statistics
+
+
+def history(rows):
+    frame = pd.DataFrame(rows, columns=["video_id", "recorded_at", "views"])
+    frame["recorded_at"] = pd.to_datetime(frame["recorded_at"])
+    frame["views"] = frame["views"].astype("Int64")
+    return frame
+
+
+def test_compute_growth_within_the_window():
+    growth = compute_growth(
+        history([("v1", "2024-01-01", 100), ("v1", "2024-01-03", 300), ("v1", "2024-01-05", 400)]),
+        "video_id", "views", pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-05"),
+    )
+    row = growth.loc["v1"]
+    assert row["current"] == 400
+    assert row["change"] == pytest.approx(300)
+    assert row["per_day"] == pytest.approx(75)
+    assert row["peak_per_day"] == pytest.approx(100)
+
+
+def test_compute_growth_prorates_an_interval_that_starts_before_the_window():
+    # 100 views over 4 days, of which 1 day is inside the window
+    growth = compute_growth(
+        history([("v1", "2024-01-01", 100), ("v1", "2024-01-05", 200)]),
+        "video_id", "views", pd.Timestamp("2024-01-04"), pd.Timestamp("2024-01-05"),
+    )
+    assert growth.loc["v1", "change"] == pytest.approx(25)
+    assert growth.loc["v1", "per_day"] == pytest.approx(25)
+
+
+def test_compute_growth_measures_new_keys_from_their_first_row():
+    growth = compute_growth(
+        history([("v2", "2024-01-03", 0), ("v2", "2024-01-05", 50), ("v3", "2024-01-04", 10)]),
+        "video_id", "views", pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-05"),
+    )
+    assert growth.loc["v2", "per_day"] == pytest.approx(25)
+    assert growth.loc["v3", "change"] == 0
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.rows = []
+
+    def execute(self, query, params):
+        self.rows.append(params)
+
+    def executemany(self, query, rows):
+        self.rows += rows
+
+
+def test_record_video_statistics_appends_only_changes():
+    cursor = RecordingCursor()
+    previous = {"v1": ("one", 10, 1, 0, 60), "v2": ("two", 5, 0, 0, 60)}
+    new = {"v1": ("renamed", 10, 1, 0, 60), "v2": ("two", 6, 0, 0, 60), "v3": ("three", 0, 0, 0, None)}
+    assert record_video_statistics(cursor, previous, new) == 2
+    assert cursor.rows == [("v2", 6, 0, 0), ("v3", 0, 0, 0)]
+
+
+def test_record_channel_statistics_skips_unchanged_counts():
+    cursor = RecordingCursor()
+    assert not record_channel_statistics(cursor, "UC1", (1, 2, 3), [1, 2, 3])
+    assert record_channel_statistics(cursor, "UC1", None, (1, 2, 3))
+    assert cursor.rows == [("UC1", 1, 2, 3)]
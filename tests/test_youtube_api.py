@@ -0,0 +1,147 @@
+import json
+
+import pytest
+
+import youtube_api
+from youtube_api import QUOTA_COSTS, QuotaExhaustedError, TokenBucket, YouTubeAPIError, YouTubeClient, estimate_channel_quota
+
+
+# Clock standing in for the time module: sleeping advances it instead of waiting
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code, body, headers=None):
+        self.status_code = status_code
+        self.text = json.dumps(body)
+        self.content = self.text.encode("utf-8")
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.text)
+
+
+# Session answering each get() with the next of the given responses
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+def error_response(status_code, reason, headers=None):
+    return FakeResponse(status_code, {"error": {"code": status_code, "message": reason, "errors": [{"reason": reason}]}}, headers)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(youtube_api, "time", clock)
+    # Backoff always waits its full, unjittered delay
+    monkeypatch.setattr(youtube_api.random, "uniform", lambda low, high: high)
+    return clock
+
+
+def make_client(session, **kwargs):
+    return YouTubeClient("test-key", requests_per_second=1000, daily_quota=100, max_retries=3, session=session, **kwargs)
+
+
+def test_token_bucket_waits_for_a_token_once_the_burst_is_spent(clock):
+    bucket = TokenBucket(rate=2)
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.sleeps == []
+
+    bucket.acquire()
+    assert clock.sleeps == [0.5]
+
+    # Tokens refill with time, up to the capacity
+    clock.now += 10
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.sleeps == [0.5]
+
+
+def test_server_errors_are_retried_with_backoff(clock):
+    session = FakeSession(error_response(500, "backendError"), error_response(503, "backendError", {"Retry-After": "7"}),
+                          FakeResponse(200, {"items": []}))
+    client = make_client(session, backoff_base=1.0)
+
+    assert client.get("videos", id="a") == {"items": []}
+    assert session.calls == 3
+    # Exponential backoff for the first error, the server's Retry-After for the second
+    assert clock.sleeps == [1.0, 7.0]
+    # Every attempt is charged
+    assert client.quota.remaining == 100 - 3 * QUOTA_COSTS["videos"]
+
+
+def test_retries_stop_after_max_retries(clock):
+    session = FakeSession(*[error_response(503, "backendError") for _ in range(4)])
+    client = make_client(session, backoff_base=1.0)
+
+    with pytest.raises(YouTubeAPIError) as error:
+        client.get("videos", id="a")
+    assert error.value.status_code == 503
+    assert session.calls == 4
+    assert clock.sleeps == [1.0, 2.0, 4.0]
+
+
+def test_client_errors_are_not_retried(clock):
+    session = FakeSession(error_response(400, "badRequest"))
+    client = make_client(session)
+
+    with pytest.raises(YouTubeAPIError) as error:
+        client.get("videos", id="a")
+    assert (error.value.status_code, error.value.reason) == (400, "badRequest")
+    assert session.calls == 1
+
+
+def test_quota_exceeded_spends_the_remaining_quota(clock):
+    session = FakeSession(error_response(403, "quotaExceeded"))
+    client = make_client(session)
+
+    with pytest.raises(QuotaExhaustedError):
+        client.get("videos", id="a")
+    assert client.quota.remaining == 0
+
+    # Further calls are refused without a request
+    with pytest.raises(QuotaExhaustedError):
+        client.get("videos", id="b")
+    assert session.calls == 1
+
+
+def test_search_estimate_stops_at_the_search_result_limit():
+    page_cost = QUOTA_COSTS["search"] + QUOTA_COSTS["videos"]
+    assert estimate_channel_quota(120, "search") == QUOTA_COSTS["channels"] + 3 * page_cost
+    assert estimate_channel_quota(500, "search") == QUOTA_COSTS["channels"] + 10 * page_cost
+    # 5,000 videos still list only 10 search pages: about 1,011 units, not 10,101
+    assert estimate_channel_quota(5000, "search") == 1011
+
+
+def test_incremental_estimate_counts_new_uploads_and_refresh_batches():
+    # 3 new uploads: one playlist page with its videos.list call, and 4 refresh batches for 200 stored videos
+    assert estimate_channel_quota(203, "playlistItems", stored_videos=200) == 1 + (1 + 1) + 4
+    # A first sync lists every upload and has nothing to refresh
+    assert estimate_channel_quota(120, "playlistItems") == 1 + 3 * 2
+
+
+def test_incremental_estimate_of_a_very_large_channel_fits_the_daily_quota():
+    # Counting playlist pages for all 200,000 uploads gave 12,001 units; 10 new uploads cost one page plus the refresh
+    assert estimate_channel_quota(200010, "playlistItems", stored_videos=200000) == 1 + 2 + 4000
+    assert estimate_channel_quota(200000, "playlistItems", stored_videos=200010) == 1 + 2 + 4001
@@ -0,0 +1,241 @@
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import metrics, timed
+
+API_BASE_URL = "https://www.googleapis.com/youtube/v3"
+
+# Quota units charged per call by the YouTube Data API v3
+QUOTA_COSTS = {
+    "channels": 1,
+    "playlistItems": 1,
+    "search": 100,
+    "videos": 1,
+}
+
+# search.list returns at most about this many results for a query, 50 per page
+SEARCH_MAX_RESULTS = 500
+
+# The daily quota resets at midnight Pacific Time
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRYABLE_REASONS = {"rateLimitExceeded", "userRateLimitExceeded", "backendError"}
+QUOTA_REASONS = {"quotaExceeded", "dailyLimitExceeded"}
+
+
+class YouTubeAPIError(Exception):
+    def __init__(self, message, status_code=None, reason=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.reason = reason
+
+
+class QuotaExhaustedError(YouTubeAPIError):
+    pass
+
+
+# Token bucket limiting the request rate across every thread sharing the client
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# Per-day quota budget; work that would overrun it is refused up front. Usage is counted
+# in memory, so it is per process and restarts at zero, unless a store shares it between
+# processes (see quota_usage.MySQLQuotaStore).
+class QuotaBudget:
+    def __init__(self, daily_units, store=None):
+        self.daily_units = daily_units
+        self.store = store
+        self.used = 0
+        self.day = self.today()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def today():
+        return datetime.now(QUOTA_TIMEZONE).date()
+
+    def _roll_over(self):
+        if self.day != self.today():
+            self.day = self.today()
+            self.used = 0
+
+    @property
+    def remaining(self):
+        if self.store:
+            return max(0, self.daily_units - self.store.used(self.today()))
+        with self.lock:
+            self._roll_over()
+            return max(0, self.daily_units - self.used)
+
+    def can_afford(self, units):
+        return units <= self.remaining
+
+    def reserve(self, units):
+        if self.store:
+            if not self.store.reserve(self.today(), units, self.daily_units):
+                raise QuotaExhaustedError(
+                    f"Daily quota exhausted: {self.daily_units - self.remaining} of {self.daily_units} units used, {units} more requested",
+                    reason="quotaExceeded",
+                )
+            return
+        with self.lock:
+            self._roll_over()
+            if self.used + units > self.daily_units:
+                raise QuotaExhaustedError(
+                    f"Daily quota exhausted: {self.used} of {self.daily_units} units used, {units} more requested",
+                    reason="quotaExceeded",
+                )
+            self.used += units
+
+    # The API itself reported the quota as spent, so stop spending for the day
+    def mark_exhausted(self):
+        if self.store:
+            self.store.mark_exhausted(self.today(), self.daily_units)
+            return
+        with self.lock:
+            self._roll_over()
+            self.used = self.daily_units
+
+
+# Function to get when the daily quota next resets, as a naive UTC datetime
+def next_quota_reset(now=None):
+    today = (now or datetime.now(QUOTA_TIMEZONE)).astimezone(QUOTA_TIMEZONE).date()
+    reset = datetime.combine(today + timedelta(days=1), datetime.min.time(), QUOTA_TIMEZONE)
+    return reset.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# Function to estimate the quota units needed to ingest a channel. Full ingests list its
+# videos through search. Incremental syncs list only the uploads newer than the stored_videos
+# already saved through the uploads playlist, then refresh the statistics of the stored
+# videos 50 per videos.list call.
+def estimate_channel_quota(total_videos, endpoint="search", stored_videos=0):
+    if endpoint == "playlistItems":
+        new_videos = max(0, int(total_videos) - int(stored_videos))
+        pages = max(1, -(-new_videos // 50))
+        refresh_batches = -(-int(stored_videos) // 50)
+        return QUOTA_COSTS["channels"] + pages * (QUOTA_COSTS["playlistItems"] + QUOTA_COSTS["videos"]) + refresh_batches * QUOTA_COSTS["videos"]
+
+    # Search stops after about SEARCH_MAX_RESULTS results however many videos there are
+    pages = min(max(1, -(-int(total_videos) // 50)), SEARCH_MAX_RESULTS // 50)
+    return QUOTA_COSTS["channels"] + pages * (QUOTA_COSTS[endpoint] + QUOTA_COSTS["videos"])
+
+
+# YouTube Data API client with a pooled session, rate limiting, quota accounting and retries
+class YouTubeClient:
+    def __init__(self, api_key, requests_per_second=10, daily_quota=10000, max_retries=5,
+                 backoff_base=1.0, backoff_max=60.0, timeout=30, pool_size=32,
+                 base_url=API_BASE_URL, session=None, cache=None, quota_store=None):
+        self.api_key = api_key
+        self.cache = cache
+        self.base_url = base_url.rstrip("/")
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self.quota = QuotaBudget(daily_quota, quota_store)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        # An injected session (e.g. for tests) is used as is
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    # Exponential backoff with full jitter, honouring Retry-After when the server sends it
+    def backoff_delay(self, attempt, retry_after=None):
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def get(self, endpoint, **params):
+        url = f"{self.base_url}/{endpoint}"
+        cost = QUOTA_COSTS.get(endpoint, 1)
+
+        # A response still within its TTL, or any cached response when replaying offline,
+        # is served without a request; an older one is revalidated with its ETag
+        cached = self.cache.get(endpoint, params) if self.cache else None
+        if cached and (cached["fresh"] or self.cache.offline):
+            metrics.record_http(endpoint, "cached", 0.0, 0, 0)
+            return cached["response"]
+        if self.cache and self.cache.offline:
+            raise YouTubeAPIError(f"{endpoint} response for {params} is not cached and the cache is offline")
+        headers = {"If-None-Match": cached["etag"]} if cached and cached.get("etag") else {}
+
+        params["key"] = self.api_key
+        for attempt in range(self.max_retries + 1):
+            self.quota.reserve(cost)
+            self.rate_limiter.acquire()
+
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metrics.record_http(endpoint, "error", time.perf_counter() - started, 0, cost)
+                if attempt == self.max_retries:
+                    raise YouTubeAPIError(f"{endpoint} request failed: {e}") from e
+                time.sleep(self.backoff_delay(attempt))
+                continue
+
+            metrics.record_http(endpoint, response.status_code, time.perf_counter() - started, len(response.content), cost)
+
+            if response.status_code == 304 and cached:
+                self.cache.touch(endpoint, params)
+                return cached["response"]
+
+            if response.status_code == 200:
+                with timed("parse_json"):
+                    data = response.json()
+                if self.cache:
+                    self.cache.put(endpoint, params, response.headers.get("ETag") or data.get("etag"), data)
+                return data
+
+            reason, message = parse_error(response)
+            if response.status_code == 403 and reason in QUOTA_REASONS:
+                self.quota.mark_exhausted()
+                raise QuotaExhaustedError(message, response.status_code, reason)
+
+            retryable = response.status_code in RETRYABLE_STATUS_CODES or reason in RETRYABLE_REASONS
+            if not retryable or attempt == self.max_retries:
+                raise YouTubeAPIError(message, response.status_code, reason)
+            time.sleep(self.backoff_delay(attempt, response.headers.get("Retry-After")))
+
+
+# Function to extract the error reason and message from an API error response
+def parse_error(response):
+    try:
+        error = response.json().get("error", {})
+    except ValueError:
+        return None, f"HTTP {response.status_code}: {response.text[:200]}"
+    errors = error.get("errors") or [{}]
+    reason = errors[0].get("reason")
+    message = error.get("message") or f"HTTP {response.status_code}"
+    return reason, f"HTTP {response.status_code} ({reason}): {message}"